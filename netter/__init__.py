@@ -1,3 +1,51 @@
 # coding:utf-8
 
-from .utils import dnsprobe  # noqa:F401
+from typing import Dict
+from typing import List
+from typing import TYPE_CHECKING
+
+from .utils.lazy import lazy_exports
+
+if TYPE_CHECKING:  # for static analysis, see __LAZY_ATTRS
+    from .api import ping_async  # noqa:F401
+    from .api import probe_async  # noqa:F401
+    from .api import probe_iter  # noqa:F401
+    from .api import probe_many  # noqa:F401
+    from .api import public_ip_async  # noqa:F401
+    from .api import public_ip_iter  # noqa:F401
+    from .api import public_ip_many  # noqa:F401
+    from .api import query_async  # noqa:F401
+    from .api import query_iter  # noqa:F401
+    from .api import query_many  # noqa:F401
+    from .utils.history import history_store  # noqa:F401
+    from .utils.prober import dnsprobe  # noqa:F401
+    from .utils.prober import ping_burst  # noqa:F401
+    from .utils.prober import probe_result  # noqa:F401
+    from .utils.public import public_ip_result  # noqa:F401
+    from .utils.query import query_result  # noqa:F401
+    from .utils.resolvconf import resolv_conf  # noqa:F401
+
+# The library API (see api.py) is imported on first attribute access, so
+# that the command line does not pay for it until a command needs it.
+__LAZY_ATTRS: Dict[str, str] = {
+    "ping_async": ".api",
+    "probe_async": ".api",
+    "probe_iter": ".api",
+    "probe_many": ".api",
+    "public_ip_async": ".api",
+    "public_ip_iter": ".api",
+    "public_ip_many": ".api",
+    "query_async": ".api",
+    "query_iter": ".api",
+    "query_many": ".api",
+    "history_store": ".utils.history",
+    "dnsprobe": ".utils.prober",
+    "ping_burst": ".utils.prober",
+    "probe_result": ".utils.prober",
+    "public_ip_result": ".utils.public",
+    "query_result": ".utils.query",
+    "resolv_conf": ".utils.resolvconf",
+}
+
+__all__: List[str] = list(__LAZY_ATTRS)
+__getattr__, __dir__ = lazy_exports(__name__, __LAZY_ATTRS)
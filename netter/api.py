@@ -0,0 +1,240 @@
+# coding:utf-8
+# pylint: disable=import-outside-toplevel
+
+from array import array
+from functools import partial
+from ipaddress import ip_address
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Mapping
+from typing import Optional
+from typing import Sequence
+from typing import TYPE_CHECKING
+
+from .utils.constants import EXAMPLE_DOMAIN
+from .utils.constants import PING_MAX_TO
+from .utils.constants import REQUEST_TIMEOUT
+from .utils.constants import RESOLVE_MAX_TO
+from .utils.parallel import DEFAULT_CONCURRENCY
+
+if TYPE_CHECKING:  # dnspython and requests are imported on first use
+    from .utils.history import history_store
+    from .utils.prober import dnscache
+    from .utils.prober import probe_result
+    from .utils.public import public_ip_result
+    from .utils.query import query_result
+    from .utils.resolvconf import resolv_conf
+
+
+def probe_iter(nameservers: Iterable[str], qname: str = EXAMPLE_DOMAIN,
+               enable_ping: bool = True, count: int = 1,
+               interval: float = 0.0, transport: str = "udp",
+               port: Optional[int] = None, pipeline: bool = False,
+               adaptive: bool = True, insecure: bool = False,
+               concurrency: int = DEFAULT_CONCURRENCY,
+               ping_timeout: int = PING_MAX_TO,
+               resolve_timeout: float = RESOLVE_MAX_TO,
+               config: Optional["resolv_conf"] = None,
+               history: Optional["history_store"] = None
+               ) -> Iterator["probe_result"]:
+    '''Ping and resolve qname on each nameserver, yield each result once
+    it completes
+
+    See probe_engine, the timeouts are ceilings unless adaptive is False.
+    Insecure skips certificate verification of dot and doh.
+    '''
+    from .utils.prober import probe_engine
+    from .utils.transport import new_ssl_context
+
+    engine = probe_engine(concurrency=concurrency,
+                          ping_timeout=ping_timeout,
+                          resolve_timeout=resolve_timeout, count=count,
+                          interval=interval, pipeline=pipeline,
+                          adaptive=adaptive)
+    return engine.probe(nameservers, qname=qname, enable_ping=enable_ping,
+                        port=port, transport=transport,
+                        ssl_context=new_ssl_context(insecure)
+                        if transport in ("dot", "doh") else None,
+                        config=config, history=history)
+
+
+def probe_many(nameservers: Iterable[str], qname: str = EXAMPLE_DOMAIN,
+               enable_ping: bool = True, count: int = 1,
+               interval: float = 0.0, transport: str = "udp",
+               port: Optional[int] = None, pipeline: bool = False,
+               adaptive: bool = True, insecure: bool = False,
+               concurrency: int = DEFAULT_CONCURRENCY,
+               ping_timeout: int = PING_MAX_TO,
+               resolve_timeout: float = RESOLVE_MAX_TO,
+               config: Optional["resolv_conf"] = None,
+               history: Optional["history_store"] = None
+               ) -> List["probe_result"]:
+    '''probe_iter, results in the order of nameservers (once each)
+    '''
+    addresses: List[str] = [str(ip_address(ns)) for ns in nameservers]
+    results: Dict[str, "probe_result"] = {
+        result.nameserver: result for result in probe_iter(
+            addresses, qname=qname, enable_ping=enable_ping, count=count,
+            interval=interval, transport=transport, port=port,
+            pipeline=pipeline, adaptive=adaptive, insecure=insecure,
+            concurrency=concurrency, ping_timeout=ping_timeout,
+            resolve_timeout=resolve_timeout, config=config,
+            history=history)}
+    return [results.pop(address) for address in addresses
+            if address in results]
+
+
+async def probe_async(nameservers: Iterable[str],
+                      qname: str = EXAMPLE_DOMAIN, enable_ping: bool = True,
+                      count: int = 1, interval: float = 0.0,
+                      transport: str = "udp", port: Optional[int] = None,
+                      pipeline: bool = False, adaptive: bool = True,
+                      insecure: bool = False,
+                      concurrency: int = DEFAULT_CONCURRENCY,
+                      ping_timeout: int = PING_MAX_TO,
+                      resolve_timeout: float = RESOLVE_MAX_TO,
+                      config: Optional["resolv_conf"] = None,
+                      history: Optional["history_store"] = None
+                      ) -> List["probe_result"]:
+    '''probe_many off the event loop, in the default executor
+    '''
+    from asyncio import get_running_loop
+
+    return await get_running_loop().run_in_executor(None, partial(
+        probe_many, list(nameservers), qname=qname, enable_ping=enable_ping,
+        count=count, interval=interval, transport=transport, port=port,
+        pipeline=pipeline, adaptive=adaptive, insecure=insecure,
+        concurrency=concurrency, ping_timeout=ping_timeout,
+        resolve_timeout=resolve_timeout, config=config, history=history))
+
+
+async def ping_async(addresses: Iterable[str], count: int = 1,
+                     interval: float = 0.0,
+                     timeout: float = float(PING_MAX_TO),
+                     concurrency: int = DEFAULT_CONCURRENCY,
+                     deadline: Optional[float] = None
+                     ) -> Dict[str, array]:
+    '''Ping each address count times, interval seconds apart
+
+    Unlike the other awaitables no thread is involved, the shared ICMP
+    sockets are watched by the running event loop. Return the delays of
+    each address in burst order, negative delay means timeout. Raise
+    OSError if ICMP sockets are not permitted.
+    '''
+    from .utils.icmp import async_pinger
+
+    async with async_pinger() as icmp:
+        return await icmp.ping(addresses, count=count, interval=interval,
+                               timeout=timeout, concurrency=concurrency,
+                               deadline=deadline)
+
+
+def query_iter(domains: Iterable[str], nameservers: Iterable[str],
+               rdtypes: Optional[Sequence[str]] = None,
+               enable_ipv6: bool = False, deadline: Optional[float] = None,
+               concurrency: int = DEFAULT_CONCURRENCY,
+               cache: Optional["dnscache"] = None, port: int = 53,
+               config: Optional["resolv_conf"] = None
+               ) -> Iterator["query_result"]:
+    '''Query each (domain, nameserver, rdtype), yield each result once it
+    completes
+
+    Rdtypes defaults to A, and AAAA if enable_ipv6. See query_domain_names.
+    '''
+    from .utils.query import query_domain_names
+
+    return query_domain_names(domains, nameservers, enable_ipv6=enable_ipv6,
+                              deadline=deadline, concurrency=concurrency,
+                              cache=cache, port=port, config=config,
+                              rdtypes=rdtypes)
+
+
+def query_many(domains: Iterable[str], nameservers: Iterable[str],
+               rdtypes: Optional[Sequence[str]] = None,
+               enable_ipv6: bool = False, deadline: Optional[float] = None,
+               concurrency: int = DEFAULT_CONCURRENCY,
+               cache: Optional["dnscache"] = None, port: int = 53,
+               config: Optional["resolv_conf"] = None
+               ) -> List["query_result"]:
+    '''query_iter, results in completion order
+    '''
+    return list(query_iter(domains, nameservers, rdtypes=rdtypes,
+                           enable_ipv6=enable_ipv6, deadline=deadline,
+                           concurrency=concurrency, cache=cache, port=port,
+                           config=config))
+
+
+async def query_async(domains: Iterable[str], nameservers: Iterable[str],
+                      rdtypes: Optional[Sequence[str]] = None,
+                      enable_ipv6: bool = False,
+                      deadline: Optional[float] = None,
+                      concurrency: int = DEFAULT_CONCURRENCY,
+                      cache: Optional["dnscache"] = None, port: int = 53,
+                      config: Optional["resolv_conf"] = None
+                      ) -> List["query_result"]:
+    '''query_many off the event loop, in the default executor
+    '''
+    from asyncio import get_running_loop
+
+    return await get_running_loop().run_in_executor(None, partial(
+        query_many, list(domains), list(nameservers), rdtypes=rdtypes,
+        enable_ipv6=enable_ipv6, deadline=deadline, concurrency=concurrency,
+        cache=cache, port=port, config=config))
+
+
+def public_ip_iter(sites: Iterable[str] = ("all",),
+                   timeout: float = REQUEST_TIMEOUT, first: bool = False,
+                   urls: Optional[Mapping[str, str]] = None,
+                   history: Optional["history_store"] = None
+                   ) -> Iterator["public_ip_result"]:
+    '''Query public IP providers, yield each result once it completes
+
+    Sites are names of public_ip.flags (ident, ipify, ipinfo, cloudflare,
+    all or random), urls overrides the request url of a site by name. In
+    first mode, stop after the first answer.
+    '''
+    from .utils.public import public_ip
+    from .utils.public import public_ip_client
+
+    def parse(site: str) -> public_ip.flags:
+        if site not in public_ip.flags.__members__:
+            raise ValueError(f"unknown public ip site: {site}")
+        return public_ip.flags[site]
+
+    flag: public_ip.flags = public_ip.flags.random
+    for site in sites:
+        flag |= parse(site)
+    client = public_ip_client(timeout=timeout, history=history, urls={
+        parse(site): url for site, url in (urls or {}).items()})
+    try:
+        yield from client.results(flag, first=first)
+    finally:
+        client.close(wait=not first)
+
+
+def public_ip_many(sites: Iterable[str] = ("all",),
+                   timeout: float = REQUEST_TIMEOUT, first: bool = False,
+                   urls: Optional[Mapping[str, str]] = None,
+                   history: Optional["history_store"] = None
+                   ) -> List["public_ip_result"]:
+    '''public_ip_iter, results in completion order
+    '''
+    return list(public_ip_iter(sites, timeout=timeout, first=first,
+                               urls=urls, history=history))
+
+
+async def public_ip_async(sites: Iterable[str] = ("all",),
+                          timeout: float = REQUEST_TIMEOUT,
+                          first: bool = False,
+                          urls: Optional[Mapping[str, str]] = None,
+                          history: Optional["history_store"] = None
+                          ) -> List["public_ip_result"]:
+    '''public_ip_many off the event loop, in the default executor
+    '''
+    from asyncio import get_running_loop
+
+    return await get_running_loop().run_in_executor(None, partial(
+        public_ip_many, list(sites), timeout=timeout, first=first,
+        urls=urls, history=history))
@@ -13,6 +13,8 @@ from ..attribute import __urlhome__
 from ..attribute import __version__
 from .address import add_cmd_public_ip
 from .domain import add_cmd_nameserver
+from .exporter import add_cmd_exporter
+from .history import add_cmd_history
 
 
 @add_command("netter")
@@ -20,7 +22,8 @@ def add_cmd(_arg: argp):
     pass
 
 
-@run_command(add_cmd, add_cmd_public_ip, add_cmd_nameserver)
+@run_command(add_cmd, add_cmd_public_ip, add_cmd_nameserver,
+             add_cmd_exporter, add_cmd_history)
 def run_cmd(cmds: commands) -> int:
     return 0
 
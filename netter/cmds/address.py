@@ -1,11 +1,15 @@
 # coding:utf-8
+# pylint: disable=import-outside-toplevel
 
 from xarg import add_command
 from xarg import argp
 from xarg import commands
 from xarg import run_command
 
-from ..utils import public_ip
+from ..utils.constants import REQUEST_TIMEOUT
+from .output import add_opt_history
+from .output import add_opt_output
+from .output import record_writer
 
 
 @ add_command("public-ip", help="query public ip address")
@@ -19,24 +23,58 @@ def add_cmd_public_ip(_arg: argp):
                       help="query from ipify.org")
     mgrp.add_argument("--ipinfo", action="store_true",
                       help="query from ipinfo.io")
+    _arg.add_opt_on("--first", help="query from all (or selected) sites "
+                    "concurrently, return the first answer, the remaining "
+                    "queries still run until they complete or reach "
+                    "--timeout")
+    _arg.add_argument("--timeout", type=float, metavar="SEC",
+                      default=REQUEST_TIMEOUT,
+                      help="timeout of each query, "
+                      f"default is {REQUEST_TIMEOUT}")
     _arg.add_opt_on("-v", "--verbose", help="verbose mode")
+    add_opt_history(_arg)
+    add_opt_output(_arg)
 
 
 @ run_command(add_cmd_public_ip)
 def run_cmd_public_ip(cmds: commands) -> int:
-    query_site = public_ip.flags.cloudflare
+    from ..api import public_ip_iter
+    from ..utils.public import public_ip  # requests is slow to import
+    from ..utils.public import public_ip_result
+    from ..utils.history import history_store
+
+    site: str = "cloudflare"
     if cmds.args.all:
-        query_site = public_ip.flags.all
+        site = "all"
     elif cmds.args.ident:
-        query_site = public_ip.flags.ident
+        site = "ident"
     elif cmds.args.ipify:
-        query_site = public_ip.flags.ipify
+        site = "ipify"
     elif cmds.args.ipinfo:
-        query_site = public_ip.flags.ipinfo
-    public: public_ip = public_ip.query(query_site)
+        site = "ipinfo"
+    elif cmds.args.first:
+        site = "all"
+    history = history_store(cmds.args.history) \
+        if cmds.args.history is not None else None
+    try:
+        if cmds.args.output != "table":
+            writer = record_writer(cmds, cmds.args.output,
+                                   public_ip_result.FIELDS)
+            for result in public_ip_iter([site], timeout=cmds.args.timeout,
+                                         first=cmds.args.first,
+                                         history=history):
+                writer.write(result.dump())
+            return 0
+        public: public_ip = public_ip.query(public_ip.flags[site],
+                                            timeout=cmds.args.timeout,
+                                            first=cmds.args.first,
+                                            history=history)
+    finally:
+        if history is not None:
+            history.close()
     if cmds.args.verbose:
         for addr in public:
-            sites: str = ", ".join(site for site in public[addr])
+            sites: str = ", ".join(public[addr])
             cmds.stdout(f"{addr} from {sites}")
     else:
         cmds.stdout(public)
@@ -1,17 +1,18 @@
 # coding:utf-8
+# pylint: disable=import-outside-toplevel
 
+from math import inf
+from math import isnan
+from typing import Any
 from typing import Dict
 from typing import Iterable
 from typing import List
+from typing import Optional
+from typing import Sequence
 from typing import Set
+from typing import TYPE_CHECKING
 from typing import Union
 
-from dns.resolver import Answer
-from dns.resolver import LifetimeTimeout
-from dns.resolver import NXDOMAIN
-from dns.resolver import NoAnswer
-from dns.resolver import NoNameservers
-from ping3.errors import HostUnknown
 from xarg import add_command
 from xarg import argp
 from xarg import commands
@@ -19,44 +20,52 @@ from xarg import form
 from xarg import run_command
 from xarg import tabulate
 
-from ..utils import Context
-from ..utils import EXAMPLE_DOMAIN
-from ..utils import NetworkInterface
-from ..utils import PING_MAX_TO
-from ..utils import RESOLVE_MAX_TO
-from ..utils import dnsprobe
-from ..utils import is_unix
-from ..utils import is_windows
-from ..utils import ping
+from ..utils.adapters import system_nameservers
+from ..utils.constants import DNS_PORTS
+from ..utils.constants import DNS_TRANSPORTS
+from ..utils.constants import EXAMPLE_DOMAIN
+from ..utils.constants import PING_MAX_TO
+from ..utils.constants import RESOLVE_MAX_TO
+from ..utils.parallel import DEFAULT_CONCURRENCY
+from ..utils.resolvconf import system_resolv_conf
+from ..utils.stats import STATISTICS
+from ..utils.stats import format_delay
+from ..utils.stats import format_stats
+from ..utils.stats import latency
+from .output import add_opt_history
+from .output import add_opt_output
+from .output import record_writer
+
+if TYPE_CHECKING:  # dnspython is imported on first use
+    from dns.resolver import Answer
+
+    from ..utils.prober import dnscache
+    from ..utils.prober import probe_result
+    from ..utils.query import consistency
+    from ..utils.query import query_result
+    from ..utils.scan import NETWORK
+    from ..utils.watch import health
 
 
 def query_domain_name(domain: str, nameservers: Iterable[str],
-                      enable_ipv6: bool = False) -> form:
-    title: List[str] = ["nameserver", "type", "answer"]
-    table: form[str, Union[str, Answer]] = form(name=domain, header=title)
+                      enable_ipv6: bool = False,
+                      deadline: Optional[float] = None,
+                      concurrency: int = DEFAULT_CONCURRENCY,
+                      cache: Optional["dnscache"] = None,
+                      rdtypes: Optional[Sequence[str]] = None) -> form:
+    '''Query all (nameserver, rdtype) pairs concurrently
 
-    def query(prober: dnsprobe, rdtype: str):
-        prefix: List[str] = [prober.address, rdtype]
-        try:
-            answer: Answer = prober.resolver.resolve(
-                qname=domain, rdtype=rdtype,
-                lifetime=RESOLVE_MAX_TO)
-            table.append(prefix + [answer])
-        except NXDOMAIN:
-            table.append(prefix + ["NXDOMAIN"])
-        except NoAnswer:
-            table.append(prefix + ["No Answer"])
-        except NoNameservers:
-            table.append(prefix + ["No Nameservers"])
-        except LifetimeTimeout:
-            table.append(prefix + ["Timeout"])
-
-    for nameserver in nameservers:
-        prober: dnsprobe = dnsprobe.from_string(nameserver)
-        query(prober, "A")
-        if enable_ipv6:
-            query(prober, "AAAA")
+    Rows are appended in completion order.
+    '''
+    from ..api import query_iter
 
+    title: List[str] = ["nameserver", "type", "answer"]
+    table: form[str, Union[str, "Answer"]] = form(name=domain, header=title)
+    for result in query_iter(
+            [domain], nameservers, enable_ipv6=enable_ipv6,
+            deadline=deadline, concurrency=concurrency, cache=cache,
+            config=system_resolv_conf(), rdtypes=rdtypes):
+        table.append([result.nameserver, result.rdtype, result.answer])
     return table
 
 
@@ -64,84 +73,512 @@ def query_domain_name(domain: str, nameservers: Iterable[str],
 def add_cmd_query(_arg: argp):
     _arg.add_argument("-6", dest="enable_ipv6", action="store_true",
                       help="query IPv6 address(AAAA record)")
+    _arg.add_argument("--type", dest="rdtypes", type=str, metavar="TYPES",
+                      default=None, help="comma-separated record types, "
+                      "all queried at once (e.g. A,AAAA,MX,TXT,CNAME,NS,SRV)"
+                      ", default is A")
+    _arg.add_argument("--consistency", action="store_true",
+                      help="group identical answers across nameservers, "
+                      "show which nameservers disagree")
+    _arg.add_argument("--diff", action="store_true",
+                      help="stream only domain names answered differently, "
+                      "nameservers with the same answers are grouped into "
+                      "one class")
     _arg.add_argument("--ping", action="store_true",
-                      help="ping the IP address of domain name")
-    _arg.add_argument(dest="domain", nargs=1, metavar="DOMAIN",
+                      help="ping the IP address of domain name, "
+                      "only for table output of one domain name")
+    _arg.add_argument("--count", type=int, metavar="N", default=1,
+                      help="pings per IP address with --ping, default is 1")
+    _arg.add_argument("--interval", type=float, metavar="SEC", default=0.1,
+                      help="seconds between pings with --ping, "
+                      "default is 0.1")
+    _arg.add_argument("--deadline", type=float, metavar="SEC", default=None,
+                      help="global deadline for all queries, default is "
+                      "none (each query is still limited by the lifetime "
+                      "of its resolver)")
+    _arg.add_argument("--concurrency", type=int, metavar="N",
+                      default=DEFAULT_CONCURRENCY,
+                      help="maximum concurrent queries, "
+                      f"default is {DEFAULT_CONCURRENCY}")
+    _arg.add_argument("--input", type=str, metavar="FILE", default=None,
+                      help="bulk mode, query domain names from FILE (one "
+                      "per line, - for stdin) and stream results, DOMAIN "
+                      "is omitted")
+    add_opt_output(_arg)
+    _arg.add_argument(dest="domain", nargs="?", metavar="DOMAIN",
                       help="domain name for query")
     _arg.add_argument(dest="nameservers", nargs="*", metavar="NS", default=[],
                       help="all extended nameservers")
 
 
-@run_command(add_cmd_query)
-def run_cmd_query(cmds: commands) -> int:
-    nameservers: List[str] = cmds.args.nameservers
-    if len(nameservers) > 0:
-        domain = cmds.args.domain[0]
-        querys = query_domain_name(domain, nameservers, cmds.args.enable_ipv6)
-        addresses: Dict[str, Set[str]] = {}
-
-        addrs: form[str, str] = form(
-            name=f"query {querys.name}",
-            header=["nameserver", "type", "ip_address"])
-        for mapping in querys.mappings:
-            if mapping["type"] not in ["A", "AAAA"]:
+def format_consistency(view: "consistency") -> form:
+    title: List[str] = ["domain", "type", "answer", "nameservers", "status"]
+    table: form[str, str] = form("consistency", title)
+    for domain, rdtype, answer, servers, consistent in view.rows():
+        table.append([domain, rdtype, "\n".join(answer), "\n".join(servers),
+                      "consistent" if consistent else "differs"])
+    return table
+
+
+def run_cmd_query_diff(cmds: commands, results: Iterable["query_result"],
+                       rdtypes: Sequence[str]) -> int:
+    from ..utils.query import domain_diff
+    from ..utils.query import resolver_diff
+
+    engine = resolver_diff(cmds.args.nameservers, rdtypes)
+    writer: Optional[record_writer] = record_writer(
+        cmds, cmds.args.output, domain_diff.FIELDS) \
+        if cmds.args.output != "table" else None
+    for diff in engine.run(results):
+        for record in diff.dump():
+            if writer is not None:
+                writer.write(record)
                 continue
-            answer: Union[str, Answer] = mapping["answer"]
-            if isinstance(answer, Answer):
-                nameserver: str = mapping["nameserver"]
-                address: List[str] = [rdata.address for rdata in answer]
-                for addr in address:
-                    if addr not in addresses:
-                        addresses[addr] = set()
-                    addresses[addr].add(nameserver)
-                mapping["ip_address"] = "\n".join(addr for addr in address)
-            else:
-                mapping["ip_address"] = answer
-            addrs.append(addrs.reflection(mapping))
-        if any([cmds.args.ping]):
-            cmds.stdout(f"query {querys.name}")
-        cmds.stdout(tabulate(addrs, fmt="simple_grid"))
-
-        if cmds.args.ping:
-            pings: form[str, str] = form(
-                name=f"ping {querys.name}",
-                header=["ip_address", "ping(ms)", "nameservers"])
-            for _address, _nameservers in addresses.items():
-                description: str = "\n".join(sorted(list(_nameservers)))
-                try:
-                    delay = ping(address=_address, timeout=PING_MAX_TO)
-                    pings.append([_address, f"{delay*1000:.2f}", description])
-                except HostUnknown:
-                    pings.append([_address, "Host Unknown", description])
-            pings.sort(key=lambda row: row[pings.column_no("ping(ms)")])
-            cmds.stdout(f"\nping {querys.name}")
-            cmds.stdout(tabulate(pings, fmt="simple_grid"))
+            cmds.stdout("\t".join([
+                record["domain"], str(record["class"]),
+                ",".join(record["nameservers"]), record["rdtype"],
+                ",".join(record["answer"])]))
+    cmds.stderr(f"{engine.divergent} of {engine.domains} domain names "
+                "answered differently")
+    return 0
+
+
+def run_cmd_query_stream(cmds: commands, domains: Iterable[str],
+                         cache: Optional["dnscache"] = None,
+                         rdtypes: Optional[Sequence[str]] = None) -> int:
+    from ..api import query_iter
+    from ..utils.query import consistency
+    from ..utils.query import format_answer
+    from ..utils.query import query_rdtypes
+    from ..utils.query import query_result
+
+    results = query_iter(
+        domains, cmds.args.nameservers, enable_ipv6=cmds.args.enable_ipv6,
+        deadline=cmds.args.deadline, concurrency=cmds.args.concurrency,
+        cache=cache, config=system_resolv_conf(), rdtypes=rdtypes)
+    if cmds.args.consistency:
+        view: consistency = consistency(results)
+        if cmds.args.output == "table":
+            cmds.stdout(tabulate(format_consistency(view),
+                                 fmt="simple_grid"))
+            return 0
+        view_writer = record_writer(cmds, cmds.args.output,
+                                    consistency.FIELDS)
+        for record in view.dump():
+            view_writer.write(record)
+        return 0
+    if cmds.args.diff:
+        return run_cmd_query_diff(cmds, results, query_rdtypes(
+            rdtypes, cmds.args.enable_ipv6))
+    writer: Optional[record_writer] = record_writer(
+        cmds, cmds.args.output, query_result.FIELDS) \
+        if cmds.args.output != "table" else None
+    for result in results:
+        if writer is not None:
+            writer.write(result.dump())
+        else:
+            cmds.stdout("\t".join([result.domain, result.nameserver,
+                                   result.rdtype,
+                                   format_answer(result.answer, sep=",")]))
+    return 0
+
+
+def run_cmd_query_ping(cmds: commands, name: str,
+                       addresses: Dict[str, Set[str]]) -> int:
+    '''ping the answered addresses, fastest first
+    '''
+    from ..utils.prober import ping_burst
+
+    if cmds.args.count < 1:
+        cmds.stderr(f"invalid count: {cmds.args.count}")
+        return 2
+    pings: form[str, str] = form(
+        name=f"ping {name}",
+        header=["ip_address", "ping(ms)", "loss", "nameservers"])
+    delays: Dict[str, latency] = {
+        addr: latency(samples) for addr, samples in ping_burst(
+            addresses.keys(), timeout=PING_MAX_TO,
+            count=cmds.args.count, interval=cmds.args.interval,
+            concurrency=cmds.args.concurrency,
+            deadline=cmds.args.deadline).items()}
+    for _address in sorted(addresses, key=lambda addr:
+                           delays[addr].avg
+                           if delays[addr].received > 0 else inf):
+        description: str = "\n".join(sorted(addresses[_address]))
+        stats: latency = delays[_address]
+        pings.append([_address, f"{stats.avg*1000:.2f}"
+                      if stats.received > 0 else "Timeout",
+                      f"{stats.loss * 100:.1f}%", description])
+    cmds.stdout(f"\nping {name}")
+    cmds.stdout(tabulate(pings, fmt="simple_grid"))
+    return 0
+
+
+def run_cmd_query_table(cmds: commands,
+                        rdtypes: Optional[Sequence[str]] = None) -> int:
+    '''query one domain name, tabulate the answers of each nameserver
+    '''
+    from dns.resolver import Answer
+
+    from ..utils.query import format_answer
+
+    querys = query_domain_name(cmds.args.domain, cmds.args.nameservers,
+                               enable_ipv6=cmds.args.enable_ipv6,
+                               deadline=cmds.args.deadline,
+                               concurrency=cmds.args.concurrency,
+                               rdtypes=rdtypes)
+    addresses: Dict[str, Set[str]] = {}
+
+    column: str = "ip_address" if rdtypes is None else "answer"
+    addrs: form[str, str] = form(
+        name=f"query {querys.name}",
+        header=["nameserver", "type", column])
+    for mapping in querys.mappings:
+        answer: Union[str, Answer] = mapping["answer"]
+        if mapping["type"] not in ["A", "AAAA"]:
+            mapping[column] = format_answer(answer)
+        elif isinstance(answer, Answer):
+            address: List[str] = [rdata.address for rdata in answer]
+            for addr in address:
+                addresses.setdefault(addr, set()).add(mapping["nameserver"])
+            mapping[column] = "\n".join(address)
+        else:
+            mapping[column] = answer
+        addrs.append(addrs.reflection(mapping))
+    if cmds.args.ping:
+        cmds.stdout(f"query {querys.name}")
+    cmds.stdout(tabulate(addrs, fmt="simple_grid"))
+    if cmds.args.ping:
+        return run_cmd_query_ping(cmds, querys.name, addresses)
     return 0
 
 
+def run_cmd_query_bulk(cmds: commands,
+                       rdtypes: Optional[Sequence[str]] = None) -> int:
+    '''query the domain names of --input, DOMAIN is the first nameserver
+    '''
+    from ..utils.prober import dnscache
+    from ..utils.query import read_domain_names
+
+    if cmds.args.domain is not None:
+        cmds.args.nameservers.insert(0, cmds.args.domain)
+    if len(cmds.args.nameservers) == 0:
+        return 0
+    return run_cmd_query_stream(cmds, read_domain_names(cmds.args.input),
+                                cache=dnscache(), rdtypes=rdtypes)
+
+
+@run_command(add_cmd_query)
+def run_cmd_query(cmds: commands) -> int:
+    from ..utils.query import parse_rdtypes
+
+    rdtypes: Optional[Sequence[str]] = None
+    if cmds.args.rdtypes is not None:
+        try:
+            rdtypes = parse_rdtypes(cmds.args.rdtypes)
+        except ValueError as e:
+            cmds.stderr(str(e))
+            return 2
+    if cmds.args.input is not None:
+        return run_cmd_query_bulk(cmds, rdtypes)
+    if cmds.args.domain is None:
+        cmds.stderr("DOMAIN is required without --input")
+        return 2
+    if len(cmds.args.nameservers) == 0:
+        return 0
+    if cmds.args.output != "table" or cmds.args.consistency or \
+            cmds.args.diff:
+        return run_cmd_query_stream(cmds, [cmds.args.domain],
+                                    rdtypes=rdtypes)
+    return run_cmd_query_table(cmds, rdtypes)
+
+
+SCAN_FIELDS = ("network", "nameserver", "latency_ms", "rcode")
+PROBE_FIELDS = ("domain", "nameserver", "transport", "setup_ms") + tuple(
+    f"{probe}_{field}" for probe in ["ping", "resolve"]
+    for field in latency.FIELDS) + ("resolve_aborted",)
+
+
+def dump_probe_result(domain: str, result: "probe_result") -> Dict[str, Any]:
+    record: Dict[str, Any] = {"domain": domain,
+                              "nameserver": result.nameserver,
+                              "transport": result.prober.transport}
+    if result.setup is not None:
+        record["setup_ms"] = result.setup.avg * 1000
+    if result.resolve is not None:
+        record["resolve_aborted"] = result.resolve.aborted
+    for probe in ["ping", "resolve"]:
+        stats: Optional[latency] = getattr(result, probe)
+        if stats is not None:
+            record.update(stats.dump(prefix=f"{probe}_"))
+    return record
+
+
 @ add_command("probe", help="ping nameserver and resolve domain name")
 def add_cmd_probe(_arg: argp):
     _arg.add_argument("--domain", nargs=1, metavar="NAME",
                       default=[EXAMPLE_DOMAIN], help="domain name for resolve")
+    _arg.add_argument("--concurrency", type=int, metavar="N",
+                      default=DEFAULT_CONCURRENCY,
+                      help=f"maximum concurrent probes, "
+                      f"default is {DEFAULT_CONCURRENCY}")
+    _arg.add_argument("--count", type=int, metavar="N", default=1,
+                      help="probes per nameserver, default is 1")
+    _arg.add_argument("--interval", type=float, metavar="SEC", default=0.1,
+                      help="seconds between probes, default is 0.1")
+    _arg.add_argument("--transport", type=str, default="udp",
+                      choices=DNS_TRANSPORTS,
+                      help="resolve over udp, tcp, dot (TLS) or doh "
+                      "(HTTPS), default is udp")
+    _arg.add_argument("--port", type=int, metavar="PORT", default=None,
+                      help="nameserver port, default is " + ", ".join(
+                          f"{k} {v}" for k, v in DNS_PORTS.items()))
+    _arg.add_argument("--pipeline", action="store_true",
+                      help="issue all resolves of a nameserver at once, "
+                      "pipelined over one tcp or dot connection")
+    _arg.add_argument("--insecure", action="store_true",
+                      help="skip certificate verification of dot and doh")
+    _arg.add_argument("--fixed-timeout", dest="fixed_timeout",
+                      action="store_true",
+                      help="wait up to the fixed ceilings (ping "
+                      f"{PING_MAX_TO}s, resolve {RESOLVE_MAX_TO}s) instead "
+                      "of adaptive deadlines derived from the observed RTT")
+    _arg.add_argument("--rate", type=float, metavar="QPS", default=1000.0,
+                      help="queries per second when scanning a range, "
+                      "default is 1000")
+    _arg.add_argument("--inflight", type=int, metavar="N", default=1024,
+                      help="maximum unanswered queries when scanning a "
+                      "range, default is 1024")
+    _arg.add_argument("--timeout", type=float, metavar="SEC", default=1.0,
+                      help="seconds to wait for each host when scanning a "
+                      "range, default is 1.0")
+    sort_keys: List[str] = [f"{probe}.{stat}" for probe in ["ping", "resolve"]
+                            for stat in STATISTICS]
+    _arg.add_argument("--sort", type=str, metavar="KEY", default=None,
+                      choices=sort_keys + list(STATISTICS),
+                      help="sort table by ping.STAT or [resolve.]STAT, "
+                      f"STAT is one of {', '.join(STATISTICS)}")
+    add_opt_history(_arg)
+    add_opt_output(_arg)
     _arg.add_argument(dest="nameservers", nargs="*", metavar="NS", default=[],
-                      help="all extended nameservers")
+                      help="all extended nameservers, a CIDR range (e.g. "
+                      "10.0.0.0/22) is scanned and only responders are "
+                      "reported")
+
+
+def run_cmd_probe_scan(cmds: commands, networks: Sequence["NETWORK"]) -> None:
+    from ..utils.scan import dns_scanner
+    from ..utils.scan import network_hosts
+
+    domain: str = cmds.args.domain[0]
+    port: int = cmds.args.port or DNS_PORTS["udp"]
+    writer: Optional[record_writer] = None if cmds.args.output == "table" \
+        else record_writer(cmds, cmds.args.output, SCAN_FIELDS)
+    for network in networks:
+        scanner = dns_scanner(qname=domain, port=port,
+                              timeout=cmds.args.timeout,
+                              rate=cmds.args.rate,
+                              inflight=cmds.args.inflight)
+        table: form[str, str] = form(f"scan {network}",
+                                     ["nameserver", "latency", "rcode"])
+        for result in scanner.scan(network_hosts(network)):
+            if writer is not None:
+                writer.write({"network": str(network), **result.dump()})
+            else:
+                table.append([result.nameserver, format_delay(result.delay),
+                              result.rcode])
+        if writer is None:
+            cmds.stdout(tabulate(table))
+        cmds.stderr(f"{scanner.responders} of {scanner.sent} hosts in "
+                    f"{network} answered")
+
+
+def sort_probe_results(results: List["probe_result"], key: str) -> None:
+    '''sort by ping.STAT or [resolve.]STAT, NaN last
+    '''
+    sort: List[str] = key.split(".")
+    probe: str = sort[0] if len(sort) > 1 else "resolve"
+
+    def sort_key(result: "probe_result") -> float:
+        value: float = getattr(getattr(result, probe), sort[-1])
+        return inf if isnan(value) else value
+    results.sort(key=sort_key)
+
+
+def format_probe_results(name: str, results: Iterable["probe_result"],
+                         transport: str, count: int) -> form:
+    '''average delays of one probe, or all statistics of a burst
+    '''
+    if count == 1:
+        title: List[str] = ["nameserver", "ping", "resolve"]
+        if transport != "udp":
+            title.insert(2, "setup")
+        table: form[str, str] = form(name, title)
+        for result in results:
+            assert isinstance(result.ping, latency)
+            assert isinstance(result.resolve, latency)
+            table.append([result.nameserver] + [
+                format_delay(stats.avg) if stats.received > 0
+                else "Timeout" for stats in
+                (result.ping, result.setup, result.resolve)
+                if stats is not None])
+        return table
+    table = form(name, ["nameserver", "probe"] + list(STATISTICS))
+    for result in results:
+        assert isinstance(result.ping, latency)
+        assert isinstance(result.resolve, latency)
+        table.append([result.nameserver, "ping"] + format_stats(result.ping))
+        if result.setup is not None:
+            table.append([result.nameserver, "setup"] +
+                         format_stats(result.setup))
+        table.append([result.nameserver, "resolve"] +
+                     format_stats(result.resolve))
+    return table
+
+
+def run_cmd_probe_nameservers(cmds: commands, nameservers: List[str]) -> int:
+    from ..api import probe_iter
+    from ..api import probe_many
+    from ..utils.history import history_store
+    from ..utils.prober import probe_result
+
+    domain = cmds.args.domain[0]
+    transport: str = cmds.args.transport
+    history: Optional[history_store] = history_store(
+        cmds.args.history) if cmds.args.history is not None else None
+    options: Dict[str, Any] = {
+        "qname": domain, "count": cmds.args.count,
+        "interval": cmds.args.interval, "transport": transport,
+        "port": cmds.args.port, "pipeline": cmds.args.pipeline,
+        "adaptive": not cmds.args.fixed_timeout,
+        "insecure": cmds.args.insecure,
+        "concurrency": cmds.args.concurrency,
+        "ping_timeout": PING_MAX_TO, "resolve_timeout": RESOLVE_MAX_TO,
+        "config": system_resolv_conf(), "history": history}
+    try:
+        if cmds.args.output != "table":
+            writer = record_writer(cmds, cmds.args.output, PROBE_FIELDS)
+            for result in probe_iter(nameservers, **options):
+                writer.write(dump_probe_result(domain, result))
+            return 0
+        ordered: List[probe_result] = probe_many(nameservers, **options)
+    finally:
+        if history is not None:
+            history.close()
+    if cmds.args.sort is not None:
+        sort_probe_results(ordered, cmds.args.sort)
+    name: str = f"probe {domain}" if transport == "udp" \
+        else f"probe {domain} over {transport}"
+    cmds.stdout(tabulate(format_probe_results(name, ordered, transport,
+                                              cmds.args.count)))
+    return 0
 
 
 @ run_command(add_cmd_probe)
 def run_cmd_probe(cmds: commands) -> int:
-    nameservers: List[str] = cmds.args.nameservers
+    from ..utils.scan import parse_network
+
+    nameservers: List[str] = []
+    networks: List["NETWORK"] = []
+    for value in cmds.args.nameservers:
+        try:
+            network: Optional["NETWORK"] = parse_network(value)
+        except ValueError as e:
+            cmds.stderr(str(e))
+            return 2
+        if network is None:
+            nameservers.append(value)
+        else:
+            networks.append(network)
+    if len(networks) > 0:
+        run_cmd_probe_scan(cmds, networks)
     if len(nameservers) > 0:
-        domain = cmds.args.domain[0]
-        title: List[str] = ["nameserver", "ping", "resolve"]
-        table: form[str, str] = form(f"probe {domain}", title)
-        for nameserver in nameservers:
-            prober = dnsprobe.from_string(nameserver)
-            ping = prober.ping(lifetime=PING_MAX_TO)
-            test = prober.test(qname=domain, lifetime=RESOLVE_MAX_TO)
-            ping_delay = f"{ping * 1000:.2f}ms" if ping >= 0 else "Timeout"
-            test_delay = f"{test * 1000:.2f}ms" if test >= 0 else "Timeout"
-            table.append([nameserver, ping_delay, test_delay])
-        cmds.stdout(tabulate(table))
+        return run_cmd_probe_nameservers(cmds, nameservers)
+    return 0
+
+
+def format_score(value: float) -> str:
+    return "-" if isnan(value) else "Timeout" if value == inf \
+        else f"{value * 1000:.2f}ms"
+
+
+def format_ranking(name: str, ranking: List["health"]) -> form:
+    title: List[str] = ["nameserver", "score", "ewma", "p50", "p95", "loss",
+                        "probes"]
+    table: form[str, str] = form(name, title)
+    for server in ranking:
+        window: latency = server.resolve.window()
+        table.append([server.nameserver, format_score(server.score),
+                      format_delay(server.resolve.ewma),
+                      format_delay(window.p50), format_delay(window.p95),
+                      "-" if isnan(window.loss)
+                      else f"{window.loss * 100:.1f}%",
+                      str(server.resolve.total + server.ping.total)])
+    return table
+
+
+@ add_command("watch", help="rank nameservers by rolling health")
+def add_cmd_watch(_arg: argp):
+    _arg.add_argument("--domain", nargs=1, metavar="NAME",
+                      default=[EXAMPLE_DOMAIN], help="domain name for resolve")
+    _arg.add_argument("--interval", type=float, metavar="SEC", default=5.0,
+                      help="seconds between rounds, default is 5.0")
+    _arg.add_argument("--jitter", type=float, metavar="RATIO", default=0.1,
+                      help="randomize interval by +/-RATIO, default is 0.1")
+    _arg.add_argument("--budget", type=int, metavar="N", default=16,
+                      help="maximum probes per round, nameservers are "
+                      "probed in turn, default is 16")
+    _arg.add_argument("--window", type=int, metavar="N", default=60,
+                      help="samples kept per nameserver, default is 60")
+    _arg.add_argument("--alpha", type=float, metavar="ALPHA", default=0.2,
+                      help="EWMA smoothing factor, default is 0.2")
+    _arg.add_argument("--timeout", type=float, metavar="SEC", default=2.0,
+                      help="timeout of each resolve, default is 2.0")
+    _arg.add_argument("--iterations", type=int, metavar="N", default=0,
+                      help="stop after N rounds, default is 0 (forever)")
+    _arg.add_argument("--ping", action="store_true",
+                      help="also ping nameservers, one probe each")
+    _arg.add_argument("--concurrency", type=int, metavar="N",
+                      default=DEFAULT_CONCURRENCY,
+                      help=f"maximum concurrent probes, "
+                      f"default is {DEFAULT_CONCURRENCY}")
+    add_opt_output(_arg)
+    _arg.add_argument(dest="nameservers", nargs="*", metavar="NS", default=[],
+                      help="all extended nameservers")
+
+
+@ run_command(add_cmd_watch)
+def run_cmd_watch(cmds: commands) -> int:
+    from ..utils.watch import health
+    from ..utils.watch import watcher
+
+    if len(cmds.args.nameservers) == 0:
+        return 0
+    domain: str = cmds.args.domain[0]
+    watch = watcher(cmds.args.nameservers, qname=domain,
+                    interval=cmds.args.interval, jitter=cmds.args.jitter,
+                    budget=cmds.args.budget, window=cmds.args.window,
+                    alpha=cmds.args.alpha,
+                    resolve_timeout=cmds.args.timeout,
+                    enable_ping=cmds.args.ping,
+                    concurrency=cmds.args.concurrency,
+                    config=system_resolv_conf())
+    writer: Optional[record_writer] = record_writer(
+        cmds, cmds.args.output, ("round", "rank") + health.FIELDS) \
+        if cmds.args.output != "table" else None
+    try:
+        with watch:
+            for ranking in watch.run(cmds.args.iterations or None):
+                name: str = f"watch {domain} round {watch.rounds}"
+                if writer is None:
+                    cmds.stdout(name)
+                    cmds.stdout(tabulate(format_ranking(name, ranking)))
+                    continue
+                for rank, server in enumerate(ranking, start=1):
+                    writer.write({"round": watch.rounds, "rank": rank,
+                                  **server.dump()})
+    except KeyboardInterrupt:
+        pass
     return 0
 
 
@@ -151,22 +588,19 @@ def add_cmd_nameserver(_arg: argp):
     pass
 
 
-@ run_command(add_cmd_nameserver, add_cmd_probe, add_cmd_query)
+@ run_command(add_cmd_nameserver, add_cmd_probe, add_cmd_query,
+              add_cmd_watch)
 def run_cmd_nameserver(cmds: commands) -> int:
     nameservers: List[str] = []
-    if is_windows():
-        for iface in NetworkInterface.load():
-            if iface.mac_enabled and iface.ip_enabled and iface.dns_enabled:
-                servers = iface.nameservers
-                nameservers.extend(servers)
-                if not cmds.has_sub(add_cmd_nameserver):
-                    cmds.stdout(f"{iface.detail_name()}: {', '.join(servers)}")
-    elif is_unix():
-        servers = Context().nameservers
+    for iface, servers in system_nameservers():
         nameservers.extend(servers)
-        if not cmds.has_sub(add_cmd_nameserver):
-            for namespace in servers:
-                cmds.stdout(namespace)
+        if cmds.has_sub(add_cmd_nameserver):
+            continue
+        if iface is not None:
+            cmds.stdout(f"{iface.detail_name()}: {', '.join(servers)}")
+        else:
+            for nameserver in servers:
+                cmds.stdout(nameserver)
     if hasattr(cmds.args, "nameservers"):
         cmds.args.nameservers.extend(nameservers)
     else:
@@ -0,0 +1,94 @@
+# coding:utf-8
+# pylint: disable=import-outside-toplevel
+
+from typing import List
+from typing import Optional
+from typing import TYPE_CHECKING
+
+from xarg import add_command
+from xarg import argp
+from xarg import commands
+from xarg import run_command
+
+from ..utils.adapters import system_nameservers
+from ..utils.constants import EXAMPLE_DOMAIN
+from ..utils.constants import METRICS_LISTEN
+from ..utils.parallel import DEFAULT_CONCURRENCY
+from ..utils.resolvconf import system_resolv_conf
+from .output import add_opt_history
+
+if TYPE_CHECKING:
+    from ..utils.history import history_store
+
+
+@add_command("exporter", help="serve probe metrics over HTTP")
+def add_cmd_exporter(_arg: argp):
+    _arg.add_argument("--listen", type=str, metavar="[HOST]:PORT",
+                      default=METRICS_LISTEN,
+                      help=f"listen address, default is {METRICS_LISTEN}")
+    _arg.add_argument("--interval", type=float, metavar="SEC", default=15.0,
+                      help="seconds between probe rounds, default is 15.0")
+    _arg.add_argument("--domain", nargs=1, metavar="NAME",
+                      default=[EXAMPLE_DOMAIN], help="domain name for resolve")
+    _arg.add_argument("--timeout", type=float, metavar="SEC", default=2.0,
+                      help="timeout of each probe, default is 2.0")
+    _arg.add_argument("--ping", action="store_true",
+                      help="also ping nameservers")
+    _arg.add_argument("--public-ip", action="store_true",
+                      help="also query all public IP providers")
+    _arg.add_argument("--concurrency", type=int, metavar="N",
+                      default=DEFAULT_CONCURRENCY,
+                      help=f"maximum concurrent probes, "
+                      f"default is {DEFAULT_CONCURRENCY}")
+    add_opt_history(_arg)
+    _arg.add_argument(dest="nameservers", nargs="*", metavar="NS", default=[],
+                      help="nameservers to probe, default is the system "
+                      "nameservers")
+
+
+def serve_metrics(cmds: commands, nameservers: List[str],
+                  history: Optional["history_store"] = None) -> int:
+    from ..utils.exporter import metrics_exporter
+    from ..utils.public import public_ip
+
+    try:
+        server = metrics_exporter(nameservers, listen=cmds.args.listen,
+                                  qname=cmds.args.domain[0],
+                                  interval=cmds.args.interval,
+                                  resolve_timeout=cmds.args.timeout,
+                                  enable_ping=cmds.args.ping,
+                                  public_ip_flag=public_ip.flags.all
+                                  if cmds.args.public_ip else None,
+                                  concurrency=cmds.args.concurrency,
+                                  config=system_resolv_conf(),
+                                  history=history)
+    except ValueError as e:  # invalid listen address or nameserver
+        cmds.stderr(str(e))
+        return 2
+    except OSError as e:  # e.g. address already in use
+        cmds.stderr(f"cannot listen on {cmds.args.listen}: {e}")
+        return 1
+    with server:
+        host, port = server.address
+        host = f"[{host}]" if ":" in host else host or "*"
+        cmds.stdout(f"serving metrics on http://{host}:{port}/metrics")
+        try:
+            server.wait()
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+@run_command(add_cmd_exporter)
+def run_cmd_exporter(cmds: commands) -> int:
+    from ..utils.history import history_store
+
+    nameservers: List[str] = cmds.args.nameservers or [
+        server for _, servers in system_nameservers() for server in servers]
+    history = history_store(cmds.args.history) \
+        if cmds.args.history is not None else None
+    try:
+        return serve_metrics(cmds, nameservers, history)
+    finally:
+        if history is not None:
+            history.close()
@@ -0,0 +1,74 @@
+# coding:utf-8
+# pylint: disable=import-outside-toplevel
+
+import os
+import time
+from typing import Any
+from typing import Dict
+
+from xarg import add_command
+from xarg import argp
+from xarg import commands
+from xarg import form
+from xarg import run_command
+from xarg import tabulate
+
+from ..utils.constants import HISTORY_KINDS
+from ..utils.constants import HISTORY_PATH
+from ..utils.stats import STATISTICS
+from ..utils.stats import format_stats
+from ..utils.stats import latency
+from .output import add_opt_output
+from .output import record_writer
+
+HISTORY_FIELDS = ("target", "kind", "count") + latency.FIELDS
+
+
+@ add_command("history", help="summarize recorded probe history")
+def add_cmd_history(_arg: argp):
+    _arg.add_argument("--since", type=str, metavar="DURATION", default="7d",
+                      help="summarize samples of the last DURATION (e.g. "
+                      "90s, 30m, 12h, 7d or 2w), default is 7d")
+    _arg.add_argument("--server", type=str, metavar="TARGET", default=None,
+                      help="only the nameserver address or public IP site "
+                      "TARGET, default is all")
+    _arg.add_argument("--kind", type=str, default=None, choices=HISTORY_KINDS,
+                      help="only ping, resolve or public_ip samples")
+    _arg.add_argument("--file", type=str, metavar="FILE",
+                      default=HISTORY_PATH,
+                      help=f"history store, default is {HISTORY_PATH}")
+    add_opt_output(_arg)
+
+
+@ run_command(add_cmd_history)
+def run_cmd_history(cmds: commands) -> int:
+    from ..utils.history import history_store
+    from ..utils.history import parse_duration
+
+    try:
+        since: float = time.time() - parse_duration(cmds.args.since)
+    except ValueError as e:
+        cmds.stderr(str(e))
+        return 2
+    if not os.path.exists(os.path.expanduser(cmds.args.file)):
+        cmds.stderr(f"no history: {cmds.args.file}")
+        return 1
+    writer = record_writer(cmds, cmds.args.output, HISTORY_FIELDS) \
+        if cmds.args.output != "table" else None
+    table: form[str, str] = form(f"history since {cmds.args.since}",
+                                 ["target", "kind", "count"] +
+                                 list(STATISTICS))
+    with history_store(cmds.args.file) as history:
+        for target, kind, stats in history.summary(
+                since=since, target=cmds.args.server, kind=cmds.args.kind):
+            if writer is None:
+                table.append([target, kind, str(stats.count)] +
+                             format_stats(stats))
+                continue
+            record: Dict[str, Any] = {"target": target, "kind": kind,
+                                      "count": stats.count}
+            record.update(stats.dump())
+            writer.write(record)
+    if writer is None:
+        cmds.stdout(tabulate(table))
+    return 0
@@ -0,0 +1,75 @@
+# coding:utf-8
+
+from csv import writer as csv_writer
+from io import StringIO
+import json
+from math import isinf
+from math import isnan
+from typing import Any
+from typing import Dict
+from typing import Sequence
+
+from xarg import argp
+from xarg import commands
+
+from ..utils.constants import HISTORY_PATH
+
+OUTPUT_FORMATS = ("table", "jsonl", "csv")
+
+
+def add_opt_output(_arg: argp):
+    _arg.add_argument("--output", type=str, metavar="FORMAT",
+                      default="table", choices=OUTPUT_FORMATS,
+                      help="output format, jsonl and csv write one record "
+                      f"per result once it completes, choices are "
+                      f"{', '.join(OUTPUT_FORMATS)}, default is table")
+
+
+def add_opt_history(_arg: argp):
+    _arg.add_argument("--history", type=str, metavar="FILE", nargs="?",
+                      const=HISTORY_PATH, default=None,
+                      help="also record every sample in the history store "
+                      f"FILE, default is {HISTORY_PATH}")
+
+
+def format_value(value: Any) -> Any:
+    if isinstance(value, float):
+        return None if isnan(value) or isinf(value) else round(value, 3)
+    return value
+
+
+class record_writer():
+    '''Streaming Record Writer
+
+    Write each record as one JSON line or one CSV row, lists are joined with
+    spaces in CSV. The CSV header is written before the first record.
+    '''
+
+    def __init__(self, cmds: commands, fmt: str, fields: Sequence[str]):
+        assert fmt in ("jsonl", "csv"), f"unexpected format: {fmt}"
+        self.__cmds: commands = cmds
+        self.__fmt: str = fmt
+        self.__fields: Sequence[str] = fields
+        self.__header: bool = False
+
+    @property
+    def fields(self) -> Sequence[str]:
+        return self.__fields
+
+    def write(self, record: Dict[str, Any]) -> None:
+        values = {k: format_value(record.get(k)) for k in self.fields}
+        if self.__fmt == "jsonl":
+            self.__cmds.stdout(json.dumps(values, ensure_ascii=False))
+            return
+        if not self.__header:
+            self.__header = True
+            self.__cmds.stdout(self.csv_line(self.fields))
+        self.__cmds.stdout(self.csv_line(
+            " ".join(v) if isinstance(v, list) else "" if v is None else v
+            for v in values.values()))
+
+    @classmethod
+    def csv_line(cls, values) -> str:
+        buffer = StringIO()
+        csv_writer(buffer, lineterminator="").writerow(values)
+        return buffer.getvalue()
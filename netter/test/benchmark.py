@@ -0,0 +1,322 @@
+# coding:utf-8
+'''Offline benchmarks of the probe, query, public IP and interface paths
+
+Every benchmark runs against loopback stand-ins (see stubs), report the
+throughput and tail latency of each size:
+
+    python -m netter.test.benchmark --sizes 1 10 100 1000
+'''
+
+from argparse import ArgumentParser
+from contextlib import contextmanager
+import json
+import socket
+import subprocess
+import sys
+import time
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+from psutil import AF_LINK
+from psutil._common import snicaddr
+from xarg import form
+from xarg import tabulate
+
+from ..utils.adapters import Context
+from ..utils.adapters import NetworkInterface
+from ..utils.parallel import DEFAULT_CONCURRENCY
+from ..utils.prober import probe_engine
+from ..utils.public import public_ip
+from ..utils.public import public_ip_client
+from ..utils.query import query_domain_names
+from ..utils.query import resolver_diff
+from ..utils.stats import latency
+from .stubs import http_stub
+
+SIZES = (1, 10, 100, 1000)
+DOMAIN = "bench.example"
+
+
+def loopback_addresses(count: int) -> List[str]:
+    '''distinct loopback addresses, 127.0.0.1 first
+    '''
+    assert 0 < count <= 250 * 256, f"invalid count: {count}"
+    return [f"127.0.{i // 250}.{i % 250 + 1}" for i in range(count)]
+
+
+def bench_domains(count: int) -> Dict[str, List[str]]:
+    return {f"host{i}.{DOMAIN}": [f"198.51.100.{i % 256}"]
+            for i in range(count)}
+
+
+@contextmanager
+def spawn_dns_stub(zone: Dict[str, List[str]], addresses: Sequence[str],
+                   delay: float = 0.0, drop_rate: float = 0.0,
+                   nxdomain_ratio: float = 0.0) -> Iterator[int]:
+    '''serve dns_stub in a child process, yield its port
+
+    The stub holds two sockets per address, a separate process keeps them
+    (and the server threads) from competing with the code under test.
+    '''
+    command: List[str] = [
+        sys.executable, "-m", "netter.test.stubs", "--zone", json.dumps(zone),
+        "--latency", str(delay), "--drop-rate", str(drop_rate),
+        "--nxdomain-ratio", str(nxdomain_ratio), "--addresses", *addresses]
+    with subprocess.Popen(command, stdin=subprocess.PIPE,
+                          stdout=subprocess.PIPE, text=True) as proc:
+        assert proc.stdin is not None and proc.stdout is not None
+        try:
+            yield int(proc.stdout.readline())
+        finally:
+            proc.stdin.close()
+            proc.wait(timeout=10)
+
+
+class report():
+    '''Benchmark Report of one (benchmark, size)
+    '''
+
+    FIELDS = ("bench", "size", "ops", "elapsed_s", "qps", "p50_ms",
+              "p95_ms", "p99_ms", "max_ms", "loss")
+
+    def __init__(self, bench: str, size: int, elapsed: float,
+                 delays: Iterable[float]):
+        self.__bench: str = bench
+        self.__size: int = size
+        self.__elapsed: float = elapsed
+        self.__stats: latency = latency(delays)
+
+    @property
+    def bench(self) -> str:
+        return self.__bench
+
+    @property
+    def size(self) -> int:
+        return self.__size
+
+    @property
+    def elapsed(self) -> float:
+        return self.__elapsed
+
+    @property
+    def stats(self) -> latency:
+        '''latency of each operation, lost operations are negative
+        '''
+        return self.__stats
+
+    @property
+    def qps(self) -> float:
+        return self.stats.count / self.elapsed if self.elapsed > 0 else 0.0
+
+    def dump(self) -> Dict[str, Any]:
+        return {"bench": self.bench, "size": self.size,
+                "ops": self.stats.count, "elapsed_s": self.elapsed,
+                "qps": self.qps, "p50_ms": self.stats.p50 * 1000,
+                "p95_ms": self.stats.p95 * 1000,
+                "p99_ms": self.stats.percentile(99) * 1000,
+                "max_ms": self.stats.max * 1000, "loss": self.stats.loss}
+
+
+def timeit(bench: str, size: int,
+           run: Callable[[], Iterable[float]]) -> report:
+    start: float = time.perf_counter()
+    delays: List[float] = list(run())
+    return report(bench, size, time.perf_counter() - start, delays)
+
+
+def bench_probe(size: int, delay: float = 0.0, drop_rate: float = 0.0,
+                concurrency: int = DEFAULT_CONCURRENCY,
+                enable_ping: bool = True) -> report:
+    '''probe size nameservers, ping and resolve each once
+    '''
+    addresses: List[str] = loopback_addresses(size)
+    with spawn_dns_stub(bench_domains(1), addresses, delay=delay,
+                        drop_rate=drop_rate) as port:
+        engine = probe_engine(concurrency=concurrency, ping_timeout=1,
+                              resolve_timeout=1.0)
+
+        def run() -> Iterable[float]:
+            for result in engine.probe(addresses, qname=f"host0.{DOMAIN}",
+                                       enable_ping=enable_ping, port=port):
+                assert isinstance(result.resolve, latency)
+                yield result.resolve.avg if result.resolve.received > 0 \
+                    else -1.0
+        return timeit("probe", size, run)
+
+
+def bench_query(size: int, delay: float = 0.0, drop_rate: float = 0.0,
+                nxdomain_ratio: float = 0.0,
+                concurrency: int = DEFAULT_CONCURRENCY) -> report:
+    '''query size domain names from one nameserver (bulk mode)
+    '''
+    zone = bench_domains(size)
+    with spawn_dns_stub(zone, ["127.0.0.1"], delay=delay,
+                        drop_rate=drop_rate,
+                        nxdomain_ratio=nxdomain_ratio) as port:
+        def run() -> Iterable[float]:
+            for result in query_domain_names(
+                    zone, ["127.0.0.1"], concurrency=concurrency,
+                    port=port):
+                yield -1.0 if result.error == "Timeout" else result.delay
+        return timeit("query", size, run)
+
+
+def bench_query_nameservers(size: int, delay: float = 0.0,
+                            drop_rate: float = 0.0,
+                            concurrency: int = DEFAULT_CONCURRENCY
+                            ) -> report:
+    '''query one domain name from size nameservers
+    '''
+    addresses: List[str] = loopback_addresses(size)
+    with spawn_dns_stub(bench_domains(1), addresses, delay=delay,
+                        drop_rate=drop_rate) as port:
+        def run() -> Iterable[float]:
+            for result in query_domain_names(
+                    [f"host0.{DOMAIN}"], addresses,
+                    concurrency=concurrency, port=port):
+                yield -1.0 if result.error == "Timeout" else result.delay
+        return timeit("query-ns", size, run)
+
+
+def bench_diff(size: int, delay: float = 0.0, drop_rate: float = 0.0,
+               resolvers: int = 20,
+               concurrency: int = DEFAULT_CONCURRENCY) -> report:
+    '''diff size domain names across resolvers (20 by default)
+    '''
+    zone = bench_domains(size)
+    addresses: List[str] = loopback_addresses(resolvers)
+    with spawn_dns_stub(zone, addresses, delay=delay,
+                        drop_rate=drop_rate) as port:
+        def run() -> Iterable[float]:
+            engine = resolver_diff(addresses, ["A"])
+            for result in query_domain_names(
+                    zone, addresses, concurrency=concurrency, port=port):
+                engine.add(result)
+                yield -1.0 if result.error == "Timeout" else result.delay
+        return timeit("diff", size, run)
+
+
+def bench_public_ip(size: int, delay: float = 0.0) -> report:
+    '''size sequential queries through one keep-alive client
+    '''
+    with http_stub({"/ip": (delay, 200, "203.0.113.1")}) as stub:
+        urls = {public_ip.flags.ipinfo: stub.url("/ip")}
+
+        def run() -> Iterable[float]:
+            with public_ip_client(timeout=1.0, urls=urls) as client:
+                for _ in range(size):
+                    result = client.request(public_ip.flags.ipinfo)
+                    yield result.delay if result.error is None else -1.0
+        return timeit("public-ip", size, run)
+
+
+def bench_interfaces(size: int) -> report:
+    '''enumerate network interfaces size times
+    '''
+    def run() -> Iterable[float]:
+        for _ in range(size):
+            start: float = time.perf_counter()
+            for _ in NetworkInterface.load():
+                pass
+            yield time.perf_counter() - start
+    return timeit("interfaces", size, run)
+
+
+def synthetic_interfaces(count: int
+                         ) -> List[Tuple[str, List[snicaddr]]]:
+    '''(name, addresses) like psutil.net_if_addrs() on a container node
+
+    Every interface is a veth with a MAC, an IPv4 and a link-local IPv6
+    address.
+    '''
+    def addresses(i: int) -> List[snicaddr]:
+        mac: bytes = (0x0242 << 32 | i).to_bytes(6, "big")
+        return [snicaddr(AF_LINK, mac.hex(":"), None, "ff:ff:ff:ff:ff:ff",
+                         None),
+                snicaddr(socket.AF_INET, f"10.{i >> 16 & 0xFF}."
+                         f"{i >> 8 & 0xFF}.{i & 0xFF}", "255.0.0.0", None,
+                         None),
+                snicaddr(socket.AF_INET6, f"fe80::42:{i >> 16:x}:"
+                         f"{i & 0xFFFF:x}%veth{i:05x}",
+                         "ffff:ffff:ffff:ffff::", None, None)]
+    return [(f"veth{i:05x}", addresses(i)) for i in range(count)]
+
+
+def bench_interfaces_synthetic(size: int) -> report:
+    '''build size synthetic interfaces and format their addresses
+    '''
+    interfaces = synthetic_interfaces(size)
+    context: Context = Context()
+
+    def run() -> Iterable[float]:
+        for name, addrs in interfaces:
+            start: float = time.perf_counter()
+            iface = NetworkInterface(name, addrs, context)
+            _ = (iface.mac_address.colon, iface.ip_address,
+                 iface.detail_name())
+            yield time.perf_counter() - start
+    return timeit("interfaces-synthetic", size, run)
+
+
+BENCHMARKS: Dict[str, Callable[..., report]] = {
+    "probe": bench_probe,
+    "query": bench_query,
+    "query-ns": bench_query_nameservers,
+    "diff": bench_diff,
+    "public-ip": bench_public_ip,
+    "interfaces": bench_interfaces,
+    "interfaces-synthetic": bench_interfaces_synthetic,
+}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = ArgumentParser(prog="python -m netter.test.benchmark",
+                            description="offline netter benchmarks")
+    parser.add_argument("--bench", nargs="+", default=list(BENCHMARKS),
+                        choices=list(BENCHMARKS), metavar="NAME",
+                        help=f"benchmarks, default is all of "
+                        f"{', '.join(BENCHMARKS)}")
+    parser.add_argument("--sizes", nargs="+", type=int, default=SIZES,
+                        metavar="N", help="nameservers or domain names, "
+                        f"default is {' '.join(str(n) for n in SIZES)}")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        metavar="SEC", help="stub response latency")
+    parser.add_argument("--drop-rate", type=float, default=0.0,
+                        metavar="RATE", help="stub DNS drop rate")
+    parser.add_argument("--nxdomain-ratio", type=float, default=0.0,
+                        metavar="RATIO", help="stub DNS NXDOMAIN ratio")
+    parser.add_argument("--jsonl", action="store_true",
+                        help="write one JSON line per report")
+    args = parser.parse_args(argv)
+
+    table: form[str, Any] = form("benchmark", list(report.FIELDS))
+    for name in args.bench:
+        for size in args.sizes:
+            kwargs: Dict[str, Any] = {}
+            if not name.startswith("interfaces"):
+                kwargs["delay"] = args.latency
+            if name in ("probe", "query", "query-ns", "diff"):
+                kwargs["drop_rate"] = args.drop_rate
+            if name == "query":
+                kwargs["nxdomain_ratio"] = args.nxdomain_ratio
+            record = BENCHMARKS[name](size, **kwargs).dump()
+            if args.jsonl:
+                sys.stdout.write(json.dumps(record) + "\n")
+                sys.stdout.flush()
+                continue
+            table.append([f"{v:.3f}" if isinstance(v, float) else v
+                          for v in record.values()])
+    if not args.jsonl:
+        sys.stdout.write(tabulate(table) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,468 @@
+# coding:utf-8
+
+from argparse import ArgumentParser
+from heapq import heappop
+from heapq import heappush
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+import json
+from random import Random
+from selectors import DefaultSelector
+from selectors import EVENT_READ
+import socket
+from ssl import SSLContext
+import struct
+import sys
+from threading import Condition
+from threading import Lock
+from threading import Thread
+import time
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Set
+from typing import Tuple
+
+from dns.flags import TC
+from dns.message import Message
+from dns.message import from_wire
+from dns.message import make_response
+from dns.rcode import NXDOMAIN
+from dns.rdataclass import IN
+from dns.rdatatype import SOA
+from dns.rdatatype import to_text
+from dns.rrset import from_text_list
+
+RESPONSE = Tuple[float, int, str]  # delay, status, body
+
+
+class http_stub():
+    '''Local HTTP Stand-in Server
+
+    Serve fixed responses by path on loopback, each response can be delayed
+    to simulate slow or hung sites.
+    '''
+
+    def __init__(self, routes: Optional[Dict[str, RESPONSE]] = None):
+        self.__routes: Dict[str, RESPONSE] = dict(routes or {})
+        self.__requests: int = 0
+        self.__connections: int = 0
+        stub = self
+
+        class handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True  # headers and body are 2 writes
+
+            def setup(self):
+                stub.connect()
+                super().setup()
+
+            def do_GET(self):  # pylint: disable=invalid-name
+                stub.count()
+                delay, status, body = stub.routes.get(
+                    self.path, (0.0, 404, "Not Found"))
+                if delay > 0:
+                    time.sleep(delay)
+                data: bytes = body.encode()
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except OSError:
+                    pass  # client gave up
+
+            def log_message(self, *args):  # pylint: disable=arguments-differ
+                pass
+
+        self.__server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.__server.daemon_threads = True
+        self.__thread = Thread(target=self.__server.serve_forever,
+                               daemon=True)
+
+    def __enter__(self) -> "http_stub":
+        self.__thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.__server.shutdown()
+        self.__server.server_close()
+
+    @property
+    def routes(self) -> Dict[str, RESPONSE]:
+        return self.__routes
+
+    @property
+    def requests(self) -> int:
+        return self.__requests
+
+    @property
+    def connections(self) -> int:
+        return self.__connections
+
+    @property
+    def port(self) -> int:
+        return self.__server.server_address[1]
+
+    def count(self) -> None:
+        self.__requests += 1
+
+    def connect(self) -> None:
+        self.__connections += 1
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.port}{path}"
+
+
+class dns_stub():
+    '''Local DNS Stand-in Server (UDP and TCP, or TLS)
+
+    Answer A/AAAA records from zone, names not in zone are NXDOMAIN, other
+    record types are NoAnswer. Negative answers carry an SOA whose minimum
+    is negative_ttl.
+
+    The same port is served on every address (e.g. 127.0.0.1, 127.0.0.2 to
+    emulate many nameservers on loopback). Each answer is delayed latency
+    seconds, drop_rate of queries are ignored and nxdomain_ratio of names
+    in zone are answered NXDOMAIN. With truncate, UDP answers are
+    truncated (TC) to force a retry over TCP. With ssl_context, TCP
+    connections are TLS (DNS over TLS). Pipelined TCP queries are answered
+    independently, each one latency seconds after it is received.
+    '''
+
+    def __init__(self, zone: Optional[Dict[str, List[str]]] = None,
+                 ttl: int = 300, negative_ttl: int = 60,
+                 addresses: Sequence[str] = ("127.0.0.1",),
+                 latency: float = 0.0, drop_rate: float = 0.0,
+                 nxdomain_ratio: float = 0.0, seed: int = 0,
+                 truncate: bool = False,
+                 ssl_context: Optional[SSLContext] = None):
+        assert len(addresses) > 0, "no address to listen"
+        assert 0.0 <= drop_rate <= 1.0, f"invalid drop rate: {drop_rate}"
+        assert 0.0 <= nxdomain_ratio <= 1.0, \
+            f"invalid nxdomain ratio: {nxdomain_ratio}"
+        self.__zone: Dict[str, List[str]] = {
+            name.rstrip(".").lower() + ".": addrs
+            for name, addrs in (zone or {}).items()}
+        self.__ttl: int = ttl
+        self.__negative_ttl: int = negative_ttl
+        self.__latency: float = latency
+        self.__drop_rate: float = drop_rate
+        self.__truncate: bool = truncate
+        self.__ssl_context: Optional[SSLContext] = ssl_context
+        self.__tcp_queries: int = 0
+        self.__tcp_connections: int = 0
+        self.__random: Random = Random(seed)
+        self.__nxdomains: Set[str] = {
+            name for name in self.__zone
+            if self.__random.random() < nxdomain_ratio}
+        self.__queries: int = 0
+        self.__dropped: int = 0
+        self.__lock: Lock = Lock()
+        self.__closed: bool = False
+        self.__udp: List[socket.socket] = []
+        self.__tcp: List[socket.socket] = []
+        port: int = 0
+        for address in addresses:
+            udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            udp.bind((address, port))
+            port = udp.getsockname()[1]
+            tcp = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            tcp.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            tcp.bind((address, port))
+            tcp.listen(64)
+            self.__udp.append(udp)
+            self.__tcp.append(tcp)
+        self.__addresses: Tuple[str, ...] = tuple(addresses)
+        self.__port: int = port
+        self.__delayed: List[Tuple[float, int, socket.socket, bytes,
+                                   Tuple[str, int]]] = []
+        self.__pending: Condition = Condition(self.__lock)
+        self.__threads: List[Thread] = [
+            Thread(target=self.serve, daemon=True),
+            Thread(target=self.deliver, daemon=True)]
+
+    def __enter__(self) -> "dns_stub":
+        for thread in self.__threads:
+            thread.start()
+        return self
+
+    def __exit__(self, *args):
+        with self.__lock:
+            self.__closed = True
+            self.__pending.notify_all()
+        for sock in self.__udp + self.__tcp:
+            sock.close()
+
+    @property
+    def address(self) -> str:
+        return self.__addresses[0]
+
+    @property
+    def addresses(self) -> Tuple[str, ...]:
+        return self.__addresses
+
+    @property
+    def port(self) -> int:
+        return self.__port
+
+    @property
+    def latency(self) -> float:
+        return self.__latency
+
+    @property
+    def queries(self) -> int:
+        return self.__queries
+
+    @property
+    def dropped(self) -> int:
+        return self.__dropped
+
+    @property
+    def tcp_queries(self) -> int:
+        return self.__tcp_queries
+
+    @property
+    def tcp_connections(self) -> int:
+        return self.__tcp_connections
+
+    def respond(self, query: Message) -> Message:
+        response = make_response(query)
+        question = query.question[0]
+        qname: str = question.name.to_text().lower()
+        rdtype: str = to_text(question.rdtype)
+        addrs = [addr for addr in self.__zone.get(qname, [])
+                 if (":" in addr) == (rdtype == "AAAA")] \
+            if qname not in self.__nxdomains else []
+        if qname not in self.__zone or qname in self.__nxdomains:
+            response.set_rcode(NXDOMAIN)
+        if len(addrs) > 0 and rdtype in ("A", "AAAA"):
+            response.answer.append(from_text_list(
+                qname, self.__ttl, IN, rdtype, addrs))
+        else:
+            response.authority.append(from_text_list(
+                qname, self.__negative_ttl, IN, SOA,
+                [f"ns. admin. 1 3600 600 86400 {self.__negative_ttl}"]))
+        return response
+
+    def handle(self, data: bytes, tcp: bool = False) -> Optional[bytes]:
+        '''count the query, return the response or None if dropped
+        '''
+        with self.__lock:
+            self.__queries += 1
+            if tcp:
+                self.__tcp_queries += 1
+            if self.__random.random() < self.__drop_rate:
+                self.__dropped += 1
+                return None
+        try:
+            response = self.respond(from_wire(data))
+            if self.__truncate and not tcp:
+                response.flags |= TC
+                response.answer.clear()
+                response.authority.clear()
+            return response.to_wire()
+        except Exception:  # pylint: disable=broad-except
+            return None
+
+    def serve(self) -> None:
+        listeners: Dict[socket.socket, bool] = {
+            sock: False for sock in self.__udp}
+        listeners.update({sock: True for sock in self.__tcp})
+        with DefaultSelector() as selector:
+            for sock in listeners:
+                selector.register(sock, EVENT_READ)
+            while not self.__closed:
+                try:
+                    events = selector.select(timeout=0.1)
+                except (OSError, ValueError):
+                    break
+                for key, _ in events:
+                    sock = key.fileobj
+                    try:
+                        if listeners[sock]:  # type: ignore
+                            conn, _ = sock.accept()  # type: ignore
+                            Thread(target=self.serve_tcp, args=(conn,),
+                                   daemon=True).start()
+                            continue
+                        data, addr = sock.recvfrom(4096)  # type: ignore
+                    except OSError:
+                        continue
+                    response = self.handle(data)
+                    if response is not None:
+                        self.send(sock, response, addr)  # type: ignore
+
+    def serve_tcp(self, conn: socket.socket) -> None:
+        with self.__lock:
+            self.__tcp_connections += 1
+        buffer: bytes = b""
+        delayed: List[Tuple[float, int, bytes]] = []
+        with conn:
+            try:
+                if self.__ssl_context is not None:
+                    conn.settimeout(2.0)
+                    conn = self.__ssl_context.wrap_socket(
+                        conn, server_side=True)
+                while not self.__closed:
+                    now: float = time.perf_counter()
+                    while delayed and delayed[0][0] <= now:
+                        response: bytes = heappop(delayed)[2]
+                        conn.sendall(struct.pack("!H", len(response)) +
+                                     response)
+                    conn.settimeout(max(0.001, min(0.1, delayed[0][0] - now))
+                                    if delayed else 0.1)
+                    try:
+                        chunk: bytes = conn.recv(65535)
+                    except socket.timeout:
+                        continue
+                    if not chunk:
+                        break
+                    buffer += chunk
+                    while len(buffer) >= 2:
+                        size: int = struct.unpack_from("!H", buffer)[0]
+                        if len(buffer) < 2 + size:
+                            break
+                        answer = self.handle(buffer[2:2 + size], tcp=True)
+                        buffer = buffer[2 + size:]
+                        if answer is not None:
+                            due: float = time.perf_counter() + self.__latency
+                            heappush(delayed, (due, len(delayed), answer))
+            except (OSError, ValueError):
+                pass
+
+    def send(self, sock: socket.socket, data: bytes,
+             addr: Tuple[str, int]) -> None:
+        if self.__latency <= 0:
+            try:
+                sock.sendto(data, addr)
+            except OSError:
+                pass
+            return
+        with self.__lock:
+            due: float = time.perf_counter() + self.__latency
+            heappush(self.__delayed, (due, self.__queries, sock, data, addr))
+            self.__pending.notify()
+
+    def deliver(self) -> None:
+        '''send delayed UDP responses once they are due
+        '''
+        while True:
+            with self.__lock:
+                while not self.__closed:
+                    now: float = time.perf_counter()
+                    if self.__delayed and self.__delayed[0][0] <= now:
+                        break
+                    self.__pending.wait(self.__delayed[0][0] - now
+                                        if self.__delayed else None)
+                if self.__closed:
+                    return
+                _, _, sock, data, addr = heappop(self.__delayed)
+            try:
+                sock.sendto(data, addr)
+            except OSError:
+                pass
+
+
+class doh_stub():
+    '''Local DNS over HTTPS Stand-in Server
+
+    POST /dns-query (RFC 8484) over kept-alive HTTPS connections, queries
+    are answered by a dns_stub (not started, only its zone and behaviour
+    are used), each one delayed by its latency.
+    '''
+
+    def __init__(self, dns: dns_stub, ssl_context: SSLContext,
+                 path: str = "/dns-query"):
+        self.__dns: dns_stub = dns
+        self.__connections: int = 0
+        stub = self
+
+        class handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                stub.connect()
+                self.request.settimeout(2.0)
+                self.request = ssl_context.wrap_socket(self.request,
+                                                       server_side=True)
+                super().setup()
+
+            def do_POST(self):  # pylint: disable=invalid-name
+                body: bytes = self.rfile.read(
+                    int(self.headers.get("Content-Length", 0)))
+                response = stub.dns.handle(body, tcp=True) \
+                    if self.path == path else None
+                if response is None:
+                    self.send_error(404 if self.path != path else 400)
+                    return
+                if stub.dns.latency > 0:
+                    time.sleep(stub.dns.latency)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/dns-message")
+                self.send_header("Content-Length", str(len(response)))
+                self.end_headers()
+                self.wfile.write(response)
+
+            def log_message(self, *args):  # pylint: disable=arguments-differ
+                pass
+
+        self.__server = ThreadingHTTPServer((dns.address, 0), handler)
+        self.__server.daemon_threads = True
+        self.__thread = Thread(target=self.__server.serve_forever,
+                               daemon=True)
+
+    def __enter__(self) -> "doh_stub":
+        self.__thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.__server.shutdown()
+        self.__server.server_close()
+
+    @property
+    def dns(self) -> dns_stub:
+        return self.__dns
+
+    @property
+    def address(self) -> str:
+        return self.__dns.address
+
+    @property
+    def port(self) -> int:
+        return self.__server.server_address[1]
+
+    @property
+    def connections(self) -> int:
+        return self.__connections
+
+    def connect(self) -> None:
+        self.__connections += 1
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    '''serve a DNS stand-in in this process until stdin is closed
+
+    The port is written to stdout once the server is ready, so benchmarks
+    can keep the server sockets (and the GIL) out of the client process.
+    '''
+    parser = ArgumentParser(prog="python -m netter.test.stubs")
+    parser.add_argument("--zone", type=str, default="{}",
+                        help="JSON object of {name: [addresses]}")
+    parser.add_argument("--addresses", nargs="+", default=["127.0.0.1"])
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--nxdomain-ratio", type=float, default=0.0)
+    args = parser.parse_args(argv)
+    with dns_stub(json.loads(args.zone), addresses=args.addresses,
+                  latency=args.latency, drop_rate=args.drop_rate,
+                  nxdomain_ratio=args.nxdomain_ratio) as stub:
+        sys.stdout.write(f"{stub.port}\n")
+        sys.stdout.flush()
+        sys.stdin.read()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,18 @@
 # coding:utf-8
 
+from contextlib import redirect_stdout
+import io
+import json
+import os
+import tempfile
+import time
 import unittest
 
 from xarg import commands
 from xarg.attribute import __version__
 
 from netter.cmds import main
+from netter.test.stubs import dns_stub
 
 
 class test_nameserver(unittest.TestCase):
@@ -30,6 +37,22 @@ class test_nameserver(unittest.TestCase):
     def test_probe(self):
         self.assertEqual(main("nameserver probe 8.8.8.8".split()), 0)
 
+    def test_probe_transport(self):
+        with dns_stub({"a.test": ["192.0.2.1"]}) as stub:
+            self.assertEqual(main(["nameserver", "probe", "--transport", "tcp",
+                                   "--port", str(stub.port), "--domain",
+                                   "a.test", "--count", "2", "--pipeline",
+                                   stub.address]), 0)
+            self.assertGreaterEqual(stub.tcp_queries, 2)
+
+    def test_probe_scan(self):
+        with dns_stub(addresses=("127.0.0.2",)) as stub:
+            self.assertEqual(main(["nameserver", "probe", "--port",
+                                   str(stub.port), "--timeout", "0.2",
+                                   "127.0.0.0/30"]), 0)
+            self.assertEqual(stub.queries, 1)
+        self.assertEqual(main("nameserver probe 10.0.0.0/40".split()), 2)
+
     def test_query_ipv6(self):
         self.assertEqual(
             main("nameserver query -6 example.com 8.8.8.8".split()), 0)
@@ -37,3 +60,42 @@ class test_nameserver(unittest.TestCase):
     def test_query_and_ping(self):
         self.assertEqual(
             main("nameserver query --ping example.com 8.8.8.8".split()), 0)
+        self.assertEqual(main("nameserver query --ping --count 2 --interval 0 "
+                              "--deadline 0.5 example.com "
+                              "127.0.0.1".split()), 0)
+
+    def test_query_deadline(self):
+        start = time.perf_counter()
+        self.assertEqual(main("nameserver query -6 --deadline 0.5 "
+                              "example.com 127.0.0.1 127.0.0.2".split()), 0)
+        self.assertLess(time.perf_counter() - start, 3.0)
+
+    def test_query_types(self):
+        self.assertEqual(main("nameserver query --type A,MX,TXT --deadline "
+                              "0.5 --consistency --output jsonl example.com "
+                              "127.0.0.1".split()), 0)
+        self.assertEqual(main("nameserver query --type A,MX --deadline 0.5 "
+                              "--diff example.com 127.0.0.1".split()), 0)
+        self.assertEqual(main("nameserver query --type A,BOGUS "
+                              "example.com".split()), 2)
+
+    def test_query_bulk(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "domains.txt")
+            with open(path, "w", encoding="utf-8") as whdl:
+                whdl.write("example.com\n# comment\n\nfoo..bar\n"
+                           "example.org\n")
+            output = io.StringIO()
+            with redirect_stdout(output):
+                self.assertEqual(main(["nameserver", "query", "--deadline",
+                                       "0.5", "--output", "jsonl", "--input",
+                                       path, "127.0.0.1"]), 0)
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual({record["domain"] for record in records},
+                         {"example.com", "foo..bar", "example.org"})
+        self.assertIn("EmptyLabel", [record["error"] for record in records])
+
+    def test_watch(self):
+        self.assertEqual(main("nameserver watch --iterations 2 --interval 0 "
+                              "--budget 1 --output jsonl 127.0.0.1".split()),
+                         0)
@@ -0,0 +1,29 @@
+# coding:utf-8
+
+import os
+import socket
+import tempfile
+import unittest
+
+from netter.cmds import main
+
+
+class test_exporter(unittest.TestCase):
+
+    def test_startup_errors(self):
+        self.assertEqual(main(["exporter", "--listen", "::1:80",
+                               "127.0.0.1"]), 2)
+        self.assertEqual(main(["exporter", "--listen", "127.0.0.1:0",
+                               "not-an-address"]), 2)
+        with socket.socket() as sock, tempfile.TemporaryDirectory() as tmp:
+            sock.bind(("127.0.0.1", 0))
+            sock.listen()
+            listen = "127.0.0.1:{}".format(sock.getsockname()[1])
+            path = os.path.join(tmp, "history.sqlite3")
+            self.assertEqual(main(["exporter", "--listen", listen,
+                                   "--history", path, "127.0.0.1"]), 1)
+            os.remove(path)  # released, also on Windows
+
+
+if __name__ == "__main__":
+    unittest.main()
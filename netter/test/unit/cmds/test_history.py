@@ -0,0 +1,31 @@
+# coding:utf-8
+
+import os
+import tempfile
+import unittest
+
+from netter.cmds import main
+from netter.test.stubs import dns_stub
+
+
+class test_history(unittest.TestCase):
+
+    def test_probe_and_history(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            path = os.path.join(tempdir, "history.sqlite3")
+            with dns_stub({"a.test": ["192.0.2.1"]}) as stub:
+                self.assertEqual(main(["nameserver", "probe", "--history",
+                                       path, "--port", str(stub.port),
+                                       "--domain", "a.test",
+                                       stub.address]), 0)
+            self.assertEqual(main(["history", "--file", path, "--since",
+                                   "1h", "--server", stub.address]), 0)
+            self.assertEqual(main(["history", "--file", path, "--output",
+                                   "jsonl", "--kind", "resolve"]), 0)
+            self.assertEqual(main(["history", "--file", path, "--since",
+                                   "1y"]), 2)
+        self.assertEqual(main(["history", "--file", path]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+# coding:utf-8
+
+import unittest
+
+from netter.cmds.output import record_writer
+
+
+class lines_commands():
+
+    def __init__(self):
+        self.lines = []
+
+    def stdout(self, context):
+        self.lines.append(str(context))
+
+
+class test_record_writer(unittest.TestCase):
+
+    def test_jsonl(self):
+        cmds = lines_commands()
+        writer = record_writer(cmds, "jsonl", ("name", "answer", "delay"))
+        writer.write({"name": "a", "answer": ["1", "2"], "delay": 1.23456})
+        writer.write({"name": "b", "delay": float("nan")})
+        self.assertEqual(cmds.lines, [
+            '{"name": "a", "answer": ["1", "2"], "delay": 1.235}',
+            '{"name": "b", "answer": null, "delay": null}'])
+
+    def test_csv(self):
+        cmds = lines_commands()
+        writer = record_writer(cmds, "csv", ("name", "answer", "error"))
+        writer.write({"name": "a", "answer": ["1", "2"]})
+        writer.write({"name": "b,c", "answer": [], "error": "Timeout"})
+        self.assertEqual(cmds.lines, ["name,answer,error", "a,1 2,",
+                                      '"b,c",,Timeout'])
+
+
+if __name__ == "__main__":
+    unittest.main()
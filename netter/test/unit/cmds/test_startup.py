@@ -0,0 +1,52 @@
+# coding:utf-8
+
+import subprocess
+import sys
+from typing import Dict
+from typing import Tuple
+import unittest
+
+# netter's own share of the cold start (excluding xarg), in microseconds
+STARTUP_BUDGET = 100000
+HEAVY_MODULES = ("dns", "ping3", "psutil", "requests", "wmi")
+
+
+def import_times(*args: str) -> Dict[str, Tuple[int, int]]:
+    '''run `netter ARGS` with -X importtime, return {module: (self, cumul)}
+    '''
+    code = "from netter.cmds import main\n" \
+        f"try:\n    main({list(args)!r})\nexcept SystemExit:\n    pass\n"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                          check=True, text=True)
+    times: Dict[str, Tuple[int, int]] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _self, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(_self), int(cumulative))
+    return times
+
+
+class test_startup(unittest.TestCase):
+
+    def test_public_ip_help(self):
+        times = import_times("public-ip", "--help")
+        for module in HEAVY_MODULES:
+            self.assertNotIn(module, times)
+        cost: int = times["netter.cmds"][1] - times["xarg"][1]
+        self.assertLess(cost, STARTUP_BUDGET)
+
+    def test_nameserver_help(self):
+        times = import_times("nameserver", "query", "--help")
+        for module in HEAVY_MODULES:
+            self.assertNotIn(module, times)
+
+    def test_exporter_help(self):
+        times = import_times("exporter", "--help")
+        for module in HEAVY_MODULES:
+            self.assertNotIn(module, times)
+
+
+if __name__ == "__main__":
+    unittest.main()
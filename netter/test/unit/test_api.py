@@ -0,0 +1,59 @@
+# coding:utf-8
+
+import asyncio
+import unittest
+
+import netter
+from netter.test.stubs import dns_stub
+from netter.test.stubs import http_stub
+
+
+class test_api(unittest.TestCase):
+
+    def test_probe_many(self):
+        with dns_stub({"a.test": ["192.0.2.1"]},
+                      addresses=("127.0.0.2", "127.0.0.3")) as stub:
+            nameservers = ["127.0.0.3", "127.0.0.2", "127.0.0.3"]
+            results = netter.probe_many(nameservers, qname="a.test",
+                                        port=stub.port, enable_ping=False,
+                                        count=2)
+            self.assertEqual([r.nameserver for r in results],
+                             ["127.0.0.3", "127.0.0.2"])
+            self.assertTrue(all(r.resolve.received == 2 for r in results))
+            results = asyncio.run(netter.probe_async(
+                nameservers, qname="a.test", port=stub.port,
+                enable_ping=False))
+            self.assertEqual(len(results), 2)
+
+    def test_query_many(self):
+        with dns_stub({"a.test": ["192.0.2.1"]}) as stub:
+            results = netter.query_many(["a.test", "b.test"], [stub.address],
+                                        port=stub.port, rdtypes=["A"])
+            answers = {r.domain: r.answer_text for r in results}
+            self.assertEqual(answers["a.test"], ("192.0.2.1",))
+            self.assertEqual(answers["b.test"], ("NXDOMAIN",))
+
+            async def gather():
+                return await asyncio.gather(*(netter.query_async(
+                    [domain], [stub.address], port=stub.port)
+                    for domain in ("a.test", "b.test")))
+            self.assertEqual([len(results) for results in asyncio.run(
+                gather())], [1, 1])
+
+    def test_ping_async(self):
+        try:
+            delays = asyncio.run(netter.ping_async(["127.0.0.1"], count=2))
+        except OSError as error:
+            self.skipTest(f"ICMP socket not permitted: {error}")
+        self.assertEqual(len(delays["127.0.0.1"]), 2)
+
+    def test_public_ip_async(self):
+        with http_stub({"/ident": (0.0, 200, "203.0.113.1\n")}) as stub:
+            results = asyncio.run(netter.public_ip_async(
+                ["ident"], urls={"ident": stub.url("/ident")}))
+        self.assertEqual([r.address for r in results], ["203.0.113.1"])
+        self.assertRaises(ValueError, netter.public_ip_many, ["nowhere"])
+
+
+if __name__ == "__main__":
+    unittest.main()
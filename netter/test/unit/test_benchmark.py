@@ -0,0 +1,80 @@
+# coding:utf-8
+
+import unittest
+
+from dns.message import make_query
+from dns.query import tcp
+from dns.query import udp
+from dns.rcode import NOERROR
+from dns.rcode import NXDOMAIN
+
+from netter.test.benchmark import bench_domains
+from netter.test.benchmark import bench_public_ip
+from netter.test.benchmark import bench_query
+from netter.test.benchmark import loopback_addresses
+from netter.test.benchmark import main
+from netter.test.stubs import dns_stub
+
+
+class test_dns_stub(unittest.TestCase):
+
+    def test_udp_and_tcp(self):
+        with dns_stub({"a.test": ["192.0.2.1"]}) as stub:
+            query = make_query("a.test", "A")
+            for send in (udp, tcp):
+                response = send(query, stub.address, timeout=1.0,
+                                port=stub.port)
+                self.assertEqual(response.rcode(), NOERROR)
+                self.assertEqual(response.answer[0][0].to_text(),
+                                 "192.0.2.1")
+            self.assertEqual(stub.queries, 2)
+
+    def test_addresses(self):
+        addresses = loopback_addresses(3)
+        with dns_stub({"a.test": ["192.0.2.1"]},
+                      addresses=addresses) as stub:
+            for address in addresses:
+                response = udp(make_query("a.test", "A"), address,
+                               timeout=1.0, port=stub.port)
+                self.assertEqual(response.rcode(), NOERROR)
+
+    def test_drop_and_nxdomain(self):
+        zone = bench_domains(40)
+        with dns_stub(zone, drop_rate=0.5, nxdomain_ratio=0.5,
+                      latency=0.01) as stub:
+            rcodes = []
+            for name in zone:
+                try:
+                    response = udp(make_query(name, "A"), stub.address,
+                                   timeout=0.1, port=stub.port)
+                    rcodes.append(response.rcode())
+                except Exception:  # pylint: disable=broad-except
+                    continue
+            self.assertEqual(stub.queries, 40)
+            self.assertEqual(len(rcodes), 40 - stub.dropped)
+            self.assertTrue(5 < stub.dropped < 35)
+            self.assertIn(NXDOMAIN, rcodes)
+            self.assertIn(NOERROR, rcodes)
+
+
+class test_benchmark(unittest.TestCase):
+
+    def test_query(self):
+        record = bench_query(10).dump()
+        self.assertEqual(record["ops"], 10)
+        self.assertEqual(record["loss"], 0.0)
+        self.assertGreater(record["qps"], 0.0)
+
+    def test_public_ip(self):
+        record = bench_public_ip(5).dump()
+        self.assertEqual(record["ops"], 5)
+        self.assertEqual(record["loss"], 0.0)
+
+    def test_main(self):
+        self.assertEqual(main(["--bench", "query-ns", "interfaces",
+                               "interfaces-synthetic", "--sizes", "1", "2",
+                               "--jsonl"]), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
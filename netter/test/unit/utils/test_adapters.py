@@ -0,0 +1,111 @@
+# coding:utf-8
+
+import unittest
+
+from netter.test.benchmark import synthetic_interfaces
+from netter.utils import Context
+from netter.utils import MACAddress
+from netter.utils import NetworkInterface
+from netter.utils import interface_snapshot
+from netter.utils import is_linux
+from netter.utils import netlink_monitor
+
+
+class test_mac_address(unittest.TestCase):
+
+    def test_format(self):
+        mac = MACAddress("02-42-ac:11:00:0f")
+        self.assertEqual(mac.packed, bytes.fromhex("0242ac11000f"))
+        self.assertEqual(mac.colon, "02:42:AC:11:00:0F")
+        self.assertEqual(mac.dash, "02-42-AC-11-00-0F")
+        self.assertEqual(str(mac), mac.colon)
+
+    def test_equal_and_hash(self):
+        mac = MACAddress("02:42:ac:11:00:0f")
+        self.assertEqual(mac, MACAddress(mac.packed))
+        self.assertEqual(len({mac, MACAddress("02-42-AC-11-00-0F")}), 1)
+        self.assertNotEqual(mac, MACAddress("02:42:ac:11:00:10"))
+        self.assertNotEqual(mac, mac.colon)
+
+    def test_invalid(self):
+        for value in ("", "02:42:ac:11:00", "02:42:ac:11:00:0g", b"\x02"):
+            self.assertRaises(ValueError, MACAddress, value)
+
+    def test_slots(self):
+        self.assertRaises(AttributeError, setattr,
+                          MACAddress("02:42:ac:11:00:0f"), "extra", 1)
+
+
+class test_network_interface(unittest.TestCase):
+
+    def test_synthetic(self):
+        context = Context()
+        interfaces = [NetworkInterface(name, addrs, context)
+                      for name, addrs in synthetic_interfaces(300)]
+        iface = interfaces[257]
+        self.assertEqual(iface.name, "veth00101")
+        self.assertEqual(iface.mac_address.colon, "02:42:00:00:01:01")
+        self.assertEqual(iface.ipv4_address, ("10.0.1.1",))
+        self.assertEqual(iface.ipv6_address, ("fe80::42:0:101%veth00101",))
+        self.assertEqual(iface.ip_address, ("10.0.1.1",
+                                            "fe80::42:0:101%veth00101"))
+        self.assertIs(iface.ip_address, iface.ip_address)
+        self.assertEqual(len(set(interfaces)), 300)
+        self.assertEqual(interfaces[0], NetworkInterface(
+            *synthetic_interfaces(1)[0], context))
+
+    def test_load(self):
+        for iface in NetworkInterface.load():
+            self.assertEqual(iface.ip_enabled, len(iface.ip_address) > 0)
+
+
+class test_interface_snapshot(unittest.TestCase):
+
+    def test_refresh(self):
+        interfaces = dict(synthetic_interfaces(1000))
+        snapshot = interface_snapshot()
+        diff = snapshot.refresh(interfaces)
+        self.assertEqual(len(diff.added), 1000)
+        self.assertEqual(snapshot.rebuilt, 1000)
+        self.assertFalse(snapshot.refresh(interfaces))
+        self.assertEqual(snapshot.rebuilt, 1000)
+
+        veth = interfaces.pop("veth00000")
+        interfaces["veth003e8"] = dict(synthetic_interfaces(1001))[
+            "veth003e8"]
+        interfaces["veth00001"] = interfaces["veth00001"][:2] + \
+            interfaces["veth00002"][2:]
+        diff = snapshot.refresh(interfaces)
+        self.assertEqual([i.name for i in diff.added], ["veth003e8"])
+        self.assertEqual([i.name for i in diff.removed], ["veth00000"])
+        self.assertEqual([(old.name, new.name) for old, new in diff.changed],
+                         [("veth00001", "veth00001")])
+        self.assertEqual(snapshot.rebuilt, 1002)
+        self.assertEqual(len(snapshot.interfaces), 1000)
+        events = list(diff.dump())
+        self.assertIn({"interface": "veth00001", "action": "removed",
+                       "item": "address",
+                       "value": "fe80::42:0:1%veth00001"}, events)
+        self.assertIn({"interface": "veth00001", "action": "added",
+                       "item": "address",
+                       "value": "fe80::42:0:2%veth00002"}, events)
+        self.assertIn({"interface": "veth00000", "action": "removed",
+                       "item": "interface", "value": "veth00000"}, events)
+        interfaces["veth00000"] = veth
+        self.assertEqual(len(snapshot.refresh(interfaces).added), 1)
+
+    def test_watch(self):
+        snapshot = interface_snapshot()
+        diff = next(snapshot.watch(interval=0.1))
+        self.assertGreater(len(diff.added), 0)
+        self.assertEqual(len(diff.removed), 0)
+
+    @unittest.skipUnless(is_linux(), "rtnetlink is Linux only")
+    def test_netlink(self):
+        with netlink_monitor() as monitor:
+            self.assertIsInstance(monitor.wait(0.01), bool)
+            self.assertGreaterEqual(monitor.events, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
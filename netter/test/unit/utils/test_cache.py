@@ -0,0 +1,84 @@
+# coding:utf-8
+
+from contextlib import ExitStack
+import unittest
+
+from dns.resolver import NXDOMAIN
+from dns.resolver import NoAnswer
+
+from netter.test.stubs import dns_stub
+from netter.utils import dnscache
+from netter.utils import dnsprobe
+
+ZONE = {"example.com": ["192.0.2.1", "2001:db8::1"]}
+
+
+class test_dnscache(unittest.TestCase):
+
+    def setUp(self):
+        stack = ExitStack()
+        self.addCleanup(stack.close)
+        self.stub = stack.enter_context(
+            dns_stub(ZONE, ttl=300, negative_ttl=60))
+
+    def probe(self, cache: dnscache) -> dnsprobe:
+        return dnsprobe.from_string(self.stub.address, port=self.stub.port,
+                                    cache=cache)
+
+    def test_positive(self):
+        cache = dnscache()
+        for _ in range(3):
+            answer = self.probe(cache).resolver.resolve("example.com", "A")
+            self.assertEqual([r.address for r in answer], ["192.0.2.1"])
+        self.assertEqual(self.stub.queries, 1)
+        self.assertEqual(cache.hits, 2)
+        self.assertGreaterEqual(cache.misses, 1)
+
+    def test_negative(self):
+        cache = dnscache()
+        prober = self.probe(cache)
+        for _ in range(2):
+            self.assertRaises(NXDOMAIN, prober.resolver.resolve,
+                              "missing.example.com", "A")
+            self.assertRaises(NoAnswer, prober.resolver.resolve,
+                              "example.com", "MX")
+        self.assertEqual(self.stub.queries, 2)
+
+    def test_expired(self):
+        with dns_stub(ZONE, ttl=0) as stub:
+            cache = dnscache()
+            prober = dnsprobe.from_string(stub.address, port=stub.port,
+                                          cache=cache)
+            prober.resolver.resolve("example.com", "A")
+            prober.resolver.resolve("example.com", "A")
+            self.assertEqual(stub.queries, 2)
+
+    def test_keyed_by_nameserver(self):
+        cache = dnscache()
+        with dns_stub({"example.com": ["192.0.2.2"]}) as other:
+            prober = dnsprobe.from_string(other.address, port=other.port,
+                                          cache=cache)
+            for probe in [self.probe(cache), prober] * 2:
+                probe.resolver.resolve("example.com", "A")
+            answer = prober.resolver.resolve("example.com", "A")
+            self.assertEqual([r.address for r in answer], ["192.0.2.2"])
+            self.assertEqual(other.queries, 1)
+        self.assertEqual(self.stub.queries, 1)
+
+    def test_bounded(self):
+        cache = dnscache(max_size=2)
+        prober = self.probe(cache)
+        for name in ["example.com", "a.example.com", "b.example.com"]:
+            self.assertRaises((NXDOMAIN, NoAnswer),
+                              prober.resolver.resolve, name, "MX")
+        self.assertEqual(len(cache), 2)
+
+    def test_probe_bypasses_cache(self):
+        prober = self.probe(dnscache())
+        prober.test("example.com", lifetime=1.0)
+        prober.test("example.com", lifetime=1.0)
+        self.assertEqual(self.stub.queries, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+# coding:utf-8
+
+import time
+import unittest
+from urllib.request import urlopen
+
+from netter.test.stubs import dns_stub
+from netter.test.stubs import http_stub
+from netter.utils import metrics_exporter
+from netter.utils.exporter import parse_listen
+from netter.utils import probe_metrics
+from netter.utils import public_ip
+
+
+class test_metrics(unittest.TestCase):
+
+    def test_render(self):
+        state = probe_metrics(buckets=(0.01, 0.1))
+        state.record_resolve("192.0.2.1", 0.005)
+        state.record_resolve("192.0.2.1", 0.05, "NXDOMAIN")
+        state.record_resolve("192.0.2.1", -2.0, "LifetimeTimeout")
+        state.record_ping("192.0.2.1", -1.0)
+        state.record_public_ip([("a", "203.0.113.1", 0.1, None),
+                                ("b", "203.0.113.1", 0.2, None),
+                                ("c", "203.0.113.2", 0.3, None),
+                                ("d", None, 0.4, "ConnectTimeout")])
+        self.assertNotIn(b"192.0.2.1", state.text)  # not published yet
+        state.publish()
+        text = state.text.decode()
+        self.assertTrue(text.endswith("# EOF\n"))
+        for line in [
+            'netter_resolve_latency_seconds_bucket'
+            '{nameserver="192.0.2.1",le="0.01"} 1',
+            'netter_resolve_latency_seconds_bucket'
+            '{nameserver="192.0.2.1",le="+Inf"} 2',
+            'netter_resolve_latency_seconds_count{nameserver="192.0.2.1"} 2',
+            'netter_resolve_errors_total'
+            '{nameserver="192.0.2.1",error="LifetimeTimeout"} 1',
+            'netter_resolve_errors_total'
+            '{nameserver="192.0.2.1",error="NXDOMAIN"} 1',
+            'netter_ping_timeouts_total{nameserver="192.0.2.1"} 1',
+            'netter_public_ip_latency_seconds{site="a"} 0.1',
+            'netter_public_ip_errors_total'
+            '{site="d",error="ConnectTimeout"} 1',
+            'netter_public_ip_providers{address="203.0.113.1"} 2',
+            'netter_probe_rounds_total 1',
+        ]:
+            self.assertIn(line + "\n", text)
+        self.assertIn(f"netter_public_ip_agreement {2 / 3!r}\n", text)
+
+
+class test_exporter(unittest.TestCase):
+
+    def test_parse_listen(self):
+        self.assertEqual(parse_listen(":9450"), ("", 9450))
+        self.assertEqual(parse_listen("127.0.0.1:80"), ("127.0.0.1", 80))
+        self.assertEqual(parse_listen("[::1]:80"), ("::1", 80))
+        self.assertRaises(ValueError, parse_listen, "::1:80")
+        self.assertRaises(ValueError, parse_listen, "[localhost]:80")
+        self.assertRaises(ValueError, parse_listen, "localhost")
+
+    def test_listen_ipv6(self):
+        with metrics_exporter([], listen="[::1]:0", interval=60) as server:
+            host, port = server.address
+            self.assertEqual(host, "::1")
+            with urlopen(f"http://[::1]:{port}/metrics",
+                         timeout=1.0) as response:
+                self.assertEqual(response.status, 200)
+
+    def test_round_error(self):
+        calls = []
+
+        class failing(metrics_exporter):
+            def probe_round(self, client=None):
+                calls.append(client)
+                if len(calls) == 1:
+                    raise OSError("disk full")
+                super().probe_round(client)
+
+        with failing([], listen="127.0.0.1:0", interval=0.0) as server:
+            while server.metrics.rounds < 1:  # the loop survived
+                time.sleep(0.05)
+            text = server.metrics.text.decode()
+        self.assertIn('netter_probe_round_errors_total{error="OSError"} 1\n',
+                      text)
+
+    def test_scrape(self):
+        with dns_stub({"a.test": ["192.0.2.1"]}, latency=0.3) as dns, \
+                http_stub({"/ip": (0.0, 200, "203.0.113.1")}) as http:
+            urls = {public_ip.flags.ipinfo: http.url("/ip")}
+            with metrics_exporter([dns.address], listen="127.0.0.1:0",
+                                  qname="a.test", interval=0.0,
+                                  public_ip_flag=public_ip.flags.ipinfo,
+                                  public_ip_urls=urls,
+                                  port=dns.port) as server:
+                url = "http://{}:{}/metrics".format(*server.address)
+                for _ in range(20):  # never waits for a probe round
+                    start = time.perf_counter()
+                    with urlopen(url, timeout=1.0) as response:
+                        self.assertEqual(response.status, 200)
+                        response.read()
+                    self.assertLess(time.perf_counter() - start, 0.25)
+                while server.metrics.rounds < 1:
+                    time.sleep(0.05)
+                with urlopen(url, timeout=1.0) as response:
+                    text = response.read().decode()
+            self.assertIn('netter_resolve_latency_seconds_count'
+                          '{nameserver="127.0.0.1"}', text)
+            self.assertIn('netter_public_ip_providers'
+                          '{address="203.0.113.1"} 1', text)
+
+
+if __name__ == "__main__":
+    unittest.main()
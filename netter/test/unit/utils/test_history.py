@@ -0,0 +1,80 @@
+# coding:utf-8
+
+from contextlib import ExitStack
+import os
+import tempfile
+import unittest
+
+from netter.test.stubs import dns_stub
+from netter.utils import dnsprobe
+from netter.utils import history_store
+from netter.utils import parse_duration
+
+
+class test_history(unittest.TestCase):
+
+    def setUp(self):
+        stack = ExitStack()
+        self.addCleanup(stack.close)
+        tempdir = stack.enter_context(tempfile.TemporaryDirectory())
+        self.path = os.path.join(tempdir, "history.sqlite3")
+
+    def test_parse_duration(self):
+        self.assertEqual(parse_duration("90"), 90)
+        self.assertEqual(parse_duration("30m"), 1800)
+        self.assertEqual(parse_duration("7d"), 604800)
+        self.assertEqual(parse_duration("2W"), 1209600)
+        self.assertRaises(ValueError, parse_duration, "7x")
+        self.assertRaises(ValueError, parse_duration, "-1h")
+
+    def test_batch(self):
+        with history_store(self.path, batch_size=3) as history:
+            for i in range(4):
+                history.record("resolve", "192.0.2.1", 0.01, timestamp=i)
+            self.assertEqual(history.written, 3)
+            self.assertEqual(history.pending, 1)
+        with history_store(self.path) as history:
+            self.assertEqual(len(list(history.samples("192.0.2.1"))), 4)
+        history.record("ping", "192.0.2.1", 0.01)  # dropped after close
+
+    def test_summary(self):
+        with history_store(self.path) as history:
+            for i in range(100):
+                history.record("resolve", "192.0.2.1", i / 1000, timestamp=i)
+                history.record("ping", "192.0.2.2", -1.0, timestamp=i)
+            history.record("public_ip", "ident.me", 0.1, timestamp=50)
+            self.assertEqual(history.targets(),
+                             ["192.0.2.1", "192.0.2.2", "ident.me"])
+            summary = {(target, kind): stats for target, kind, stats
+                       in history.summary(since=50)}
+            self.assertEqual(len(summary), 3)
+            resolve = summary[("192.0.2.1", "resolve")]
+            self.assertEqual(resolve.count, 50)
+            self.assertAlmostEqual(resolve.p50, 0.0745)
+            self.assertEqual(summary[("192.0.2.2", "ping")].loss, 1.0)
+            self.assertEqual(list(history.summary(since=50, until=60,
+                                                  target="192.0.2.1",
+                                                  kind="ping")), [])
+
+    def test_aborted(self):
+        with history_store(self.path) as history:
+            history.record("resolve", "192.0.2.1", 0.01)
+            history.record("resolve", "192.0.2.1", -1.0, "QueryAborted")
+            (_, _, stats), = history.summary()
+            self.assertEqual((stats.count, stats.aborted), (1, 1))
+            self.assertEqual(stats.loss, 0.0)
+
+    def test_prober(self):
+        with dns_stub({"a.test": ["192.0.2.1"]}) as stub:
+            with history_store(self.path) as history:
+                prober = dnsprobe.from_string(stub.address, port=stub.port,
+                                              history=history)
+                prober.test("a.test", lifetime=1.0)
+                prober.test("b.test", lifetime=1.0)
+                stats = list(history.summary(target=stub.address))
+        self.assertEqual([(kind, s.received) for _, kind, s in stats],
+                         [("resolve", 2)])
+
+
+if __name__ == "__main__":
+    unittest.main()
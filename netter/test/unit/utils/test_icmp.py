@@ -0,0 +1,79 @@
+# coding:utf-8
+
+import asyncio
+import time
+import unittest
+
+from netter.utils import async_pinger
+from netter.utils import ping_burst
+from netter.utils import ping_many
+from netter.utils import pinger
+from netter.utils import shared_pinger
+from netter.utils.icmp import checksum
+
+
+class test_pinger(unittest.TestCase):
+
+    def test_checksum(self):
+        self.assertEqual(checksum(b"\x08\x00\x00\x00\x00\x01\x00\x01"),
+                         0xF7FD)
+        self.assertEqual(checksum(b"\x01"), 0xFEFF)
+
+    def test_ping_loopback(self):
+        try:
+            with pinger() as icmp:
+                delays = icmp.ping(["127.0.0.1", "127.0.0.1"], count=2,
+                                   timeout=1.0, concurrency=1)
+                self.assertEqual(len(icmp.ping(["127.0.0.1"])["127.0.0.1"]),
+                                 1)  # the loop outlives a burst
+        except OSError as error:
+            self.skipTest(f"ICMP socket not permitted: {error}")
+        self.assertTrue(icmp.closed)
+        self.assertEqual(list(delays), ["127.0.0.1"])
+        self.assertTrue(all(delay >= 0.0 for delay in delays["127.0.0.1"]))
+
+    def test_shared_pinger(self):
+        self.assertIs(shared_pinger(), shared_pinger())
+        self.assertFalse(shared_pinger().closed)
+
+    def test_ping_many_deadline(self):
+        delays = ping_many(["127.0.0.1", "192.0.2.1"], timeout=8,
+                           deadline=0.5)
+        self.assertEqual(set(delays), {"127.0.0.1", "192.0.2.1"})
+
+
+class test_async_pinger(unittest.TestCase):
+
+    def run_ping(self, *args, **kwargs):
+        async def burst():
+            async with async_pinger() as icmp:
+                return await icmp.ping(*args, **kwargs)
+        try:
+            return asyncio.run(burst())
+        except OSError as error:
+            self.skipTest(f"ICMP socket not permitted: {error}")
+
+    def test_burst_loopback(self):
+        start = time.perf_counter()
+        delays = self.run_ping(["127.0.0.1", "127.0.0.1", "::1"], count=3,
+                               interval=0.05, timeout=1.0, concurrency=2)
+        self.assertGreaterEqual(time.perf_counter() - start, 0.1)
+        self.assertEqual(list(delays), ["127.0.0.1", "::1"])
+        self.assertEqual(len(delays["127.0.0.1"]), 3)
+        self.assertTrue(all(delay >= 0 for delay in delays["127.0.0.1"]))
+
+    def test_burst_deadline(self):
+        start = time.perf_counter()
+        delays = self.run_ping(["192.0.2.1"], count=2, timeout=8.0,
+                               deadline=0.3)
+        self.assertLess(time.perf_counter() - start, 2.0)
+        self.assertEqual(len(delays["192.0.2.1"]), 2)
+        self.assertEqual(self.run_ping([], count=2), {})
+
+    def test_ping_burst(self):
+        delays = ping_burst(["127.0.0.1"], timeout=1, count=2)
+        self.assertEqual(len(delays["127.0.0.1"]), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+# coding:utf-8
+
+import threading
+import time
+import unittest
+
+from netter.test.stubs import dns_stub
+from netter.utils import adaptive_timeout
+from netter.utils import imap_unordered
+from netter.utils import probe_engine
+from netter.utils import rtt_estimator
+
+
+class test_parallel(unittest.TestCase):
+
+    def test_imap_unordered_bounded(self):
+        lock = threading.Lock()
+        running = [0, 0]  # current, peak
+
+        def work(item: int) -> int:
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            time.sleep(0.01)
+            with lock:
+                running[0] -= 1
+            return item * 2
+
+        result = sorted(imap_unordered(work, range(20), concurrency=4))
+        self.assertEqual(result, [i * 2 for i in range(20)])
+        self.assertLessEqual(running[1], 4)
+
+    def test_imap_unordered_invalid_concurrency(self):
+        self.assertRaises(AssertionError, list,
+                          imap_unordered(abs, [1], concurrency=0))
+
+
+class test_probe_engine(unittest.TestCase):
+
+    def test_probe_concurrently(self):
+        engine = probe_engine(concurrency=8, ping_timeout=1,
+                              resolve_timeout=0.5)
+        nameservers = ["127.0.0.1", "127.0.0.2", "127.0.0.3", "127.0.0.1"]
+        start = time.perf_counter()
+        results = list(engine.probe(nameservers, enable_ping=False))
+        elapsed = time.perf_counter() - start
+        self.assertEqual(sorted(r.nameserver for r in results),
+                         ["127.0.0.1", "127.0.0.2", "127.0.0.3"])
+        for result in results:
+            self.assertIsNone(result.ping)
+            self.assertIsNotNone(result.resolve)
+        self.assertLess(elapsed, 1.5)  # not 3 * 0.5s in series
+
+    def test_probe_adaptive(self):
+        healthy = ["127.0.0.2", "127.0.0.3", "127.0.0.4"]
+        with dns_stub(addresses=healthy, latency=0.02) as stub:
+            engine = probe_engine(ping_timeout=4, resolve_timeout=4.0,
+                                  count=2, adaptive=True)
+            start = time.perf_counter()
+            results = {r.nameserver: r for r in engine.probe(
+                healthy + ["127.0.0.9"], qname="a.test", port=stub.port)}
+            # the silent one waits 1s, then 2s (backoff), not 2 * 4s
+            self.assertLess(time.perf_counter() - start, 3.5)
+        for nameserver in healthy:
+            self.assertEqual(results[nameserver].resolve.received, 2)
+        # aborted at the adaptive deadline, not counted as lost
+        self.assertEqual(results["127.0.0.9"].resolve.aborted, 2)
+        self.assertEqual(results["127.0.0.9"].resolve.lost, 0)
+
+
+class test_adaptive_timeout(unittest.TestCase):
+
+    def test_rtt_estimator(self):
+        estimator = rtt_estimator(floor=0.1, ceiling=8.0)
+        self.assertEqual(estimator.timeout, 8.0)
+        estimator.update(0.2)
+        self.assertAlmostEqual(estimator.srtt, 0.2)
+        self.assertAlmostEqual(estimator.rttvar, 0.1)
+        self.assertAlmostEqual(estimator.timeout, 0.6)
+        estimator.update(0.2)
+        self.assertAlmostEqual(estimator.rttvar, 0.075)
+        estimator.update(-1.0)
+        self.assertAlmostEqual(estimator.timeout, 1.0)  # backoff
+        estimator.update(0.001)
+        self.assertLess(estimator.timeout, 1.0)
+        estimator = rtt_estimator(floor=0.1, ceiling=8.0)
+        estimator.update(0.001)
+        self.assertEqual(estimator.timeout, 0.1)
+
+    def test_quorum(self):
+        with adaptive_timeout(ceiling=8.0, floor=0.1, quorum=2) as adaptive:
+            adaptive.observe("192.0.2.1", 0.02)
+            self.assertEqual(adaptive.timeout("192.0.2.9"), 8.0)
+            adaptive.observe("192.0.2.2", -1.0)
+            self.assertEqual(adaptive.timeout("192.0.2.9"), 8.0)
+            adaptive.observe("192.0.2.2", 0.02)
+            self.assertEqual(adaptive.healthy, 2)
+            self.assertLess(adaptive.timeout("192.0.2.9"), 1.0)
+
+    def test_slow_nameserver(self):
+        with adaptive_timeout(ceiling=8.0, quorum=1) as adaptive:
+            for _ in range(3):
+                adaptive.observe("192.0.2.1", 0.005)
+            self.assertEqual(adaptive.timeout("192.0.2.2"), 1.0)
+            adaptive.observe("192.0.2.2", -1.0)
+            self.assertEqual(adaptive.timeout("192.0.2.2"), 2.0)
+            adaptive.observe("192.0.2.2", 0.4)
+            self.assertGreaterEqual(adaptive.timeout("192.0.2.2"), 1.0)
+            self.assertEqual(adaptive.timeout("192.0.2.1"), 1.0)
+
+    def test_guard(self):
+        aborted = threading.Event()
+        with adaptive_timeout(ceiling=0.2, floor=0.1) as adaptive:
+            start = time.perf_counter()
+            with adaptive.guard("192.0.2.1", aborted.set):
+                self.assertTrue(aborted.wait(1.0))
+            self.assertLess(time.perf_counter() - start, 0.5)
+            aborted.clear()
+            with adaptive.guard("192.0.2.1", aborted.set):
+                pass
+            self.assertFalse(aborted.wait(0.3))
+
+
+if __name__ == "__main__":
+    unittest.main()
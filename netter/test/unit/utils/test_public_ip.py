@@ -0,0 +1,86 @@
+# coding:utf-8
+
+from contextlib import ExitStack
+import time
+import unittest
+
+from netter.test.stubs import http_stub
+from netter.utils import public_ip
+from netter.utils import public_ip_client
+
+ROUTES = {
+    "/ident": (0.0, 200, "203.0.113.1\n"),
+    "/ipify": (0.0, 200, '{"ip": "203.0.113.1"}'),
+    "/ipinfo": (0.0, 200, "203.0.113.2"),
+    "/cloudflare": (0.0, 200, "fl=1\nip=203.0.113.1\nts=1\n"),
+    "/slow": (0.3, 200, "203.0.113.9"),
+    "/hung": (5.0, 200, "203.0.113.9"),
+    "/error": (0.0, 500, "oops"),
+}
+
+
+class test_public_ip(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # enterClassContext() needs Python 3.11
+        stack = ExitStack()
+        cls.addClassCleanup(stack.close)
+        cls.stub = stack.enter_context(http_stub(ROUTES))
+
+    def urls(self, **paths: str):
+        return {public_ip.flags[k]: self.stub.url(v) for k, v in paths.items()}
+
+    def test_query_all(self):
+        urls = self.urls(ident="/ident", ipify="/ipify",
+                         ipinfo="/ipinfo", cloudflare="/cloudflare")
+        public = public_ip.query(public_ip.flags.all, urls=urls)
+        addrs = {str(addr): sites for addr, sites in
+                 ((addr, public[addr]) for addr in public)}
+        self.assertEqual(len(addrs["203.0.113.1"]), 3)
+        self.assertEqual(addrs["203.0.113.2"], ("https://ipinfo.io/ip",))
+
+    def test_query_timeout_and_error(self):
+        urls = self.urls(ident="/hung", ipify="/error", ipinfo="/ipinfo")
+        start = time.perf_counter()
+        flag = public_ip.flags.ident | public_ip.flags.ipify | \
+            public_ip.flags.ipinfo
+        public = public_ip.query(flag, timeout=0.5, urls=urls)
+        self.assertLess(time.perf_counter() - start, 2.0)
+        self.assertEqual(str(public), "203.0.113.2")
+
+    def test_query_first(self):
+        urls = self.urls(ident="/slow", ipify="/hung", ipinfo="/ipinfo",
+                         cloudflare="/slow")
+        start = time.perf_counter()
+        public = public_ip.query(public_ip.flags.all, first=True,
+                                 timeout=5.0, urls=urls)
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual(str(public), "203.0.113.2")
+
+    def test_client_keep_alive(self):
+        with http_stub(ROUTES) as stub:
+            urls = {public_ip.flags.ipinfo: stub.url("/ipinfo")}
+            with public_ip_client(timeout=1.0, urls=urls) as client:
+                for _ in range(5):
+                    public = client.query(public_ip.flags.ipinfo)
+                    self.assertEqual(str(public), "203.0.113.2")
+            self.assertEqual(stub.requests, 5)
+            self.assertEqual(stub.connections, 1)
+
+    def test_client_keep_alive_first(self):
+        with http_stub(ROUTES) as stub:
+            urls = {public_ip.flags.ipinfo: stub.url("/ipinfo"),
+                    public_ip.flags.ident: stub.url("/ident")}
+            flag = public_ip.flags.ipinfo | public_ip.flags.ident
+            with public_ip_client(timeout=1.0, urls=urls) as client:
+                for _ in range(5):
+                    public = client.query(flag, first=True)
+                    self.assertEqual(len(list(public)), 1)
+                    time.sleep(0.05)  # the other request is done
+            self.assertEqual(stub.requests, 10)
+            self.assertLessEqual(stub.connections, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+# coding:utf-8
+
+import os
+import tempfile
+import unittest
+
+from dns.message import from_text
+from dns.resolver import Answer
+
+from netter.test.benchmark import bench_domains
+from netter.test.benchmark import loopback_addresses
+from netter.test.stubs import dns_stub
+from netter.utils import answer_digest
+from netter.utils import consistency
+from netter.utils import parse_rdtypes
+from netter.utils import query_domain_names
+from netter.utils import read_domain_names
+from netter.utils import resolver_diff
+from netter.utils import unique_nameservers
+
+
+def make_answer(*records: str) -> Answer:
+    response = from_text("id 1\nflags QR RD RA\n;QUESTION\na.test. IN MX"
+                         "\n;ANSWER\n" + "\n".join(records))
+    return Answer(response.question[0].name, 15, 1, response)
+
+
+class test_query(unittest.TestCase):
+
+    def test_parse_rdtypes(self):
+        self.assertEqual(parse_rdtypes("a, AAAA,mx,MX,txt"),
+                         ("A", "AAAA", "MX", "TXT"))
+        self.assertRaises(ValueError, parse_rdtypes, "A,BOGUS")
+        self.assertRaises(ValueError, parse_rdtypes, ",")
+
+    def test_rdtypes(self):
+        with dns_stub({"a.test": ["192.0.2.1", "2001:db8::1"]}) as stub:
+            results = list(query_domain_names(
+                ["a.test"], [stub.address], port=stub.port,
+                rdtypes=["A", "AAAA", "MX"]))
+            self.assertEqual(stub.queries, 3)
+        answers = {result.rdtype: result.records or result.error
+                   for result in results}
+        self.assertEqual(answers, {"A": ["192.0.2.1"],
+                                   "AAAA": ["2001:db8::1"],
+                                   "MX": "No Answer"})
+
+    def test_consistency(self):
+        zones = [{"a.test": ["192.0.2.1", "192.0.2.2"]},
+                 {"a.test": ["192.0.2.2", "192.0.2.1"]},
+                 {"a.test": ["192.0.2.9"]}]
+        view = consistency()
+        for i, zone in enumerate(zones):
+            with dns_stub(zone, addresses=(f"127.0.0.{i + 1}",)) as stub:
+                for result in query_domain_names(
+                        ["a.test", "b.test"], [stub.address], port=stub.port,
+                        rdtypes=["A"]):
+                    view.add(result)
+        self.assertEqual(len(view), 2)
+        self.assertEqual(view.disagreements(), [("a.test", "A")])
+        self.assertTrue(view.consistent("b.test", "A"))
+        self.assertEqual(view.answers("a.test", "A"), [
+            (("192.0.2.1", "192.0.2.2"), ("127.0.0.1", "127.0.0.2")),
+            (("192.0.2.9",), ("127.0.0.3",))])
+        self.assertEqual(list(view.dump())[-1], {
+            "domain": "b.test", "rdtype": "A", "answer": ["NXDOMAIN"],
+            "nameservers": ["127.0.0.1", "127.0.0.2", "127.0.0.3"],
+            "consistent": True})
+
+
+class test_resolver_diff(unittest.TestCase):
+
+    def test_digest(self):
+        digest = answer_digest(make_answer("a.test. 300 IN MX 10 mx1.test.",
+                                           "a.test. 300 IN MX 20 mx2.test."))
+        self.assertEqual(digest, answer_digest(make_answer(
+            "a.test. 60 IN MX 20 MX2.Test.", "A.test. 60 IN MX 10 mx1.test.")))
+        self.assertNotEqual(digest, answer_digest(make_answer(
+            "a.test. 300 IN MX 10 mx1.test.")))
+        self.assertNotEqual(answer_digest("NXDOMAIN"),
+                            answer_digest("Timeout"))
+
+    def test_equivalence_classes(self):
+        zones = [{"a.test": ["192.0.2.1"], "b.test": ["192.0.2.5"]},
+                 {"a.test": ["192.0.2.1"], "b.test": ["192.0.2.6"]},
+                 {"a.test": ["192.0.2.1"], "b.test": ["192.0.2.6"]}]
+        results = []
+        for i, zone in enumerate(zones):
+            with dns_stub(zone, addresses=(f"127.0.0.{i + 1}",)) as stub:
+                results.extend(query_domain_names(
+                    ["a.test", "b.test", "c.test"], [stub.address],
+                    port=stub.port, rdtypes=["A", "MX"]))
+        engine = resolver_diff(["127.0.0.1", "127.0.0.2", "127.0.0.3"],
+                               ["A", "MX"])
+        diffs = list(engine.run(results))
+        self.assertEqual((engine.domains, engine.divergent), (3, 1))
+        self.assertEqual([diff.domain for diff in diffs], ["b.test"])
+        self.assertEqual(diffs[0].classes(), [("127.0.0.2", "127.0.0.3"),
+                                              ("127.0.0.1",)])
+        self.assertEqual(diffs[0].divergent_rdtypes(), ["A"])
+        self.assertIn({"domain": "b.test", "class": 1,
+                       "nameservers": ["127.0.0.1"], "rdtype": "A",
+                       "answer": ["192.0.2.5"]}, list(diffs[0].dump()))
+
+    def test_duplicates(self):
+        self.assertEqual(unique_nameservers(["2001:DB8::1", "2001:db8::1"]),
+                         ("2001:db8::1",))
+        with dns_stub({"a.test": ["192.0.2.1"]}) as stub:
+            nameservers = [stub.address, stub.address]
+            engine = resolver_diff(nameservers, ["A"])
+            diffs = list(engine.run(query_domain_names(
+                ["a.test", "A.test.", "a.test"], nameservers,
+                port=stub.port), divergent_only=False))
+        self.assertEqual([diff.domain for diff in diffs], ["a.test"])
+        self.assertEqual(diffs[0].count, 1)
+
+    def test_invalid_name(self):
+        zone = {"a.test": ["192.0.2.1"], "b.test": ["192.0.2.2"]}
+        with tempfile.TemporaryDirectory() as tmp, dns_stub(zone) as stub:
+            path = os.path.join(tmp, "domains.txt")
+            with open(path, "w", encoding="utf-8") as whdl:
+                whdl.write("a.test\nfoo..bar\n" + "x" * 64 + ".test\n"
+                           "b.test\n")
+            results = {result.domain: result for result in query_domain_names(
+                read_domain_names(path), [stub.address], port=stub.port)}
+        self.assertEqual(results["a.test"].records, ["192.0.2.1"])
+        self.assertEqual(results["b.test"].records, ["192.0.2.2"])
+        self.assertEqual(results["foo..bar"].error, "EmptyLabel")
+        self.assertEqual(results["x" * 64 + ".test"].error, "LabelTooLong")
+
+    def test_bounded(self):
+        zone = bench_domains(500)
+        addresses = loopback_addresses(5)
+        engine = resolver_diff(addresses, ["A"])
+        pending = 0
+        with dns_stub(zone, addresses=addresses) as stub:
+            for result in query_domain_names(zone, addresses, port=stub.port,
+                                             concurrency=20):
+                engine.add(result)
+                pending = max(pending, engine.pending)
+        self.assertEqual((engine.domains, engine.divergent), (500, 0))
+        self.assertEqual(engine.pending, 0)
+        self.assertLessEqual(pending, 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
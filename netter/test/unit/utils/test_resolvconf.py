@@ -0,0 +1,83 @@
+# coding:utf-8
+
+import os
+import tempfile
+import unittest
+
+from dns.resolver import Resolver
+
+from netter.test.stubs import dns_stub
+from netter.utils import dnsprobe
+from netter.utils import load_resolv_conf
+from netter.utils import resolv_conf
+
+RESOLV_CONF = """\
+# generated
+nameserver 192.0.2.53 # primary
+;nameserver 192.0.2.54
+nameserver 2001:db8::53
+nameserver not-an-address
+nameserver 192.0.2.53
+nameserver fe80::1%eth0
+nameserver 192.0.2.1%eth0
+domain local.example
+search a.example b.example
+options ndots:2 timeout:1 attempts:9 rotate unknown timeout:x
+"""
+
+
+class test_resolv_conf(unittest.TestCase):
+
+    def test_parse(self):
+        config = resolv_conf.parse(RESOLV_CONF)
+        self.assertEqual(config.nameservers,
+                         ("192.0.2.53", "2001:db8::53", "fe80::1%eth0"))
+        self.assertEqual(config.search, ("a.example", "b.example"))
+        self.assertEqual(config.ndots, 2)
+        self.assertEqual(config.timeout, 1)
+        self.assertEqual(config.attempts, 5)
+        self.assertTrue(config.rotate)
+        self.assertFalse(config.edns0)
+
+    def test_defaults(self):
+        config = resolv_conf.parse("domain local.example\n")
+        self.assertEqual(config.nameservers, ())
+        self.assertEqual(config.search, ("local.example",))
+        self.assertEqual((config.ndots, config.timeout, config.attempts),
+                         (1, 5, 2))
+
+    def test_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "resolv.conf")
+            with open(path, "w", encoding="utf-8") as whdl:
+                whdl.write("nameserver 192.0.2.1\n")
+            config = load_resolv_conf(path)
+            self.assertIs(load_resolv_conf(path), config)
+            with open(path, "a", encoding="utf-8") as whdl:
+                whdl.write("nameserver 192.0.2.2\n")
+            self.assertEqual(load_resolv_conf(path).nameservers,
+                             ("192.0.2.1", "192.0.2.2"))
+            os.remove(path)
+            self.assertRaises(OSError, load_resolv_conf, path)
+
+    def test_configure(self):
+        config = resolv_conf.parse("search test\noptions ndots:2\n")
+        resolver = Resolver(configure=False)
+        config.configure(resolver, system=True)
+        self.assertEqual([str(name) for name in resolver.search], ["test."])
+        self.assertEqual(resolver.ndots, 2)
+
+    def test_dnsprobe(self):
+        config = resolv_conf.parse("search test\noptions timeout:1\n")
+        with dns_stub({"host.test": ["192.0.2.1"]}) as stub:
+            prober = dnsprobe.from_string(stub.address, port=stub.port,
+                                          config=config)
+            self.assertEqual(prober.resolver.timeout, 1.0)
+            self.assertEqual(prober.resolver.lifetime, 2.0)
+            self.assertEqual(prober.resolver.search, [])  # explicit
+            answer = prober.resolver.resolve("host.test")
+            self.assertEqual(answer[0].to_text(), "192.0.2.1")
+
+
+if __name__ == "__main__":
+    unittest.main()
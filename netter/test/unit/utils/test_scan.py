@@ -0,0 +1,47 @@
+# coding:utf-8
+
+from itertools import islice
+import time
+import unittest
+
+from netter.test.stubs import dns_stub
+from netter.utils import dns_scanner
+from netter.utils import network_hosts
+from netter.utils import parse_network
+
+
+class test_scan(unittest.TestCase):
+
+    def test_network(self):
+        self.assertIsNone(parse_network("192.0.2.1"))
+        network = parse_network("10.0.1.2/22")
+        self.assertEqual(str(network), "10.0.0.0/22")
+        self.assertEqual(list(network_hosts(parse_network("192.0.2.7/32"))),
+                         ["192.0.2.7"])
+        hosts = network_hosts(parse_network("10.0.0.0/8"))
+        self.assertEqual(list(islice(hosts, 2)), ["10.0.0.1", "10.0.0.2"])
+        self.assertRaises(ValueError, parse_network, "10.0.0.0/33")
+
+    def test_responders(self):
+        with dns_stub(addresses=("127.0.0.2", "127.0.0.5")) as stub:
+            scanner = dns_scanner(port=stub.port, timeout=0.5, inflight=2)
+            results = list(scanner.scan(
+                network_hosts(parse_network("127.0.0.0/29"))))
+            self.assertEqual(sorted(r.nameserver for r in results),
+                             ["127.0.0.2", "127.0.0.5"])
+            self.assertEqual({r.rcode for r in results}, {"NXDOMAIN"})
+            self.assertTrue(all(r.delay < 0.5 for r in results))
+            self.assertEqual(scanner.sent, 6)
+            self.assertEqual(scanner.responders, 2)
+
+    def test_rate(self):
+        scanner = dns_scanner(port=9, timeout=0.05, rate=1000)
+        start = time.perf_counter()
+        hosts = network_hosts(parse_network("127.1.0.0/24"))
+        self.assertEqual(list(scanner.scan(hosts)), [])
+        self.assertGreaterEqual(time.perf_counter() - start, 0.25)
+        self.assertEqual(scanner.sent, 254)
+
+
+if __name__ == "__main__":
+    unittest.main()
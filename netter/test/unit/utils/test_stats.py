@@ -0,0 +1,75 @@
+# coding:utf-8
+
+from math import isnan
+from math import nan
+import unittest
+
+from netter.utils import format_stats
+from netter.utils import latency
+from netter.utils import rolling
+from netter.utils import sampling
+
+
+class test_latency(unittest.TestCase):
+
+    def test_statistics(self):
+        stats = latency([0.01, 0.03, -1.0, 0.02, 0.04])
+        self.assertEqual(stats.count, 5)
+        self.assertEqual(stats.received, 4)
+        self.assertEqual(stats.lost, 1)
+        self.assertAlmostEqual(stats.loss, 0.2)
+        self.assertAlmostEqual(stats.min, 0.01)
+        self.assertAlmostEqual(stats.max, 0.04)
+        self.assertAlmostEqual(stats.avg, 0.025)
+        self.assertAlmostEqual(stats.p50, 0.025)
+        self.assertAlmostEqual(stats.p95, 0.0385)
+        self.assertAlmostEqual(stats.jitter, 0.05 / 3)
+        self.assertEqual(stats.samples.typecode, "d")
+
+    def test_all_lost(self):
+        stats = latency([-1.0, -1.0])
+        self.assertEqual(stats.loss, 1.0)
+        for value in (stats.min, stats.avg, stats.p95, stats.jitter):
+            self.assertTrue(isnan(value))
+
+    def test_aborted(self):
+        stats = latency([0.01, nan, -1.0])
+        self.assertEqual(stats.aborted, 1)
+        self.assertEqual(stats.count, 2)
+        self.assertAlmostEqual(stats.loss, 0.5)
+
+    def test_dump(self):
+        stats = latency([0.01, 0.03, -1.0])
+        record = stats.dump(prefix="ping_")
+        self.assertEqual(list(record), [f"ping_{field}"
+                                        for field in latency.FIELDS])
+        self.assertAlmostEqual(record["ping_max_ms"], 30.0)
+        self.assertAlmostEqual(record["ping_loss"], 1 / 3)
+        self.assertEqual(format_stats(stats)[-1], "33.3%")
+        self.assertEqual(format_stats(latency([-1.0]))[0], "-")
+
+    def test_sampling(self):
+        delays = iter([0.1, -8.0, 0.3])
+        stats = sampling(lambda: next(delays), count=3)
+        self.assertEqual(stats.received, 2)
+        self.assertAlmostEqual(stats.avg, 0.2)
+        self.assertRaises(AssertionError, sampling, float, count=0)
+
+
+class test_rolling(unittest.TestCase):
+
+    def test_window(self):
+        stats = rolling(size=3, alpha=0.5)
+        self.assertTrue(isnan(stats.ewma))
+        for delay in [0.1, 0.2, -1.0, 0.4, 0.6]:
+            stats.add(delay)
+        self.assertEqual(stats.count, 3)
+        self.assertEqual(stats.total, 5)
+        self.assertEqual(list(stats.window().samples), [0.4, 0.6])
+        self.assertAlmostEqual(stats.loss, 1 / 3)
+        # 0.1 -> 0.15 -> (lost) -> 0.275 -> 0.4375
+        self.assertAlmostEqual(stats.ewma, 0.4375)
+
+
+if __name__ == "__main__":
+    unittest.main()
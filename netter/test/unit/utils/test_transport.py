@@ -0,0 +1,182 @@
+# coding:utf-8
+
+import os
+import ssl
+import threading
+import time
+import unittest
+
+from dns.exception import Timeout
+from dns.message import make_query
+
+from netter.test.benchmark import bench_domains
+from netter.test.stubs import dns_stub
+from netter.test.stubs import doh_stub
+from netter.utils import probe_engine
+from netter.utils import dnsprobe
+from netter.utils import imap_unordered
+from netter.utils.transport import transport_pool
+
+CERT = os.path.join(os.path.dirname(__file__), "..", "..", "certs",
+                    "localhost.pem")
+
+
+def server_context() -> ssl.SSLContext:
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(CERT)
+    return context
+
+
+def client_context() -> ssl.SSLContext:
+    return ssl.create_default_context(cafile=CERT)
+
+
+class test_transport(unittest.TestCase):
+
+    def test_udp_multiplexing(self):
+        zone = bench_domains(200)
+        with dns_stub(zone, latency=0.05) as stub, transport_pool() as pool:
+            prober = dnsprobe.from_string(stub.address, port=stub.port,
+                                          transport=pool)
+            transport = pool.udp(stub.address, stub.port)
+
+            def resolve(name: str) -> str:
+                return prober.resolver.resolve(name, lifetime=2.0)[0] \
+                    .to_text()
+            answers = list(imap_unordered(resolve, zone, concurrency=100))
+            self.assertEqual(sorted(answers),
+                             sorted(addrs[0] for addrs in zone.values()))
+            self.assertIs(pool.udp(stub.address, stub.port), transport)
+            self.assertEqual(transport.inflight, 0)
+            self.assertEqual(stub.queries, 200)
+
+    def test_truncated_over_tcp(self):
+        with dns_stub({"a.test": ["192.0.2.1"]}, truncate=True) as stub, \
+                transport_pool() as pool:
+            prober = dnsprobe.from_string(stub.address, port=stub.port,
+                                          transport=pool)
+            for _ in range(5):
+                answer = prober.resolver.resolve("a.test", lifetime=1.0)
+                self.assertEqual(answer[0].to_text(), "192.0.2.1")
+            self.assertEqual(stub.tcp_queries, 5)
+            self.assertEqual(stub.tcp_connections, 1)
+            self.assertEqual(pool.tcp(stub.address, stub.port).connections,
+                             1)
+
+    def test_timeout(self):
+        with dns_stub({"a.test": ["192.0.2.1"]}, drop_rate=1.0) as stub, \
+                transport_pool() as pool:
+            transport = pool.udp(stub.address, stub.port)
+            self.assertRaises(Timeout, transport.query,
+                              make_query("a.test", "A"), 0.1)
+            self.assertEqual(transport.inflight, 0)
+            prober = dnsprobe.from_string(stub.address, port=stub.port,
+                                          transport=pool)
+            self.assertEqual(prober.check("a.test", lifetime=0.3),
+                             (-0.3, "LifetimeTimeout"))
+
+
+class test_stream_transport(unittest.TestCase):
+
+    def check_reuse(self, kind: str, stub, port: int):
+        with transport_pool(kind, client_context()) as pool:
+            prober = dnsprobe.from_string(stub.address, port=port,
+                                          transport=pool)
+            self.assertEqual(prober.transport, kind)
+            self.assertGreater(prober.connect(lifetime=2.0), 0.0)
+            self.assertEqual(prober.connect(lifetime=2.0), 0.0)
+            for _ in range(3):
+                self.assertEqual(prober.check("a.test", lifetime=2.0)[1],
+                                 None)
+            self.assertEqual(prober.check("b.test", lifetime=2.0)[1],
+                             "NXDOMAIN")
+            self.assertEqual(prober.setup.count, 1)
+
+    def test_tcp(self):
+        with dns_stub({"a.test": ["192.0.2.1"]}) as stub:
+            self.check_reuse("tcp", stub, stub.port)
+            self.assertEqual(stub.tcp_queries, 4)
+            self.assertEqual(stub.tcp_connections, 1)
+
+    def test_dot(self):
+        with dns_stub({"a.test": ["192.0.2.1"]},
+                      ssl_context=server_context()) as stub:
+            self.check_reuse("dot", stub, stub.port)
+            self.assertEqual(stub.tcp_queries, 4)
+            self.assertEqual(stub.tcp_connections, 1)
+
+    def test_dot_untrusted(self):
+        with dns_stub({"a.test": ["192.0.2.1"]},
+                      ssl_context=server_context()) as stub, \
+                transport_pool("dot") as pool:
+            prober = dnsprobe.from_string(stub.address, port=stub.port,
+                                          transport=pool)
+            self.assertEqual(prober.connect(lifetime=1.0), -1.0)
+
+    def test_doh(self):
+        with dns_stub({"a.test": ["192.0.2.1"]}) as dns, \
+                doh_stub(dns, server_context()) as stub:
+            self.check_reuse("doh", stub, stub.port)
+            self.assertEqual(dns.tcp_queries, 4)
+            self.assertEqual(stub.connections, 1)
+
+    def test_pipeline(self):
+        with dns_stub({"a.test": ["192.0.2.1"]}, latency=0.2,
+                      ssl_context=server_context()) as stub, \
+                transport_pool("dot", client_context()) as pool:
+            prober = dnsprobe.from_string(stub.address, port=stub.port,
+                                          transport=pool)
+            prober.connect(lifetime=2.0)
+            start = time.perf_counter()
+            stats = prober.test_pipeline("a.test", lifetime=2.0, count=10)
+            self.assertLess(time.perf_counter() - start, 1.0)
+            self.assertEqual(stats.received, 10)
+            self.assertEqual(stub.tcp_connections, 1)
+
+    def test_closed(self):
+        with dns_stub({"a.test": ["192.0.2.1"]}) as stub, \
+                transport_pool("tcp") as pool:
+            transport = pool.tcp(stub.address, stub.port)
+            transport.query(make_query("a.test", "A"), 1.0)
+            transport.close()
+            self.assertRaises(EOFError, transport.query,
+                              make_query("a.test", "A"), 1.0)
+
+    def test_close_pending(self):
+        errors = []
+        hook, threading.excepthook = threading.excepthook, errors.append
+        try:
+            with dns_stub({"a.test": ["192.0.2.1"]}, drop_rate=1.0) as stub:
+                for _ in range(20):  # close races the reader thread
+                    with transport_pool("tcp") as pool:
+                        pool.tcp(stub.address, stub.port).connect(1.0)
+                with transport_pool("tcp") as pool:
+                    transport = pool.tcp(stub.address, stub.port)
+                    timer = threading.Timer(0.2, transport.close)
+                    timer.start()
+                    start = time.perf_counter()
+                    self.assertRaises(EOFError, transport.query,
+                                      make_query("a.test", "A"), 5.0)
+                    self.assertLess(time.perf_counter() - start, 2.0)
+                    timer.join()
+        finally:
+            threading.excepthook = hook
+        self.assertEqual(errors, [])
+
+    def test_probe_engine(self):
+        with dns_stub({"a.test": ["192.0.2.1"]},
+                      ssl_context=server_context()) as stub:
+            engine = probe_engine(resolve_timeout=2.0, count=4,
+                                  pipeline=True)
+            results = list(engine.probe(
+                [stub.address], qname="a.test", enable_ping=False,
+                port=stub.port, transport="dot",
+                ssl_context=client_context()))
+            self.assertEqual(len(results), 1)
+            self.assertEqual(results[0].setup.received, 1)
+            self.assertEqual(results[0].resolve.received, 4)
+            self.assertEqual(stub.tcp_connections, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+# coding:utf-8
+
+from math import inf
+import unittest
+
+from netter.test.benchmark import loopback_addresses
+from netter.test.stubs import dns_stub
+from netter.utils import watcher
+
+
+class test_watcher(unittest.TestCase):
+
+    def test_budget_and_ranking(self):
+        addresses = loopback_addresses(4)
+        with dns_stub({"a.test": ["192.0.2.1"]}, addresses=addresses[:3],
+                      latency=0.01) as stub:
+            # the 4th address has no server, its probes are lost
+            watch = watcher(addresses, qname="a.test", interval=0.0,
+                            budget=3, window=4, resolve_timeout=0.2,
+                            port=stub.port)
+            rankings = list(watch.run(iterations=4))
+            self.assertEqual(watch.rounds, 4)
+            self.assertEqual(len(rankings), 4)
+            self.assertEqual(sum(server.resolve.total
+                                 for server in watch.servers), 12)
+            self.assertLessEqual(stub.queries, 12)
+            for server in watch.servers:
+                self.assertEqual(server.resolve.total, 3)
+            ranking = rankings[-1]
+            self.assertEqual(ranking[-1].nameserver, addresses[3])
+            self.assertEqual(ranking[-1].score, inf)
+            self.assertLess(ranking[0].score, 0.2)
+
+    def test_constant_memory(self):
+        with dns_stub({"a.test": ["192.0.2.1"]}) as stub:
+            watch = watcher([stub.address], qname="a.test", interval=0.0,
+                            window=5, port=stub.port)
+            for _ in watch.run(iterations=20):
+                pass
+            server = watch.servers[0]
+            self.assertEqual(server.resolve.total, 20)
+            self.assertEqual(server.resolve.count, 5)
+            self.assertEqual(server.resolve.window().count, 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
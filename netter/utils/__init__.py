@@ -1,22 +1,174 @@
 # coding:utf-8
 
-from .adapters import Context  # noqa:F401
-from .adapters import NetworkInterface  # noqa:F401
-from .format import MACAddress  # noqa:F401
-from .platform import assert_linux  # noqa:F401
-from .platform import assert_macos  # noqa:F401
-from .platform import assert_unix  # noqa:F401
-from .platform import assert_windows  # noqa:F401
-from .platform import is_linux  # noqa:F401
-from .platform import is_macos  # noqa:F401
-from .platform import is_unix  # noqa:F401
-from .platform import is_windows  # noqa:F401
-from .prober import EXAMPLE_DOMAIN  # noqa:F401
-from .prober import IPAddress  # noqa:F401
-from .prober import PING_MAX_TO  # noqa:F401
-from .prober import PING_MIN_TO  # noqa:F401
-from .prober import RESOLVE_MAX_TO  # noqa:F401
-from .prober import RESOLVE_MIN_TO  # noqa:F401
-from .prober import dnsprobe  # noqa:F401
-from .prober import ping  # noqa:F401
-from .prober import public_ip  # noqa:F401
+from typing import Dict
+from typing import List
+from typing import TYPE_CHECKING
+
+from .lazy import lazy_exports
+
+if TYPE_CHECKING:  # for static analysis, see __LAZY_ATTRS
+    from .adapters import Context  # noqa:F401
+    from .adapters import NetworkInterface  # noqa:F401
+    from .adapters import interface_diff  # noqa:F401
+    from .adapters import interface_snapshot  # noqa:F401
+    from .adapters import system_nameservers  # noqa:F401
+    from .constants import DNS_CACHE_SIZE  # noqa:F401
+    from .constants import DNS_PORTS  # noqa:F401
+    from .constants import DNS_TRANSPORTS  # noqa:F401
+    from .constants import EXAMPLE_DOMAIN  # noqa:F401
+    from .constants import HISTORY_KINDS  # noqa:F401
+    from .constants import HISTORY_PATH  # noqa:F401
+    from .constants import IPAddress  # noqa:F401
+    from .constants import METRICS_LISTEN  # noqa:F401
+    from .constants import PING_MAX_TO  # noqa:F401
+    from .constants import PING_MIN_TO  # noqa:F401
+    from .constants import REQUEST_TIMEOUT  # noqa:F401
+    from .constants import RESOLVE_MAX_TO  # noqa:F401
+    from .constants import RESOLVE_MIN_TO  # noqa:F401
+    from .exporter import metrics_exporter  # noqa:F401
+    from .format import MACAddress  # noqa:F401
+    from .history import history_store  # noqa:F401
+    from .history import parse_duration  # noqa:F401
+    from .icmp import async_pinger  # noqa:F401
+    from .icmp import pinger  # noqa:F401
+    from .icmp import shared_pinger  # noqa:F401
+    from .metrics import probe_metrics  # noqa:F401
+    from .netlink import netlink_monitor  # noqa:F401
+    from .parallel import DEFAULT_CONCURRENCY  # noqa:F401
+    from .parallel import imap_unordered  # noqa:F401
+    from .platform import assert_linux  # noqa:F401
+    from .platform import assert_macos  # noqa:F401
+    from .platform import assert_unix  # noqa:F401
+    from .platform import assert_windows  # noqa:F401
+    from .platform import is_linux  # noqa:F401
+    from .platform import is_macos  # noqa:F401
+    from .platform import is_unix  # noqa:F401
+    from .platform import is_windows  # noqa:F401
+    from .prober import adaptive_timeout  # noqa:F401
+    from .prober import dnscache  # noqa:F401
+    from .prober import dnsprobe  # noqa:F401
+    from .prober import ping  # noqa:F401
+    from .prober import ping_burst  # noqa:F401
+    from .prober import ping_many  # noqa:F401
+    from .prober import probe_engine  # noqa:F401
+    from .prober import probe_result  # noqa:F401
+    from .prober import rtt_estimator  # noqa:F401
+    from .public import public_ip  # noqa:F401
+    from .public import public_ip_client  # noqa:F401
+    from .public import public_ip_result  # noqa:F401
+    from .query import answer_digest  # noqa:F401
+    from .query import consistency  # noqa:F401
+    from .query import domain_diff  # noqa:F401
+    from .query import format_answer  # noqa:F401
+    from .query import parse_rdtypes  # noqa:F401
+    from .query import query_domain_names  # noqa:F401
+    from .query import query_result  # noqa:F401
+    from .query import read_domain_names  # noqa:F401
+    from .query import resolve_answer  # noqa:F401
+    from .query import resolver_diff  # noqa:F401
+    from .query import unique_domain_names  # noqa:F401
+    from .query import unique_nameservers  # noqa:F401
+    from .resolvconf import load_resolv_conf  # noqa:F401
+    from .resolvconf import resolv_conf  # noqa:F401
+    from .resolvconf import system_resolv_conf  # noqa:F401
+    from .scan import dns_scanner  # noqa:F401
+    from .scan import network_hosts  # noqa:F401
+    from .scan import parse_network  # noqa:F401
+    from .scan import scan_result  # noqa:F401
+    from .stats import STATISTICS  # noqa:F401
+    from .stats import format_delay  # noqa:F401
+    from .stats import format_stats  # noqa:F401
+    from .stats import latency  # noqa:F401
+    from .stats import rolling  # noqa:F401
+    from .stats import sampling  # noqa:F401
+    from .transport import new_ssl_context  # noqa:F401
+    from .transport import transport_pool  # noqa:F401
+    from .watch import health  # noqa:F401
+    from .watch import watcher  # noqa:F401
+
+# Submodules are imported on first attribute access (PEP 562), so that the
+# command line does not pay for dnspython, requests and psutil until a
+# command actually needs them.
+__LAZY_ATTRS: Dict[str, str] = {
+    "Context": ".adapters",
+    "NetworkInterface": ".adapters",
+    "interface_diff": ".adapters",
+    "interface_snapshot": ".adapters",
+    "system_nameservers": ".adapters",
+    "MACAddress": ".format",
+    "history_store": ".history",
+    "parse_duration": ".history",
+    "async_pinger": ".icmp",
+    "pinger": ".icmp",
+    "shared_pinger": ".icmp",
+    "netlink_monitor": ".netlink",
+    "metrics_exporter": ".exporter",
+    "probe_metrics": ".metrics",
+    "assert_linux": ".platform",
+    "assert_macos": ".platform",
+    "assert_unix": ".platform",
+    "assert_windows": ".platform",
+    "is_linux": ".platform",
+    "is_macos": ".platform",
+    "is_unix": ".platform",
+    "is_windows": ".platform",
+    "DEFAULT_CONCURRENCY": ".parallel",
+    "imap_unordered": ".parallel",
+    "DNS_CACHE_SIZE": ".constants",
+    "DNS_PORTS": ".constants",
+    "DNS_TRANSPORTS": ".constants",
+    "EXAMPLE_DOMAIN": ".constants",
+    "HISTORY_KINDS": ".constants",
+    "HISTORY_PATH": ".constants",
+    "IPAddress": ".constants",
+    "METRICS_LISTEN": ".constants",
+    "PING_MAX_TO": ".constants",
+    "PING_MIN_TO": ".constants",
+    "REQUEST_TIMEOUT": ".constants",
+    "RESOLVE_MAX_TO": ".constants",
+    "RESOLVE_MIN_TO": ".constants",
+    "adaptive_timeout": ".prober",
+    "dnscache": ".prober",
+    "dnsprobe": ".prober",
+    "ping": ".prober",
+    "ping_burst": ".prober",
+    "ping_many": ".prober",
+    "probe_engine": ".prober",
+    "probe_result": ".prober",
+    "rtt_estimator": ".prober",
+    "public_ip": ".public",
+    "public_ip_client": ".public",
+    "public_ip_result": ".public",
+    "answer_digest": ".query",
+    "consistency": ".query",
+    "domain_diff": ".query",
+    "format_answer": ".query",
+    "parse_rdtypes": ".query",
+    "query_domain_names": ".query",
+    "query_result": ".query",
+    "read_domain_names": ".query",
+    "resolve_answer": ".query",
+    "resolver_diff": ".query",
+    "unique_domain_names": ".query",
+    "unique_nameservers": ".query",
+    "load_resolv_conf": ".resolvconf",
+    "resolv_conf": ".resolvconf",
+    "system_resolv_conf": ".resolvconf",
+    "dns_scanner": ".scan",
+    "network_hosts": ".scan",
+    "parse_network": ".scan",
+    "scan_result": ".scan",
+    "STATISTICS": ".stats",
+    "format_delay": ".stats",
+    "format_stats": ".stats",
+    "latency": ".stats",
+    "rolling": ".stats",
+    "sampling": ".stats",
+    "new_ssl_context": ".transport",
+    "transport_pool": ".transport",
+    "health": ".watch",
+    "watcher": ".watch",
+}
+
+__all__: List[str] = list(__LAZY_ATTRS)
+__getattr__, __dir__ = lazy_exports(__name__, __LAZY_ATTRS)
@@ -1,21 +1,28 @@
 # coding:utf-8
 
+from socket import AF_INET
+from socket import AF_INET6
+import time
 from typing import Any
 from typing import Dict
 from typing import Iterable
 from typing import Iterator
+from typing import List
+from typing import Mapping
 from typing import Optional
+from typing import TYPE_CHECKING
 from typing import Tuple
 
-from psutil import AF_LINK
-from psutil import net_if_addrs
-from psutil._common import snicaddr
-
 from .format import MACAddress
 from .platform import assert_unix
 from .platform import assert_windows
+from .platform import is_linux
 from .platform import is_unix
 from .platform import is_windows
+from .resolvconf import load_resolv_conf
+
+if TYPE_CHECKING:  # psutil is imported on first use
+    from psutil._common import snicaddr
 
 if is_windows():
     import wmi
@@ -30,16 +37,20 @@ class Context:
         self.__interfaces: Dict[str, Any] = {}
         self.__nameservers: Optional[NAMESERVERS] = None
 
+    def refresh(self) -> None:
+        """forget the cached adapters and nameservers, read them again on
+        demand
+        """
+        self.__interfaces.clear()
+        self.__nameservers = None
+
     @property
     def nameservers(self) -> NAMESERVERS:
+        """nameservers of resolv.conf, loaded once until refresh()
+        """
         assert_unix()
         if self.__nameservers is None:
-            with open("/etc/resolv.conf", "r", encoding="utf-8") as rhdl:
-                self.__nameservers = tuple(
-                    line.split()[1]
-                    for line in rhdl.readlines()
-                    if "nameserver" in line
-                )
+            self.__nameservers = load_resolv_conf().nameservers
         return self.__nameservers
 
     def parse_windows_all_network_adapters(self):
@@ -75,25 +86,52 @@ class Context:
 
 
 class NetworkInterface:
-    def __init__(self, name: str, addresses: Iterable[snicaddr],
+    """Network Interface
+
+    Only the first MAC address and the address strings are kept (no psutil
+    records), the combined IP address tuple is built on first access.
+    Hashing and equality use the name and the packed MAC address.
+    """
+
+    __slots__ = ("__name", "__desc", "__mac_addr", "__ipv4_addrs",
+                 "__ipv6_addrs", "__ip_addrs", "__nameservers")
+
+    def __init__(self, name: str, addresses: "Iterable[snicaddr]",
                  context: Optional[Context] = None):
+        from psutil import AF_LINK  # pylint: disable=C0415
+
+        mac_addr: Optional[MACAddress] = None
+        ipv4_addrs: List[str] = []
+        ipv6_addrs: List[str] = []
+        for addr in addresses:
+            if addr.family == AF_INET:
+                ipv4_addrs.append(addr.address)
+            elif addr.family == AF_INET6:
+                ipv6_addrs.append(addr.address)
+            elif addr.family == AF_LINK and mac_addr is None:
+                mac_addr = MACAddress(addr.address)
         self.__name: str = name
         self.__desc: str = name
-        self.__mac_addrs: Tuple[MACAddress, ...] = tuple(
-            MACAddress(addr.address) for addr in addresses
-            if addr.family == AF_LINK)
-        self.__ipv4_addrs: Tuple[snicaddr, ...] = tuple(
-            addr for addr in addresses if addr.family.name == "AF_INET")
-        self.__ipv6_addrs: Tuple[snicaddr, ...] = tuple(
-            addr for addr in addresses if addr.family.name == "AF_INET6")
-        self.__ip_addrs: Tuple[snicaddr, ...] = self.__ipv4_addrs + \
-            self.__ipv6_addrs
+        self.__mac_addr: Optional[MACAddress] = mac_addr
+        self.__ipv4_addrs: ADDRESSES = tuple(ipv4_addrs)
+        self.__ipv6_addrs: ADDRESSES = tuple(ipv6_addrs)
+        self.__ip_addrs: Optional[ADDRESSES] = None
         self.__nameservers: NAMESERVERS = ()
 
-        if self.mac_enabled:
+        if mac_addr is not None:
             ctx: Context = context or Context()
-            self.__desc = ctx.parse_description(self.name, self.mac_address)
-            self.__nameservers = ctx.parse_nameservers(self.mac_address)
+            self.__desc = ctx.parse_description(self.name, mac_addr)
+            self.__nameservers = ctx.parse_nameservers(mac_addr)
+
+    def __eq__(self, value: object) -> bool:
+        if not isinstance(value, NetworkInterface) or \
+                self.name != value.name or \
+                self.mac_enabled != value.mac_enabled:
+            return False
+        return not self.mac_enabled or self.mac_address == value.mac_address
+
+    def __hash__(self) -> int:
+        return hash((self.__name, self.__mac_addr))
 
     @property
     def name(self) -> str:
@@ -105,29 +143,31 @@ class NetworkInterface:
 
     @property
     def mac_enabled(self) -> bool:
-        return len(self.__mac_addrs) > 0
+        return self.__mac_addr is not None
 
     @property
     def mac_address(self) -> MACAddress:
-        if len(self.__mac_addrs) > 0:
-            return self.__mac_addrs[0]
+        if self.__mac_addr is not None:
+            return self.__mac_addr
         raise LookupError(f"Interface '{self.name}' MAC address not found.")
 
     @property
     def ip_enabled(self) -> bool:
-        return len(self.__ip_addrs) > 0
+        return len(self.__ipv4_addrs) > 0 or len(self.__ipv6_addrs) > 0
 
     @property
     def ip_address(self) -> ADDRESSES:
-        return tuple(addr.address for addr in self.__ip_addrs)
+        if self.__ip_addrs is None:
+            self.__ip_addrs = self.__ipv4_addrs + self.__ipv6_addrs
+        return self.__ip_addrs
 
     @property
     def ipv4_address(self) -> ADDRESSES:
-        return tuple(addr.address for addr in self.__ipv4_addrs)
+        return self.__ipv4_addrs
 
     @property
     def ipv6_address(self) -> ADDRESSES:
-        return tuple(addr.address for addr in self.__ipv6_addrs)
+        return self.__ipv6_addrs
 
     @property
     def dns_enabled(self) -> bool:
@@ -143,6 +183,196 @@ class NetworkInterface:
 
     @classmethod
     def load(cls) -> "Iterator[NetworkInterface]":
+        from psutil import net_if_addrs  # pylint: disable=C0415
+
         context: Context = Context()
         for name, addrs in net_if_addrs().items():
             yield cls(name, addrs, context)
+
+
+def system_nameservers() -> Iterator[Tuple[Optional[NetworkInterface],
+                                           NAMESERVERS]]:
+    """nameservers of the system resolver
+
+    Yield (interface, nameservers) of each enabled interface on Windows,
+    (None, nameservers of resolv.conf) on Unix.
+    """
+    if is_windows():
+        for iface in NetworkInterface.load():
+            if iface.mac_enabled and iface.ip_enabled and iface.dns_enabled:
+                yield iface, iface.nameservers
+    elif is_unix():
+        yield None, Context().nameservers
+
+
+class interface_diff:
+    """Changes between two interface snapshots
+
+    Changed interfaces are (old, new) pairs, events() breaks them down
+    into added or removed MAC addresses, IP addresses and nameservers.
+    """
+
+    FIELDS = ("interface", "action", "item", "value")
+
+    def __init__(self, added: Iterable[NetworkInterface] = (),
+                 removed: Iterable[NetworkInterface] = (),
+                 changed: Iterable[Tuple[NetworkInterface,
+                                         NetworkInterface]] = ()):
+        self.__added: Tuple[NetworkInterface, ...] = tuple(added)
+        self.__removed: Tuple[NetworkInterface, ...] = tuple(removed)
+        self.__changed: Tuple[Tuple[NetworkInterface, NetworkInterface],
+                              ...] = tuple(changed)
+
+    def __bool__(self) -> bool:
+        return len(self.__added) > 0 or len(self.__removed) > 0 or \
+            len(self.__changed) > 0
+
+    @property
+    def added(self) -> Tuple[NetworkInterface, ...]:
+        return self.__added
+
+    @property
+    def removed(self) -> Tuple[NetworkInterface, ...]:
+        return self.__removed
+
+    @property
+    def changed(self) -> Tuple[Tuple[NetworkInterface, NetworkInterface],
+                               ...]:
+        return self.__changed
+
+    @classmethod
+    def items(cls, iface: NetworkInterface) -> Iterator[Tuple[str, str]]:
+        if iface.mac_enabled:
+            yield "mac", iface.mac_address.colon
+        for address in iface.ip_address:
+            yield "address", address
+        for nameserver in iface.nameservers:
+            yield "nameserver", nameserver
+
+    def events(self) -> Iterator[Tuple[str, str, str, str]]:
+        """(interface, action, item, value), action is added or removed,
+        item is interface, mac, address or nameserver
+        """
+        for iface in self.added:
+            yield iface.name, "added", "interface", iface.name
+        for iface in self.removed:
+            yield iface.name, "removed", "interface", iface.name
+        for old, new in self.changed:
+            olds: List[Tuple[str, str]] = list(self.items(old))
+            news: List[Tuple[str, str]] = list(self.items(new))
+            for item, value in olds:
+                if (item, value) not in news:
+                    yield new.name, "removed", item, value
+            for item, value in news:
+                if (item, value) not in olds:
+                    yield new.name, "added", item, value
+
+    def dump(self) -> Iterator[Dict[str, str]]:
+        for event in self.events():
+            yield dict(zip(self.FIELDS, event))
+
+
+class interface_snapshot:
+    """Network Interface Snapshot
+
+    Keep the interfaces of the previous refresh, refresh() only rebuilds
+    interfaces whose psutil addresses or nameservers differ and returns the
+    changes. On Linux, watch() waits for rtnetlink events instead of
+    loading all interfaces every interval, and only rechecks nameservers
+    while nothing happens.
+    """
+
+    def __init__(self, context: Optional[Context] = None):
+        self.__context: Context = context or Context()
+        self.__addresses: Dict[str, Tuple["snicaddr", ...]] = {}
+        self.__interfaces: Dict[str, NetworkInterface] = {}
+        self.__rebuilt: int = 0
+
+    @property
+    def interfaces(self) -> Dict[str, NetworkInterface]:
+        return dict(self.__interfaces)
+
+    @property
+    def rebuilt(self) -> int:
+        """interface objects built so far
+        """
+        return self.__rebuilt
+
+    def unchanged(self, iface: NetworkInterface,
+                  addresses: Tuple["snicaddr", ...]) -> bool:
+        if self.__addresses.get(iface.name) != addresses:
+            return False
+        return not iface.mac_enabled or iface.nameservers == \
+            self.__context.parse_nameservers(iface.mac_address)
+
+    def refresh(self, addresses: Optional[Mapping[
+            str, Iterable["snicaddr"]]] = None) -> interface_diff:
+        """take a new snapshot, return the changes since the previous one
+
+        Addresses default to psutil.net_if_addrs().
+        """
+        if addresses is None:
+            from psutil import net_if_addrs  # pylint: disable=C0415
+            addresses = net_if_addrs()
+        self.__context.refresh()
+        current: Dict[str, Tuple["snicaddr", ...]] = {
+            name: tuple(addrs) for name, addrs in addresses.items()}
+        interfaces: Dict[str, NetworkInterface] = {}
+        added: List[NetworkInterface] = []
+        changed: List[Tuple[NetworkInterface, NetworkInterface]] = []
+        for name, addrs in current.items():
+            old: Optional[NetworkInterface] = self.__interfaces.get(name)
+            if old is not None and self.unchanged(old, addrs):
+                interfaces[name] = old
+                continue
+            new = NetworkInterface(name, addrs, self.__context)
+            self.__rebuilt += 1
+            interfaces[name] = new
+            if old is None:
+                added.append(new)
+            else:
+                changed.append((old, new))
+        removed: List[NetworkInterface] = [
+            iface for name, iface in self.__interfaces.items()
+            if name not in current]
+        self.__addresses = current
+        self.__interfaces = interfaces
+        return interface_diff(added, removed, changed)
+
+    def refresh_nameservers(self) -> interface_diff:
+        """recheck nameservers only, keep the addresses of the snapshot
+        """
+        return self.refresh(self.__addresses)
+
+    def watch(self, interval: float = 1.0, netlink: Optional[bool] = None
+              ) -> Iterator[interface_diff]:
+        """refresh forever, yield each non-empty change
+
+        Netlink defaults to True on Linux, falls back to polling every
+        interval if rtnetlink is unavailable.
+        """
+        from .netlink import netlink_monitor  # pylint: disable=C0415
+
+        monitor: Optional[netlink_monitor] = None
+        if netlink is None:
+            netlink = is_linux()
+        if netlink:
+            try:
+                monitor = netlink_monitor()
+            except OSError:
+                monitor = None
+        try:
+            diff: interface_diff = self.refresh()
+            while True:
+                if diff:
+                    yield diff
+                if monitor is None:
+                    time.sleep(interval)
+                    diff = self.refresh()
+                elif monitor.wait(interval):
+                    diff = self.refresh()
+                else:
+                    diff = self.refresh_nameservers()
+        finally:
+            if monitor is not None:
+                monitor.close()
@@ -0,0 +1,22 @@
+# coding:utf-8
+
+from ipaddress import IPv4Address
+from ipaddress import IPv6Address
+from typing import Union
+
+IPAddress = Union[IPv4Address, IPv6Address]
+
+PING_MIN_TO = 1
+PING_MAX_TO = 8
+RESOLVE_MIN_TO = 0.1
+RESOLVE_MAX_TO = 8.0
+ADAPTIVE_MIN_TO = 1.0  # adaptive deadlines never abort a probe earlier
+ABORTED = "QueryAborted"  # status of a probe aborted at its deadline
+EXAMPLE_DOMAIN = "example.com"
+REQUEST_TIMEOUT = 5.0
+DNS_CACHE_SIZE = 100000
+METRICS_LISTEN = ":9450"
+DNS_TRANSPORTS = ("udp", "tcp", "dot", "doh")
+DNS_PORTS = {"udp": 53, "tcp": 53, "dot": 853, "doh": 443}
+HISTORY_PATH = "~/.netter/history.sqlite3"
+HISTORY_KINDS = ("ping", "resolve", "public_ip")
@@ -0,0 +1,205 @@
+# coding:utf-8
+
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+import logging
+import socket
+from threading import Event
+from threading import Thread
+import time
+from typing import Iterable
+from typing import List
+from typing import Mapping
+from typing import Optional
+from typing import Tuple
+
+from .constants import EXAMPLE_DOMAIN
+from .constants import METRICS_LISTEN
+from .constants import PING_MIN_TO
+from .history import history_store
+from .metrics import CONTENT_TYPE
+from .metrics import probe_metrics
+from .parallel import DEFAULT_CONCURRENCY
+from .parallel import imap_unordered
+from .prober import dnsprobe
+from .public import public_ip
+from .public import public_ip_client
+from .resolvconf import resolv_conf
+from .transport import transport_pool
+
+LOGGER = logging.getLogger(__name__)
+
+
+def parse_listen(listen: str) -> Tuple[str, int]:
+    '''parse [HOST]:PORT, an IPv6 host is enclosed in brackets
+    '''
+    host, sep, port = listen.rpartition(":")
+    if not sep or not port.isdigit():
+        raise ValueError(f"invalid listen address: {listen}")
+    if host.startswith("[") and host.endswith("]"):
+        host = host[1:-1]
+        if ":" not in host:
+            raise ValueError(f"invalid listen address: {listen}")
+    elif ":" in host:  # ambiguous, e.g. ::1:9100
+        raise ValueError(f"IPv6 host must be enclosed in brackets: {listen}")
+    return host, int(port)
+
+
+class metrics_server(ThreadingHTTPServer):
+    '''HTTP server of an IPv4 host (or all IPv4 addresses)
+    '''
+    daemon_threads = True
+
+
+class metrics_server6(metrics_server):
+    '''HTTP server of an IPv6 host
+    '''
+    address_family = socket.AF_INET6
+
+
+class metrics_exporter():
+    '''Metrics Exporter
+
+    A background thread probes nameservers (and public IP providers) every
+    interval seconds and publishes the metrics, the HTTP server only serves
+    the last published text on /metrics. With a history store, the samples
+    of each round are also written in one batch.
+    '''
+
+    def __init__(self, nameservers: Iterable[str],
+                 listen: str = METRICS_LISTEN, qname: str = EXAMPLE_DOMAIN,
+                 interval: float = 15.0, resolve_timeout: float = 2.0,
+                 enable_ping: bool = False,
+                 public_ip_flag: Optional[public_ip.flags] = None,
+                 public_ip_urls: Optional[Mapping[public_ip.flags,
+                                                  str]] = None,
+                 concurrency: int = DEFAULT_CONCURRENCY, port: int = 53,
+                 config: Optional[resolv_conf] = None,
+                 history: Optional[history_store] = None):
+        self.__metrics: probe_metrics = probe_metrics()
+        self.__qname: str = qname
+        self.__interval: float = interval
+        self.__resolve_timeout: float = resolve_timeout
+        self.__enable_ping: bool = enable_ping
+        self.__public_ip_flag: Optional[public_ip.flags] = public_ip_flag
+        self.__public_ip_urls = public_ip_urls
+        self.__concurrency: int = concurrency
+        self.__history: Optional[history_store] = history
+        self.__stopped: Event = Event()
+        state = self.__metrics
+
+        class handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):  # pylint: disable=invalid-name
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                data: bytes = state.text
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):  # pylint: disable=arguments-differ
+                pass
+
+        # raise ValueError for an invalid listen address or nameserver,
+        # OSError if the address cannot be bound
+        host, listen_port = parse_listen(listen)
+        self.__transport: transport_pool = transport_pool()
+        try:
+            self.__probers: Tuple[dnsprobe, ...] = tuple(
+                dnsprobe.from_string(nameserver, port=port,
+                                     transport=self.__transport,
+                                     config=config, history=history)
+                for nameserver in dict.fromkeys(nameservers))
+            server = metrics_server6 if ":" in host else metrics_server
+            self.__server: metrics_server = server((host, listen_port),
+                                                   handler)
+        except BaseException:
+            self.__transport.close()
+            raise
+        self.__threads: List[Thread] = [
+            Thread(target=self.__server.serve_forever, daemon=True),
+            Thread(target=self.loop, daemon=True)]
+
+    def __enter__(self) -> "metrics_exporter":
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    @property
+    def metrics(self) -> probe_metrics:
+        return self.__metrics
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        '''the bound (host, port)
+        '''
+        return self.__server.server_address[:2]  # type: ignore
+
+    def start(self) -> None:
+        for thread in self.__threads:
+            thread.start()
+
+    def stop(self) -> None:
+        self.__stopped.set()
+        self.__server.shutdown()
+        self.__server.server_close()
+        self.__threads[1].join()
+        self.__transport.close()
+
+    def wait(self) -> None:
+        '''block until stopped
+        '''
+        self.__stopped.wait()
+
+    def probe_round(self, client: Optional[public_ip_client] = None) -> None:
+        def run(job: Tuple[dnsprobe, str]) -> None:
+            prober, kind = job
+            if kind == "ping":
+                self.metrics.record_ping(
+                    prober.address, prober.ping(lifetime=PING_MIN_TO))
+                return
+            delay, error = prober.check(qname=self.__qname,
+                                        lifetime=self.__resolve_timeout)
+            self.metrics.record_resolve(prober.address, delay, error)
+
+        jobs: List[Tuple[dnsprobe, str]] = [
+            (prober, kind) for prober in self.__probers
+            for kind in (("resolve", "ping") if self.__enable_ping
+                         else ("resolve",))]
+        for _ in imap_unordered(run, jobs, self.__concurrency):
+            pass
+        if client is not None and self.__public_ip_flag is not None:
+            self.metrics.record_public_ip([
+                (result.site, result.address, result.delay, result.error)
+                for result in client.results(self.__public_ip_flag)])
+        self.metrics.publish()
+        if self.__history is not None:
+            self.__history.flush()
+
+    def loop(self) -> None:
+        client: Optional[public_ip_client] = public_ip_client(
+            timeout=self.__resolve_timeout, max_connections=1,
+            urls=self.__public_ip_urls, history=self.__history) \
+            if self.__public_ip_flag is not None else None
+        try:
+            while not self.__stopped.is_set():
+                start: float = time.perf_counter()
+                try:
+                    self.probe_round(client)
+                except Exception as e:  # pylint: disable=broad-except
+                    # keep serving, the next round may succeed
+                    LOGGER.exception("probe round failed")
+                    self.metrics.record_round_error(type(e).__name__)
+                self.__stopped.wait(max(0.0, start + self.__interval -
+                                        time.perf_counter()))
+        finally:
+            if client is not None:
+                client.close()
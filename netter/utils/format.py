@@ -1,32 +1,63 @@
 # coding:utf-8
 
-from typing import Tuple
+from typing import Optional
+from typing import Union
 
 
 class MACAddress:
-    def __init__(self, mac_address: str):
-        cleaned_mac: str = mac_address.replace(":", "").replace("-", "")
-        bytes_mac: bytes = bytes.fromhex(cleaned_mac)
-        if not isinstance(bytes_mac, bytes) or len(bytes_mac) != 6:
-            raise ValueError(f"Invalid MAC address: {mac_address}")
-        mac: Tuple[str, ...] = tuple(f"{b:02X}" for b in bytes_mac)
-        self.__colon_mac = ":".join(mac)
-        self.__dash_mac = "-".join(mac)
+    """MAC address backed by its 6 packed bytes
+
+    The colon and dash forms are formatted on first access and cached,
+    hashing and equality use the packed bytes.
+    """
+
+    __slots__ = ("__packed", "__colon_mac", "__dash_mac")
+
+    def __init__(self, mac_address: Union[str, bytes]):
+        if isinstance(mac_address, bytes):
+            bytes_mac: bytes = mac_address
+        else:
+            try:
+                bytes_mac = bytes.fromhex(
+                    mac_address.replace(":", "").replace("-", ""))
+            except ValueError as e:
+                raise ValueError(f"Invalid MAC address: {mac_address}") from e
+        if len(bytes_mac) != 6:
+            raise ValueError(f"Invalid MAC address: {mac_address!r}")
+        self.__packed: bytes = bytes_mac
+        self.__colon_mac: Optional[str] = None
+        self.__dash_mac: Optional[str] = None
 
     def __str__(self) -> str:
         return self.colon
 
+    def __repr__(self) -> str:
+        return f"MACAddress('{self.colon}')"
+
     def __eq__(self, value: object) -> bool:
-        return isinstance(value, MACAddress) and self.colon == value.colon
+        return isinstance(value, MACAddress) and self.packed == value.packed
+
+    def __hash__(self) -> int:
+        return hash(self.__packed)
+
+    @property
+    def packed(self) -> bytes:
+        """the 6 bytes of the address
+        """
+        return self.__packed
 
     @property
     def colon(self) -> str:
         """colon-separated hexadecimal (XX:XX:XX:XX:XX:XX)
         """
+        if self.__colon_mac is None:
+            self.__colon_mac = self.__packed.hex(":").upper()
         return self.__colon_mac
 
     @property
     def dash(self) -> str:
         """dash-separated hexadecimal (XX-XX-XX-XX-XX-XX)
         """
+        if self.__dash_mac is None:
+            self.__dash_mac = self.__packed.hex("-").upper()
         return self.__dash_mac
@@ -0,0 +1,185 @@
+# coding:utf-8
+
+from math import nan
+import os
+import sqlite3
+from threading import Lock
+import time
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from .constants import ABORTED
+from .constants import HISTORY_KINDS
+from .constants import HISTORY_PATH
+from .stats import latency
+
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+RECORD = Tuple[str, str, float, float, Optional[str]]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    target TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    time REAL NOT NULL,
+    delay REAL NOT NULL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS samples_target_time ON samples (target, time);
+"""
+
+
+def parse_duration(value: str) -> float:
+    '''seconds of a duration like 90s, 30m, 12h, 7d or 2w (default unit s)
+    '''
+    text: str = value.strip().lower()
+    unit: int = DURATION_UNITS.get(text[-1:], 0)
+    number: str = text[:-1] if unit > 0 else text
+    try:
+        seconds: float = float(number) * (unit or 1)
+    except ValueError as e:
+        raise ValueError(f"invalid duration: {value!r}") from e
+    if seconds < 0:
+        raise ValueError(f"invalid duration: {value!r}")
+    return seconds
+
+
+class history_store():
+    '''Probe History Store (SQLite)
+
+    Append-only samples of ping, resolve and public IP queries: target
+    (nameserver address or provider site), kind, time (UNIX seconds), delay
+    (negative means timeout) and error. Records are buffered and written
+    in one transaction per batch_size records, or on flush() and close().
+    Records after close() (e.g. late results of cancelled queries) are
+    dropped.
+    Samples are indexed by (target, time), a range query of one target
+    only reads its rows.
+    '''
+
+    def __init__(self, path: str = HISTORY_PATH, batch_size: int = 1000):
+        assert batch_size > 0, f"invalid batch size: {batch_size}"
+        path = os.path.expanduser(path)
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = sqlite3.connect(path, check_same_thread=False)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+        except BaseException:
+            conn.close()
+            raise
+        self.__path: str = path
+        self.__conn: sqlite3.Connection = conn
+        self.__lock: Lock = Lock()
+        self.__batch_size: int = batch_size
+        self.__pending: List[RECORD] = []
+        self.__written: int = 0
+        self.__closed: bool = False
+
+    def __enter__(self) -> "history_store":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def path(self) -> str:
+        return self.__path
+
+    @property
+    def batch_size(self) -> int:
+        return self.__batch_size
+
+    @property
+    def pending(self) -> int:
+        '''records not written yet
+        '''
+        return len(self.__pending)
+
+    @property
+    def written(self) -> int:
+        return self.__written
+
+    def close(self) -> None:
+        with self.__lock:
+            if self.__closed:
+                return
+            self.__write()
+            self.__closed = True
+            self.__conn.close()
+
+    def record(self, kind: str, target: str, delay: float,
+               error: Optional[str] = None,
+               timestamp: Optional[float] = None) -> None:
+        assert kind in HISTORY_KINDS, f"unexpected kind: {kind}"
+        with self.__lock:
+            if self.__closed:
+                return
+            self.__pending.append((target, kind, time.time() if timestamp
+                                   is None else timestamp, delay, error))
+            if len(self.__pending) >= self.__batch_size:
+                self.__write()
+
+    def flush(self) -> None:
+        with self.__lock:
+            if not self.__closed:
+                self.__write()
+
+    def __write(self) -> None:
+        if len(self.__pending) == 0:
+            return
+        with self.__conn:
+            self.__conn.executemany(
+                "INSERT INTO samples (target, kind, time, delay, error) "
+                "VALUES (?, ?, ?, ?, ?)", self.__pending)
+        self.__written += len(self.__pending)
+        self.__pending.clear()
+
+    def targets(self) -> List[str]:
+        '''all recorded targets, from the index
+        '''
+        self.flush()
+        with self.__lock:
+            return [row[0] for row in self.__conn.execute(
+                "SELECT DISTINCT target FROM samples ORDER BY target")]
+
+    def samples(self, target: str, since: float = 0.0,
+                until: Optional[float] = None
+                ) -> Iterator[Tuple[str, float, float, Optional[str]]]:
+        '''(kind, time, delay, error) of target in [since, until), by time
+        '''
+        self.flush()
+        with self.__lock:
+            rows = self.__conn.execute(
+                "SELECT kind, time, delay, error FROM samples "
+                "WHERE target = ? AND time >= ? AND time < ? ORDER BY time",
+                (target, since, float("inf") if until is None else until))
+        while True:
+            with self.__lock:
+                batch = rows.fetchmany(self.__batch_size)
+            if len(batch) == 0:
+                break
+            yield from batch
+
+    def summary(self, since: float = 0.0, until: Optional[float] = None,
+                target: Optional[str] = None, kind: Optional[str] = None
+                ) -> Iterator[Tuple[str, str, latency]]:
+        '''(target, kind, latency) of each target and kind with samples
+
+        Rows are streamed by target, only the delays of one target are held
+        in memory (compact arrays) to compute the percentiles.
+        '''
+        for _target in [target] if target is not None else self.targets():
+            stats: Dict[str, latency] = {}
+            for _kind, _, delay, error in self.samples(
+                    _target, since, until):
+                if kind is None or _kind == kind:
+                    stats.setdefault(_kind, latency()).add(
+                        nan if error == ABORTED else delay)
+            for _kind in sorted(stats):
+                yield _target, _kind, stats[_kind]
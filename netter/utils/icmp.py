@@ -0,0 +1,341 @@
+# coding:utf-8
+
+from array import array
+import asyncio
+from asyncio import run_coroutine_threadsafe
+from ipaddress import ip_address
+import os
+from random import randint
+import socket
+import struct
+from threading import Lock
+from threading import Thread
+import time
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import TYPE_CHECKING
+from typing import Tuple
+
+from .constants import IPAddress
+from .parallel import DEFAULT_CONCURRENCY
+from .platform import is_macos
+
+if TYPE_CHECKING:
+    from .prober import adaptive_timeout
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+ICMPV6_ECHO_REQUEST = 128
+ICMPV6_ECHO_REPLY = 129
+ICMP_HEADER = struct.Struct("!BBHHH")
+PAYLOAD = bytes(range(0x20, 0x20 + 56))
+
+
+def checksum(data: bytes) -> int:
+    if len(data) % 2:
+        data += b"\x00"
+    total: int = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+class icmp_socket():
+    '''ICMP Echo Socket
+
+    Raw socket if permitted, otherwise an unprivileged datagram socket (the
+    kernel rewrites the identifier to the local port).
+    '''
+
+    def __init__(self, family: int):
+        proto: int = socket.IPPROTO_ICMP if family == socket.AF_INET \
+            else socket.IPPROTO_ICMPV6
+        try:
+            sock = socket.socket(family, socket.SOCK_RAW, proto)
+            self.__raw: bool = True
+        except PermissionError:
+            sock = socket.socket(family, socket.SOCK_DGRAM, proto)
+            self.__raw = False
+        sock.setblocking(False)
+        self.__sock: socket.socket = sock
+        self.__family: int = family
+        self.__ident: int = os.getpid() & 0xFFFF
+
+    @property
+    def sock(self) -> socket.socket:
+        return self.__sock
+
+    @property
+    def family(self) -> int:
+        return self.__family
+
+    @property
+    def ident(self) -> int:
+        return self.__ident
+
+    def close(self) -> None:
+        self.__sock.close()
+
+    def fileno(self) -> int:
+        return self.__sock.fileno()
+
+    def send(self, address: str, seq: int) -> None:
+        if self.family == socket.AF_INET:
+            header = ICMP_HEADER.pack(ICMP_ECHO_REQUEST, 0, 0, self.ident, seq)
+            header = ICMP_HEADER.pack(ICMP_ECHO_REQUEST, 0,
+                                      checksum(header + PAYLOAD),
+                                      self.ident, seq)
+        else:  # the kernel computes ICMPv6 checksum
+            header = ICMP_HEADER.pack(ICMPV6_ECHO_REQUEST, 0, 0,
+                                      self.ident, seq)
+        self.__sock.sendto(header + PAYLOAD, (address, 0))
+
+    def recv(self) -> Optional[Tuple[str, int]]:
+        '''receive one echo reply, return (source address, sequence)
+        '''
+        try:
+            data, addr = self.__sock.recvfrom(4096)
+        except (BlockingIOError, InterruptedError):
+            return None
+        if self.family == socket.AF_INET:
+            if self.__raw or is_macos():  # with IPv4 header
+                data = data[(data[0] & 0x0F) * 4:]
+            expect_type = ICMP_ECHO_REPLY
+        else:
+            expect_type = ICMPV6_ECHO_REPLY
+        if len(data) < ICMP_HEADER.size:
+            return None
+        _type, _, _, ident, seq = ICMP_HEADER.unpack_from(data)
+        if _type != expect_type:
+            return None
+        if ident not in (self.ident, self.__sock.getsockname()[1]):
+            return None
+        return addr[0].split("%")[0], seq
+
+
+class async_pinger():
+    '''Asynchronous ICMP Pinger
+
+    Share one ICMP socket per address family on the running event loop,
+    keep many echo requests outstanding and match replies by identifier
+    and sequence. An instance is bound to the loop that first uses it.
+    '''
+
+    def __init__(self):
+        self.__loop: Optional[asyncio.AbstractEventLoop] = None
+        self.__sockets: Dict[int, icmp_socket] = {}
+        self.__inflight: Dict[int, Tuple[str, float, asyncio.Future]] = {}
+        # raw sockets of the process share the identifier, start the
+        # sequences of concurrent pingers apart
+        self.__seq: int = randint(0, 0xFFFF)
+
+    async def __aenter__(self) -> "async_pinger":
+        return self
+
+    async def __aexit__(self, *args):
+        self.close()
+
+    def close(self) -> None:
+        for sock in self.__sockets.values():
+            if self.__loop is not None and not self.__loop.is_closed():
+                self.__loop.remove_reader(sock.fileno())
+            sock.close()
+        self.__sockets.clear()
+        for _, _, future in self.__inflight.values():
+            future.cancel()
+        self.__inflight.clear()
+
+    def socket(self, address: IPAddress) -> icmp_socket:
+        '''ICMP socket of the address family, read by the running loop
+
+        Raise OSError if ICMP is not permitted, NotImplementedError if the
+        loop cannot watch sockets (the Windows proactor loop).
+        '''
+        family: int = socket.AF_INET if address.version == 4 \
+            else socket.AF_INET6
+        if family not in self.__sockets:
+            loop = asyncio.get_running_loop()
+            assert self.__loop in (None, loop), "bound to another loop"
+            sock: icmp_socket = icmp_socket(family)
+            try:
+                loop.add_reader(sock.fileno(), self.__readable, sock)
+            except NotImplementedError:
+                sock.close()
+                raise
+            self.__loop = loop
+            self.__sockets[family] = sock
+        return self.__sockets[family]
+
+    def next_seq(self) -> int:
+        '''next sequence not used by an outstanding echo request
+        '''
+        assert len(self.__inflight) < 0xFFFF, "sequence space exhausted"
+        while True:
+            self.__seq = (self.__seq + 1) & 0xFFFF
+            if self.__seq not in self.__inflight:
+                return self.__seq
+
+    def __readable(self, sock: icmp_socket) -> None:
+        received: float = time.perf_counter()
+        while True:
+            reply = sock.recv()
+            if reply is None:
+                break
+            source, seq = reply
+            if seq not in self.__inflight:
+                continue
+            addr, sent, future = self.__inflight[seq]
+            if addr == str(ip_address(source)) and not future.done():
+                future.set_result(received - sent)
+
+    async def echo(self, address: str, timeout: float = 1.0) -> float:
+        '''Send one echo request, return delay (in seconds) of the reply
+
+        Negative delay means no reply within timeout, or the request could
+        not be sent (e.g. network unreachable).
+        '''
+        addr: IPAddress = ip_address(address)
+        sock: icmp_socket = self.socket(addr)
+        seq: int = self.next_seq()
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        sent: float = time.perf_counter()
+        self.__inflight[seq] = (str(addr), sent, future)
+        try:
+            sock.send(str(addr), seq)
+            return await asyncio.wait_for(future, timeout)
+        except (OSError, asyncio.TimeoutError):
+            return min(sent - time.perf_counter(), -1e-9)
+        finally:
+            self.__inflight.pop(seq, None)
+
+    async def __echo_at(self, due: float, address: str, timeout: float,
+                        slots: asyncio.Semaphore,
+                        adaptive: Optional["adaptive_timeout"]) -> float:
+        '''wait until due, then echo once a concurrency slot is free
+        '''
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        async with slots:
+            limit: float = timeout if adaptive is None \
+                else min(timeout, adaptive.timeout(address))
+            delay: float = await self.echo(address, limit)
+        if adaptive is not None:
+            adaptive.observe(address, delay if delay >= 0 else -1.0)
+        return delay
+
+    async def ping(self, addresses: Iterable[str], count: int = 1,
+                   interval: float = 0.0, timeout: float = 1.0,
+                   concurrency: int = DEFAULT_CONCURRENCY,
+                   deadline: Optional[float] = None,
+                   adaptive: Optional["adaptive_timeout"] = None
+                   ) -> Dict[str, array]:
+        '''Ping each address count times, interval seconds apart
+
+        Return the delays (in seconds) of each address in burst order,
+        negative delay means timeout. At most concurrency requests are in
+        flight, a burst is not held back by the replies of the previous
+        one. If deadline (in seconds) is specified, stop waiting once it is
+        reached. With adaptive, each request waits up to the adaptive
+        deadline of its address (at most timeout) and the delays are
+        observed.
+        '''
+        assert isinstance(count, int), f"unexpected type: {type(count)}"
+        assert count > 0, f"invalid count: {count}"
+        assert concurrency > 0, f"invalid concurrency: {concurrency}"
+        addrs: Dict[str, IPAddress] = {
+            addr: ip_address(addr) for addr in dict.fromkeys(addresses)}
+        results: Dict[str, array] = {
+            addr: array("d", [-timeout] * count) for addr in addrs}
+        for addr in addrs.values():  # raise OSError if ICMP is not permitted
+            self.socket(addr)
+        slots: asyncio.Semaphore = asyncio.Semaphore(concurrency)
+        start: float = time.perf_counter()
+
+        async def request(due: float, addr: str, index: int) -> None:
+            delay: float = await self.__echo_at(due, addr, timeout, slots,
+                                                adaptive)
+            if delay >= 0 or adaptive is not None:
+                results[addr][index] = delay
+
+        tasks: List[asyncio.Task] = [
+            asyncio.ensure_future(request(start + index * interval, addr,
+                                          index))
+            for index in range(count) for addr in addrs]
+        if len(tasks) == 0:
+            return results
+        _, pending = await asyncio.wait(tasks, timeout=deadline)
+        for task in pending:
+            task.cancel()
+        if len(pending) > 0:
+            await asyncio.wait(pending)
+        return results
+
+
+class pinger():
+    '''Threaded ICMP Pinger
+
+    Run an async_pinger on a long-lived event loop in a daemon thread, so
+    that callers of any thread share its ICMP sockets. Each ping() is
+    submitted to the loop and blocks until its burst is done.
+    '''
+
+    def __init__(self):
+        # a selector loop can watch sockets, unlike the Windows proactor
+        self.__loop: asyncio.AbstractEventLoop = asyncio.SelectorEventLoop()
+        self.__icmp: async_pinger = async_pinger()
+        self.__lock: Lock = Lock()
+        self.__closed: bool = False
+        self.__thread: Thread = Thread(target=self.__loop.run_forever,
+                                       name="pinger", daemon=True)
+        self.__thread.start()
+
+    def __enter__(self) -> "pinger":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def closed(self) -> bool:
+        return self.__closed
+
+    def close(self) -> None:
+        with self.__lock:
+            if self.__closed:
+                return
+            self.__closed = True
+
+        async def stop() -> None:
+            self.__icmp.close()
+        run_coroutine_threadsafe(stop(), self.__loop).result()
+        self.__loop.call_soon_threadsafe(self.__loop.stop)
+        self.__thread.join()
+        self.__loop.close()
+
+    def ping(self, addresses: Iterable[str], count: int = 1,
+             interval: float = 0.0, timeout: float = 1.0,
+             concurrency: int = DEFAULT_CONCURRENCY,
+             deadline: Optional[float] = None,
+             adaptive: Optional["adaptive_timeout"] = None
+             ) -> Dict[str, array]:
+        '''See async_pinger.ping, raise OSError if ICMP is not permitted
+        '''
+        assert not self.__closed, "pinger is closed"
+        return run_coroutine_threadsafe(self.__icmp.ping(
+            list(addresses), count=count, interval=interval,
+            timeout=timeout, concurrency=concurrency, deadline=deadline,
+            adaptive=adaptive), self.__loop).result()
+
+
+__SHARED: List[pinger] = []
+__SHARED_LOCK: Lock = Lock()
+
+
+def shared_pinger() -> pinger:
+    '''the pinger of the process, started on first use
+    '''
+    with __SHARED_LOCK:
+        if len(__SHARED) == 0:
+            __SHARED.append(pinger())
+        return __SHARED[0]
@@ -0,0 +1,32 @@
+# coding:utf-8
+
+from importlib import import_module
+import sys
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Tuple
+
+
+def lazy_exports(module: str, attrs: Dict[str, str]
+                 ) -> Tuple[Callable[[str], Any], Callable[[], List[str]]]:
+    '''Return __getattr__ and __dir__ of module (PEP 562)
+
+    Attrs maps each exported name to the submodule defining it (relative to
+    module), the submodule is imported on first access of the name.
+    '''
+    namespace: Dict[str, Any] = sys.modules[module].__dict__
+
+    def getattr_(name: str) -> Any:
+        if name not in attrs:
+            raise AttributeError(
+                f"module {module!r} has no attribute {name!r}")
+        value = getattr(import_module(attrs[name], module), name)
+        namespace[name] = value
+        return value
+
+    def dir_() -> List[str]:
+        return sorted(set(namespace) | set(attrs))
+
+    return getattr_, dir_
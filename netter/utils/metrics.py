@@ -0,0 +1,246 @@
+# coding:utf-8
+
+from bisect import bisect_left
+from math import isnan
+from math import nan
+from threading import Lock
+import time
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                   0.5, 1.0, 2.5, 5.0)
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+LABELS = Tuple[Tuple[str, str], ...]
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n") \
+        .replace('"', '\\"')
+
+
+def format_labels(labels: LABELS) -> str:
+    if len(labels) == 0:
+        return ""
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in labels) + "}"
+
+
+def format_number(value: float) -> str:
+    if isinstance(value, int):
+        return str(value)
+    if isnan(value):
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+
+class histogram():
+    '''Cumulative Histogram
+
+    Counts per upper bound, plus sum and count of all observations.
+    '''
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        assert list(buckets) == sorted(buckets), "unsorted buckets"
+        self.__buckets: Tuple[float, ...] = tuple(buckets)
+        self.__counts: List[int] = [0] * (len(buckets) + 1)  # last is +Inf
+        self.__sum: float = 0.0
+
+    @property
+    def buckets(self) -> Tuple[float, ...]:
+        return self.__buckets
+
+    @property
+    def count(self) -> int:
+        return sum(self.__counts)
+
+    @property
+    def sum(self) -> float:
+        return self.__sum
+
+    def observe(self, value: float) -> None:
+        self.__counts[bisect_left(self.__buckets, value)] += 1
+        self.__sum += value
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        '''(le, cumulative count) of each bucket, +Inf last
+        '''
+        result: List[Tuple[str, int]] = []
+        total: int = 0
+        for bound, count in zip(self.__buckets + (float("inf"),),
+                                self.__counts):
+            total += count
+            result.append((format_number(bound), total))
+        return result
+
+
+class probe_metrics():
+    '''Probe Metrics
+
+    Probers record results, publish() renders the OpenMetrics text once per
+    round, so a scrape only returns the last rendered text and never waits
+    for a probe.
+    '''
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.__lock: Lock = Lock()
+        self.__buckets: Tuple[float, ...] = tuple(buckets)
+        self.__resolve: Dict[str, histogram] = {}
+        self.__resolve_errors: Dict[Tuple[str, str], int] = {}
+        self.__ping: Dict[str, float] = {}
+        self.__ping_timeouts: Dict[str, int] = {}
+        self.__public_latency: Dict[str, float] = {}
+        self.__public_errors: Dict[Tuple[str, str], int] = {}
+        self.__public_addresses: Dict[str, int] = {}
+        self.__round_errors: Dict[str, int] = {}
+        self.__rounds: int = 0
+        self.__updated: float = nan
+        self.__text: bytes = self.render().encode()
+
+    @property
+    def rounds(self) -> int:
+        return self.__rounds
+
+    @property
+    def text(self) -> bytes:
+        '''the last published OpenMetrics text
+        '''
+        return self.__text
+
+    def record_resolve(self, nameserver: str, delay: float,
+                       error: Optional[str] = None) -> None:
+        '''record one resolve, negative delay means timeout
+        '''
+        with self.__lock:
+            if nameserver not in self.__resolve:
+                self.__resolve[nameserver] = histogram(self.__buckets)
+            if delay >= 0:
+                self.__resolve[nameserver].observe(delay)
+            if error is not None:
+                key = (nameserver, error)
+                self.__resolve_errors[key] = \
+                    self.__resolve_errors.get(key, 0) + 1
+
+    def record_ping(self, nameserver: str, delay: float) -> None:
+        '''record one ping, negative delay means timeout
+        '''
+        with self.__lock:
+            self.__ping_timeouts.setdefault(nameserver, 0)
+            if delay >= 0:
+                self.__ping[nameserver] = delay
+            else:
+                self.__ping.pop(nameserver, None)
+                self.__ping_timeouts[nameserver] += 1
+
+    def record_public_ip(
+            self, results: Iterable[Tuple[str, Optional[str], float,
+                                          Optional[str]]]) -> None:
+        '''record one query of all providers, (site, address, delay, error)
+        '''
+        addresses: Dict[str, int] = {}
+        with self.__lock:
+            for site, address, delay, error in results:
+                if error is not None:
+                    key = (site, error)
+                    self.__public_errors[key] = \
+                        self.__public_errors.get(key, 0) + 1
+                    self.__public_latency.pop(site, None)
+                    continue
+                self.__public_latency[site] = delay
+                if address is not None:
+                    addresses[address] = addresses.get(address, 0) + 1
+            self.__public_addresses = addresses
+
+    def record_round_error(self, error: str) -> None:
+        '''record a round that failed by exception type, publish it at once
+        '''
+        with self.__lock:
+            self.__round_errors[error] = self.__round_errors.get(error, 0) + 1
+            text: bytes = self.render().encode()
+        self.__text = text
+
+    def publish(self) -> None:
+        '''end of a round, render the text served to scrapes
+        '''
+        with self.__lock:
+            self.__rounds += 1
+            self.__updated = time.time()
+            text: bytes = self.render().encode()
+        self.__text = text
+
+    def render(self) -> str:
+        lines: List[str] = []
+
+        def family(name: str, kind: str, text: str) -> None:
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"# HELP {name} {text}")
+
+        def sample(name: str, labels: LABELS, value: float) -> None:
+            lines.append(f"{name}{format_labels(labels)} "
+                         f"{format_number(value)}")
+
+        family("netter_resolve_latency_seconds", "histogram",
+               "Latency of resolves that got a response.")
+        for nameserver, hist in sorted(self.__resolve.items()):
+            for le, count in hist.cumulative():
+                sample("netter_resolve_latency_seconds_bucket",
+                       (("nameserver", nameserver), ("le", le)), count)
+            sample("netter_resolve_latency_seconds_count",
+                   (("nameserver", nameserver),), hist.count)
+            sample("netter_resolve_latency_seconds_sum",
+                   (("nameserver", nameserver),), hist.sum)
+        family("netter_resolve_errors", "counter",
+               "Failed resolves by exception type.")
+        for (nameserver, error), count in sorted(
+                self.__resolve_errors.items()):
+            sample("netter_resolve_errors_total",
+                   (("nameserver", nameserver), ("error", error)), count)
+        family("netter_ping_rtt_seconds", "gauge",
+               "Round-trip time of the last answered ping.")
+        for nameserver, delay in sorted(self.__ping.items()):
+            sample("netter_ping_rtt_seconds", (("nameserver", nameserver),),
+                   delay)
+        family("netter_ping_timeouts", "counter", "Pings without a reply.")
+        for nameserver, count in sorted(self.__ping_timeouts.items()):
+            sample("netter_ping_timeouts_total",
+                   (("nameserver", nameserver),), count)
+        family("netter_public_ip_latency_seconds", "gauge",
+               "Latency of the last successful query of each provider.")
+        for site, delay in sorted(self.__public_latency.items()):
+            sample("netter_public_ip_latency_seconds", (("site", site),),
+                   delay)
+        family("netter_public_ip_errors", "counter",
+               "Failed public IP queries by error type.")
+        for (site, error), count in sorted(self.__public_errors.items()):
+            sample("netter_public_ip_errors_total",
+                   (("site", site), ("error", error)), count)
+        family("netter_public_ip_providers", "gauge",
+               "Providers that reported each address in the last query.")
+        for address, count in sorted(self.__public_addresses.items()):
+            sample("netter_public_ip_providers", (("address", address),),
+                   count)
+        family("netter_public_ip_agreement", "gauge",
+               "Share of answering providers that agree with the majority.")
+        answered: int = sum(self.__public_addresses.values())
+        if answered > 0:
+            sample("netter_public_ip_agreement", (),
+                   max(self.__public_addresses.values()) / answered)
+        family("netter_probe_rounds", "counter", "Completed probe rounds.")
+        sample("netter_probe_rounds_total", (), self.__rounds)
+        family("netter_probe_round_errors", "counter",
+               "Failed probe rounds by exception type.")
+        for error, count in sorted(self.__round_errors.items()):
+            sample("netter_probe_round_errors_total", (("error", error),),
+                   count)
+        family("netter_last_round_timestamp_seconds", "gauge",
+               "Unix time of the last completed round.")
+        if not isnan(self.__updated):
+            sample("netter_last_round_timestamp_seconds", (), self.__updated)
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,91 @@
+# coding:utf-8
+
+import errno
+from selectors import DefaultSelector
+from selectors import EVENT_READ
+import socket
+import struct
+
+from .platform import assert_linux
+
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV6_IFADDR = 0x100
+RTM_NEWLINK = 16
+RTM_DELLINK = 17
+RTM_NEWADDR = 20
+RTM_DELADDR = 21
+NLMSG_HEADER = struct.Struct("=IHHII")  # length, type, flags, seq, pid
+EVENTS = (RTM_NEWLINK, RTM_DELLINK, RTM_NEWADDR, RTM_DELADDR)
+
+
+class netlink_monitor():
+    '''Linux rtnetlink Monitor
+
+    Subscribe to link and address events (RTM_NEWLINK, RTM_DELLINK,
+    RTM_NEWADDR and RTM_DELADDR), so interfaces are loaded again only after
+    the kernel reports a change. A receive buffer overflow (ENOBUFS) also
+    counts as an event, since some changes were lost.
+    '''
+
+    def __init__(self, groups: int = RTMGRP_LINK | RTMGRP_IPV4_IFADDR |
+                 RTMGRP_IPV6_IFADDR):
+        assert_linux()
+        sock = socket.socket(socket.AF_NETLINK,  # pylint: disable=no-member
+                             socket.SOCK_RAW, socket.NETLINK_ROUTE)
+        try:
+            sock.bind((0, groups))
+            sock.setblocking(False)
+        except BaseException:
+            sock.close()
+            raise
+        self.__sock: socket.socket = sock
+        self.__selector: DefaultSelector = DefaultSelector()
+        self.__selector.register(sock, EVENT_READ)
+        self.__events: int = 0
+
+    def __enter__(self) -> "netlink_monitor":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def events(self) -> int:
+        '''link and address events received
+        '''
+        return self.__events
+
+    def close(self) -> None:
+        self.__selector.close()
+        self.__sock.close()
+
+    def drain(self) -> int:
+        '''read all pending messages, return the number of events
+        '''
+        count: int = 0
+        while True:
+            try:
+                data: bytes = self.__sock.recv(65536)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError as e:
+                if e.errno != errno.ENOBUFS:
+                    raise
+                count += 1
+                continue
+            offset: int = 0
+            while offset + NLMSG_HEADER.size <= len(data):
+                length, kind, _, _, _ = NLMSG_HEADER.unpack_from(data, offset)
+                if length < NLMSG_HEADER.size:
+                    break
+                if kind in EVENTS:
+                    count += 1
+                offset += (length + 3) & ~3
+        self.__events += count
+        return count
+
+    def wait(self, timeout: float) -> bool:
+        '''block until an event or timeout, return True if any event
+        '''
+        return len(self.__selector.select(timeout)) > 0 and self.drain() > 0
@@ -0,0 +1,42 @@
+# coding:utf-8
+
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from typing import Callable
+from typing import Iterable
+from typing import Iterator
+from typing import Set
+from typing import TypeVar
+
+DEFAULT_CONCURRENCY = 32
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def imap_unordered(func: Callable[[T], R], items: Iterable[T],
+                   concurrency: int = DEFAULT_CONCURRENCY) -> Iterator[R]:
+    '''Run func over items in a bounded worker pool
+
+    Results are yielded as soon as they complete. At most `concurrency`
+    items are in flight, and items are consumed lazily from the iterable.
+    '''
+    assert isinstance(concurrency, int), \
+        f"unexpected type: {type(concurrency)}"
+    assert concurrency > 0, f"invalid concurrency: {concurrency}"
+    iterator: Iterator[T] = iter(items)
+    pending: Set["Future[R]"] = set()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for item in iterator:
+            pending.add(executor.submit(func, item))
+            if len(pending) < concurrency:
+                continue
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+        while len(pending) > 0:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
@@ -1,134 +1,451 @@
 # coding:utf-8
 
+from array import array
 from binascii import hexlify
-from enum import IntFlag
-from enum import auto
+from contextlib import ExitStack
+from contextlib import contextmanager
 from ipaddress import IPv4Address
 from ipaddress import IPv6Address
 from ipaddress import ip_address
-from random import choice
+from math import isnan
+from math import nan
 from random import randint
+from ssl import SSLContext
+from threading import Condition
+from threading import Thread
 import time
+from typing import Any
 from typing import Callable
 from typing import Dict
 from typing import Iterable
 from typing import Iterator
 from typing import List
-from typing import Mapping
 from typing import Optional
 from typing import Tuple
-from typing import Union
 
+from dns.exception import DNSException
+from dns.resolver import Answer
+from dns.resolver import LRUCache
 from dns.resolver import LifetimeTimeout
 from dns.resolver import NXDOMAIN
 from dns.resolver import NoAnswer
 from dns.resolver import NoNameservers
 from dns.resolver import Resolver
 import ping3
-import requests
 
-ping3.EXCEPTIONS = True
-IPAddress = Union[IPv4Address, IPv6Address]
+from .constants import ABORTED
+from .constants import ADAPTIVE_MIN_TO
+from .constants import DNS_CACHE_SIZE
+from .constants import DNS_PORTS
+from .constants import EXAMPLE_DOMAIN
+from .constants import IPAddress
+from .constants import PING_MAX_TO
+from .constants import PING_MIN_TO
+from .constants import RESOLVE_MAX_TO
+from .constants import RESOLVE_MIN_TO
+from .history import history_store
+from .icmp import pinger
+from .icmp import shared_pinger
+from .parallel import DEFAULT_CONCURRENCY
+from .parallel import imap_unordered
+from .resolvconf import resolv_conf
+from .stats import latency
+from .stats import sampling
+from .transport import QueryAborted
+from .transport import multiplexer
+from .transport import transport_pool
 
-PING_MIN_TO = 1
-PING_MAX_TO = 8
-RESOLVE_MIN_TO = 0.1
-RESOLVE_MAX_TO = 8.0
-EXAMPLE_DOMAIN = "example.com"
+ping3.EXCEPTIONS = True
 
 
 def ping(address: str, timeout: int = PING_MIN_TO) -> float:
     assert isinstance(timeout, int), f"unexpected type: {type(timeout)}"
     _timeout: int = min(max(PING_MIN_TO, timeout), PING_MAX_TO)
+    deadline: float = time.perf_counter() + _timeout
+    remain: float = _timeout
+    while remain > 0:
+        try:
+            return ping3.ping(address, timeout=remain,
+                              seq=randint(8192, 32767))
+        except ping3.errors.Timeout:
+            break
+        except ping3.errors.DestinationUnreachable:
+            # raw socket also receives ICMP errors of concurrent probes
+            remain = deadline - time.perf_counter()
+    return -float(timeout)
+
+
+def ping_burst(addresses: Iterable[str], timeout: int = PING_MIN_TO,
+               count: int = 1, interval: float = 0.0,
+               concurrency: int = DEFAULT_CONCURRENCY,
+               deadline: Optional[float] = None,
+               adaptive: Optional["adaptive_timeout"] = None,
+               icmp: Optional[pinger] = None) -> Dict[str, array]:
+    '''Ping IP addresses count times each, interval seconds apart
+
+    All echo requests are multiplexed over the ICMP sockets of icmp, by
+    default the shared pinger of the process, return the delays of each
+    address in burst order (negative delay means timeout). Fall back to
+    one ping3 socket per request if ICMP sockets are not permitted, then
+    adaptive deadlines do not apply.
+    '''
+    assert isinstance(timeout, int), f"unexpected type: {type(timeout)}"
+    _timeout: int = min(max(PING_MIN_TO, timeout), PING_MAX_TO)
+    addrs: List[str] = list(dict.fromkeys(addresses))
+
+    def fallback(addr: str) -> Tuple[str, array]:
+        delays: array = array("d")
+        for i in range(count):
+            if i > 0 and interval > 0:
+                time.sleep(interval)
+            delays.append(ping(addr, timeout))
+        return addr, delays
     try:
-        return ping3.ping(address, timeout=_timeout, seq=randint(8192, 32767))
-    except ping3.errors.Timeout:
-        return -float(timeout)
+        return (icmp or shared_pinger()).ping(
+            addrs, count=count, interval=interval, timeout=float(_timeout),
+            concurrency=concurrency, deadline=deadline, adaptive=adaptive)
+    except OSError:
+        return dict(imap_unordered(fallback, addrs, concurrency))
+
 
+def ping_many(addresses: Iterable[str], timeout: int = PING_MIN_TO,
+              concurrency: int = DEFAULT_CONCURRENCY,
+              deadline: Optional[float] = None,
+              adaptive: Optional["adaptive_timeout"] = None
+              ) -> Dict[str, float]:
+    '''Ping IP addresses once each, see ping_burst
 
-class public_ip():
-    '''Query Public IP Address
+    Negative delay means timeout.
     '''
-    class flags(IntFlag):
-        random = 0
-        ident = auto()
-        ipify = auto()
-        ipinfo = auto()
-        cloudflare = auto()
-        all = ipify | ident | ipinfo | cloudflare
+    return {addr: delays[0] for addr, delays in ping_burst(
+        addresses, timeout=timeout, concurrency=concurrency,
+        deadline=deadline, adaptive=adaptive).items()}
 
-    def __init__(self, address: Mapping[str, Iterable[str]]):
-        self.__addrs: Dict[IPAddress, Tuple[str, ...]] = {
-            ip_address(k): tuple(s for s in v) for k, v in address.items()
-        }
 
-    def __str__(self) -> str:
-        return ", ".join(str(addr) for addr in self)
+class dnscache():
+    '''Shared DNS Answer Cache
 
-    def __iter__(self) -> Iterator[IPAddress]:
-        return iter(self.__addrs.keys())
+    Positive answers expire by record TTL, negative answers (NXDOMAIN and
+    NoAnswer) by the SOA minimum. Answers are keyed by nameserver, the least
+    recently used ones are evicted once max_size is reached.
+    '''
 
-    def __getitem__(self, key: IPAddress) -> Tuple[str, ...]:
-        return self.__addrs[key]
+    class view():
+        '''Cache of one nameserver, used as resolver cache
+        '''
 
-    @classmethod
-    def query_from_ident(cls) -> Optional[str]:
-        response = requests.get("https://ident.me")
-        return response.text.strip() if response.ok else None
+        def __init__(self, cache: LRUCache, nameserver: str):
+            self.__cache: LRUCache = cache
+            self.__nameserver: str = nameserver
 
-    @classmethod
-    def query_from_ipify(cls) -> Optional[str]:
-        response = requests.get("https://api64.ipify.org?format=json")
-        return response.json()["ip"] if response.ok else None
+        @property
+        def nameserver(self) -> str:
+            return self.__nameserver
 
-    @classmethod
-    def query_from_ipinfo(cls) -> Optional[str]:
-        response = requests.get("https://ipinfo.io/ip")
-        return response.text.strip() if response.ok else None
+        def get(self, key: Tuple[Any, ...]) -> Optional[Answer]:
+            return self.__cache.get((self.nameserver,) + key)
 
-    @classmethod
-    def query_from_cloudflare(cls) -> Optional[str]:
-        def parse_ip(lines: Iterable[str]) -> Optional[str]:
-            for line in lines:
-                if line.startswith("ip="):
-                    return line.split("=")[1]
-        response = requests.get("https://www.cloudflare.com/cdn-cgi/trace")
-        return parse_ip(response.text.split()) if response.ok else None
+        def put(self, key: Tuple[Any, ...], value: Answer) -> None:
+            self.__cache.put((self.nameserver,) + key, value)
 
-    @classmethod
-    def query(cls, flag: flags = flags.random) -> "public_ip":
-        address: Dict[str, List[str]] = {}
-        mapping: Dict[public_ip.flags,
-                      Tuple[Callable[[], Optional[str]], str]] = {
-            cls.flags.ident: (cls.query_from_ident, "https://ident.me"),
-            cls.flags.ipify: (cls.query_from_ipify, "https://api64.ipify.org"),
-            cls.flags.ipinfo: (cls.query_from_ipinfo, "https://ipinfo.io/ip"),
-            cls.flags.cloudflare: (cls.query_from_cloudflare,
-                                   "https://radar.cloudflare.com/ip"),
-        }
-        if flag is cls.flags.random:
-            flag = choice([f for f in mapping.keys()])
-        for site, call_site in mapping.items():
-            if site in flag:
-                addr = call_site[0]()
-                if isinstance(addr, str):
-                    if addr not in address:
-                        address[addr] = []
-                    address[addr].append(call_site[1])
-        return cls(address)
+        def flush(self, key: Optional[Tuple[Any, ...]] = None) -> None:
+            if key is not None:
+                self.__cache.flush((self.nameserver,) + key)
+            else:
+                with self.__cache.lock:
+                    keys = [k for k in self.__cache.data
+                            if k[0] == self.nameserver]
+                for _key in keys:
+                    self.__cache.flush(_key)
+
+    def __init__(self, max_size: int = DNS_CACHE_SIZE):
+        self.__cache: LRUCache = LRUCache(max_size=max_size)
+
+    def __len__(self) -> int:
+        return len(self.__cache.data)
+
+    @property
+    def max_size(self) -> int:
+        return self.__cache.max_size
+
+    @property
+    def hits(self) -> int:
+        return self.__cache.hits()
+
+    @property
+    def misses(self) -> int:
+        return self.__cache.misses()
+
+    def bind(self, nameserver: str) -> "dnscache.view":
+        return self.view(self.__cache, nameserver)
+
+    def flush(self) -> None:
+        self.__cache.flush()
+
+    def reset_statistics(self) -> None:
+        self.__cache.reset_statistics()
+
+
+class rtt_estimator():
+    '''Round-Trip Time Estimator (RFC 6298)
+
+    SRTT and RTTVAR are smoothed with alpha 1/8 and beta 1/4, the timeout
+    is SRTT + max(granularity, 4 * RTTVAR) clamped to [floor, ceiling].
+    The timeout is the ceiling until the first sample, each timeout
+    doubles it (backoff) until the next sample. Timeouts before the first
+    sample are counted as well, see backoff.
+    '''
+
+    ALPHA = 0.125
+    BETA = 0.25
+    K = 4
+    MAX_BACKOFF = 6
+
+    def __init__(self, floor: float = RESOLVE_MIN_TO,
+                 ceiling: float = RESOLVE_MAX_TO, granularity: float = 0.001):
+        assert 0.0 < floor <= ceiling, f"invalid bounds: {floor}, {ceiling}"
+        self.__floor: float = floor
+        self.__ceiling: float = ceiling
+        self.__granularity: float = granularity
+        self.__srtt: float = nan
+        self.__rttvar: float = nan
+        self.__backoff: int = 0
+        self.__samples: int = 0
+
+    @property
+    def samples(self) -> int:
+        return self.__samples
+
+    @property
+    def srtt(self) -> float:
+        return self.__srtt
+
+    @property
+    def rttvar(self) -> float:
+        return self.__rttvar
+
+    @property
+    def backoff(self) -> int:
+        '''timeouts since the last sample, at most MAX_BACKOFF
+        '''
+        return self.__backoff
+
+    @property
+    def rto(self) -> float:
+        '''SRTT + max(G, K * RTTVAR), unclamped, nan before any sample
+        '''
+        return self.__srtt + max(self.__granularity, self.K * self.__rttvar)
+
+    @property
+    def timeout(self) -> float:
+        if self.__samples == 0:
+            return self.__ceiling
+        # as in RFC 6298, the backoff doubles the bounded timeout
+        return self.clamp(self.clamp(self.rto) * (1 << self.__backoff))
+
+    def clamp(self, timeout: float) -> float:
+        return min(max(self.__floor, timeout), self.__ceiling)
+
+    def update(self, rtt: float) -> None:
+        '''add a sample, negative means timeout (back off)
+        '''
+        if rtt < 0:
+            if self.__backoff < self.MAX_BACKOFF and (
+                    self.__samples == 0 or self.timeout < self.__ceiling):
+                self.__backoff += 1
+            return
+        if self.__samples == 0:
+            self.__srtt = rtt
+            self.__rttvar = rtt / 2
+        else:
+            self.__rttvar = (1 - self.BETA) * self.__rttvar + \
+                self.BETA * abs(self.__srtt - rtt)
+            self.__srtt = (1 - self.ALPHA) * self.__srtt + self.ALPHA * rtt
+        self.__backoff = 0
+        self.__samples += 1
+
+
+class adaptive_timeout():
+    '''Adaptive Per-Nameserver Deadlines
+
+    Each nameserver has its own rtt_estimator. A nameserver that has not
+    answered yet waits up to the ceiling, until quorum nameservers have
+    answered (early abort): then its deadline is spread times the timeout
+    of all answers, a small multiple of the real RTT, doubled for each of
+    its own timeouts. No deadline is shorter than floor, so that a slow
+    but healthy nameserver is not aborted next to fast ones. In-flight
+    probes registered with guard() are aborted once their deadline is
+    reached, and again every ABORT_INTERVAL seconds until they return (a
+    retry of the resolver may start after the previous abort).
+    '''
+
+    ABORT_INTERVAL = 0.05
+
+    def __init__(self, ceiling: float = RESOLVE_MAX_TO,
+                 floor: float = ADAPTIVE_MIN_TO, quorum: int = 3,
+                 spread: float = 4.0):
+        assert quorum > 0, f"invalid quorum: {quorum}"
+        assert spread >= 1.0, f"invalid spread: {spread}"
+        self.__ceiling: float = ceiling
+        self.__floor: float = min(floor, ceiling)
+        self.__quorum: int = quorum
+        self.__spread: float = spread
+        self.__overall: rtt_estimator = rtt_estimator(self.__floor, ceiling)
+        self.__estimators: Dict[str, rtt_estimator] = {}
+        self.__healthy: int = 0
+        self.__cond: Condition = Condition()
+        self.__inflight: Dict[int, Tuple[str, float, Callable[[], None]]] = {}
+        self.__aborted: Dict[int, Tuple[float, Callable[[], None]]] = {}
+        self.__next: int = 0
+        self.__thread: Optional[Thread] = None
+        self.__closed: bool = False
+
+    def __enter__(self) -> "adaptive_timeout":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def ceiling(self) -> float:
+        return self.__ceiling
+
+    @property
+    def quorum(self) -> int:
+        return self.__quorum
+
+    @property
+    def healthy(self) -> int:
+        '''nameservers that answered at least once
+        '''
+        return self.__healthy
+
+    def estimator(self, nameserver: str) -> rtt_estimator:
+        with self.__cond:
+            if nameserver not in self.__estimators:
+                self.__estimators[nameserver] = rtt_estimator(
+                    self.__floor, self.__ceiling)
+            return self.__estimators[nameserver]
+
+    def timeout(self, nameserver: str) -> float:
+        '''current deadline (in seconds) of a probe to nameserver
+        '''
+        with self.__cond:
+            estimator: Optional[rtt_estimator] = \
+                self.__estimators.get(nameserver)
+            if estimator is not None and estimator.samples > 0:
+                return estimator.timeout
+            if self.__healthy < self.__quorum:
+                return self.__ceiling
+            backoff: int = estimator.backoff if estimator is not None else 0
+            return self.__overall.clamp(self.__overall.clamp(
+                self.__overall.rto * self.__spread) * (1 << backoff))
+
+    def observe(self, nameserver: str, delay: float) -> None:
+        '''add a probe delay, negative means timeout
+        '''
+        estimator: rtt_estimator = self.estimator(nameserver)
+        with self.__cond:
+            if delay >= 0 and estimator.samples == 0:
+                self.__healthy += 1
+            estimator.update(delay)
+            if delay >= 0:
+                self.__overall.update(delay)
+            self.__cond.notify_all()  # deadlines may be shorter
+
+    @contextmanager
+    def guard(self, nameserver: str, abort: Callable[[], None]
+              ) -> Iterator[None]:
+        '''call abort if the probe is still in flight at its deadline
+        '''
+        with self.__cond:
+            assert not self.__closed, "adaptive timeout is closed"
+            key: int = self.__next
+            self.__next += 1
+            self.__inflight[key] = (nameserver, time.perf_counter(), abort)
+            if self.__thread is None:
+                self.__thread = Thread(target=self.watch, daemon=True)
+                self.__thread.start()
+            self.__cond.notify_all()
+        try:
+            yield
+        finally:
+            with self.__cond:
+                self.__inflight.pop(key, None)
+                self.__aborted.pop(key, None)
+
+    def watch(self) -> None:
+        with self.__cond:
+            while not self.__closed:
+                now: float = time.perf_counter()
+                wait: Optional[float] = None
+                for key, (nameserver, start, abort) in list(
+                        self.__inflight.items()):
+                    remain: float = start + self.timeout(nameserver) - now
+                    if remain <= 0:
+                        del self.__inflight[key]
+                        self.__aborted[key] = (now, abort)
+                    elif wait is None or remain < wait:
+                        wait = remain
+                for key, (due, abort) in list(self.__aborted.items()):
+                    if due <= now:
+                        abort()
+                        due = now + self.ABORT_INTERVAL
+                        self.__aborted[key] = (due, abort)
+                    if wait is None or due - now < wait:
+                        wait = due - now
+                self.__cond.wait(wait)
+
+    def close(self) -> None:
+        with self.__cond:
+            self.__closed = True
+            self.__cond.notify_all()
+            thread = self.__thread
+        if thread is not None:
+            thread.join()
 
 
 class dnsprobe():
     '''DNS Prober
+
+    With a shared cache, resolver answers from the cache, while test()
+    always measures the nameserver. With a shared transport pool, queries
+    reuse its sockets instead of opening one per query, and its kind (udp,
+    tcp, dot or doh) selects the protocol. With a resolv.conf, its rotate,
+    edns0 and timeouts apply to the resolvers (not the search list, the
+    nameserver is explicit). With a history store, each ping and resolve
+    outcome is recorded.
     '''
 
-    def __init__(self, address: IPAddress):
+    def __init__(self, address: IPAddress, port: int = 53,
+                 cache: Optional[dnscache] = None,
+                 transport: Optional[transport_pool] = None,
+                 config: Optional[resolv_conf] = None,
+                 history: Optional[history_store] = None):
         assert isinstance(address, (IPv4Address, IPv6Address)), \
             f"unexpected type: {type(address)}"
-        resolver: Resolver = Resolver(configure=False)
-        resolver.nameservers = [str(address)]
-        self.__resolver: Resolver = resolver
+
+        def new_resolver() -> Resolver:
+            resolver: Resolver = Resolver(configure=False)
+            if transport is not None:
+                resolver.nameservers = [
+                    transport.nameserver(str(address), port)]
+            else:
+                resolver.nameservers = [str(address)]
+            resolver.port = port
+            if config is not None:
+                config.configure(resolver)
+            return resolver
+
+        self.__resolver: Resolver = new_resolver()
+        self.__wire_resolver: Resolver = self.__resolver
+        if cache is not None:
+            self.__resolver.cache = cache.bind(f"{address}@{port}")
+            self.__wire_resolver = new_resolver()
         self.__addr: IPAddress = address
+        self.__port: int = port
+        self.__transport: Optional[transport_pool] = transport
+        self.__history: Optional[history_store] = history
 
     @property
     def name(self) -> str:
@@ -142,31 +459,376 @@ class dnsprobe():
     def address(self) -> str:
         return str(self.__addr)
 
+    @property
+    def port(self) -> int:
+        return self.__port
+
+    @property
+    def transport(self) -> str:
+        return self.__transport.kind if self.__transport is not None \
+            else "udp"
+
+    @property
+    def setup(self) -> latency:
+        '''connection setup time, empty unless connection-oriented
+        '''
+        if self.__transport is None:
+            return latency()
+        return self.__transport.transport(self.address, self.port).setup
+
     @classmethod
-    def from_string(cls, address: str) -> "dnsprobe":
+    def from_string(cls, address: str, port: int = 53,
+                    cache: Optional[dnscache] = None,
+                    transport: Optional[transport_pool] = None,
+                    config: Optional[resolv_conf] = None,
+                    history: Optional[history_store] = None) -> "dnsprobe":
         assert isinstance(address, str), f"unexpected type: {type(address)}"
-        return dnsprobe(ip_address(address))
+        return dnsprobe(ip_address(address), port=port, cache=cache,
+                        transport=transport, config=config, history=history)
+
+    @property
+    def history(self) -> Optional[history_store]:
+        return self.__history
 
     def ping(self, lifetime: int = PING_MIN_TO) -> float:
-        return ping(address=self.address, timeout=lifetime)
+        return self.ping_burst(lifetime=lifetime)[0]
+
+    def ping_burst(self, lifetime: int = PING_MIN_TO, count: int = 1,
+                   interval: float = 0.0, icmp: Optional[pinger] = None
+                   ) -> array:
+        '''Ping count times, interval seconds apart, return the delays
+
+        Negative delay means timeout. Each delay is recorded in the history
+        store, if any.
+        '''
+        delays: array = ping_burst([self.address], timeout=lifetime,
+                                   count=count, interval=interval,
+                                   icmp=icmp)[self.address]
+        if self.__history is not None:
+            for delay in delays:
+                self.__history.record("ping", self.address, delay)
+        return delays
 
     def test(self, qname: str = EXAMPLE_DOMAIN,
-             lifetime: float = RESOLVE_MIN_TO) -> float:
+             lifetime: float = RESOLVE_MIN_TO,
+             adaptive: Optional[adaptive_timeout] = None) -> float:
+        return self.check(qname=qname, lifetime=lifetime,
+                          adaptive=adaptive)[0]
+
+    def check(self, qname: str = EXAMPLE_DOMAIN,
+              lifetime: float = RESOLVE_MIN_TO,
+              adaptive: Optional[adaptive_timeout] = None
+              ) -> Tuple[float, Optional[str]]:
+        '''Resolve qname, return (delay, error)
+
+        Error is the exception name (NXDOMAIN, NoAnswer, NoNameservers,
+        LifetimeTimeout or QueryAborted), None if answered. Negative delay
+        means timeout. With adaptive, the resolve is aborted at the
+        adaptive deadline of the nameserver: the delay is nan (not lost,
+        see latency) and the elapsed time is observed as a timeout. The
+        outcome is recorded in the history store, if any.
+        '''
         assert isinstance(qname, str), f"unexpected type: {type(qname)}"
         assert isinstance(lifetime, float), \
             f"unexpected type: {type(lifetime)}"
         timeout = min(max(RESOLVE_MIN_TO, lifetime), RESOLVE_MAX_TO)
-        _start = time.perf_counter()
+        start: float = time.perf_counter()
+        if adaptive is None:
+            delay, error = self.__resolve(qname, timeout)
+        else:
+            with adaptive.guard(self.address, self.abort):
+                delay, error = self.__resolve(qname, timeout)
+        # an aborted probe is observed and stored as a timeout of the time
+        # it took, its status tells it apart
+        elapsed: float = start - time.perf_counter() if isnan(delay) \
+            else delay
+        if adaptive is not None:
+            adaptive.observe(self.address, elapsed)
+        if self.__history is not None:
+            self.__history.record("resolve", self.address, elapsed, error)
+        return delay, error
+
+    def __resolve(self, qname: str, timeout: float
+                  ) -> Tuple[float, Optional[str]]:
+        start: float = time.perf_counter()
 
         def ok():
-            return time.perf_counter() - _start
+            return time.perf_counter() - start
+
+        try:
+            self.__wire_resolver.resolve(qname, lifetime=timeout)
+            return ok(), None
+        except NoNameservers as e:
+            if any(isinstance(error[3], QueryAborted)
+                   for error in e.kwargs.get("errors") or ()):
+                return nan, ABORTED
+            return ok(), type(e).__name__
+        except (NXDOMAIN, NoAnswer) as e:
+            return ok(), type(e).__name__
+        except LifetimeTimeout as e:
+            return -timeout, type(e).__name__
+
+    def abort(self) -> None:
+        '''abort the in-flight queries to this nameserver
+
+        Only queries over a shared udp, tcp or dot transport can be aborted.
+        '''
+        if self.__transport is None:
+            return
+        transport = self.__transport.transport(self.address, self.port)
+        if isinstance(transport, multiplexer):
+            transport.abort(QueryAborted(f"{self.address} aborted"))
 
+    def connect(self, lifetime: float = RESOLVE_MAX_TO) -> float:
+        '''Establish the connection in advance, return its setup time
+
+        Zero if already connected, nan if connectionless (udp), negative
+        lifetime if failed, so the following queries only measure the
+        per-query latency.
+        '''
+        if self.__transport is None:
+            return nan
         try:
-            self.resolver.resolve(qname, lifetime=timeout)
-            return ok()
-        except NXDOMAIN:
-            return ok()
-        except (NoAnswer, NoNameservers):
-            return ok()
-        except LifetimeTimeout:
-            return -timeout
+            return self.__transport.transport(
+                self.address, self.port).connect(lifetime)
+        except (OSError, EOFError, DNSException):
+            return -lifetime
+
+    def test_pipeline(self, qname: str = EXAMPLE_DOMAIN,
+                      lifetime: float = RESOLVE_MIN_TO, count: int = 1,
+                      adaptive: Optional[adaptive_timeout] = None
+                      ) -> latency:
+        '''Issue count queries at once
+
+        Over tcp or dot, they are pipelined on one connection.
+        '''
+        return latency(imap_unordered(
+            lambda _: self.test(qname=qname, lifetime=lifetime,
+                                adaptive=adaptive),
+            range(count), count))
+
+    def ping_stats(self, lifetime: int = PING_MIN_TO, count: int = 1,
+                   interval: float = 0.0, icmp: Optional[pinger] = None
+                   ) -> latency:
+        return latency(self.ping_burst(lifetime=lifetime, count=count,
+                                       interval=interval, icmp=icmp))
+
+    def test_stats(self, qname: str = EXAMPLE_DOMAIN,
+                   lifetime: float = RESOLVE_MIN_TO, count: int = 1,
+                   interval: float = 0.0,
+                   adaptive: Optional[adaptive_timeout] = None) -> latency:
+        return sampling(lambda: self.test(qname=qname, lifetime=lifetime,
+                                          adaptive=adaptive),
+                        count=count, interval=interval)
+
+
+class probe_result():
+    '''DNS Probe Result
+
+    None means not probed (yet).
+    '''
+
+    def __init__(self, prober: dnsprobe):
+        self.__prober: dnsprobe = prober
+        self.__ping: Optional[latency] = None
+        self.__resolve: Optional[latency] = None
+        self.__setup: Optional[latency] = None
+
+    @property
+    def prober(self) -> dnsprobe:
+        return self.__prober
+
+    @property
+    def nameserver(self) -> str:
+        return self.__prober.address
+
+    @property
+    def ping(self) -> Optional[latency]:
+        return self.__ping
+
+    @ping.setter
+    def ping(self, value: latency):
+        self.__ping = value
+
+    @property
+    def resolve(self) -> Optional[latency]:
+        return self.__resolve
+
+    @resolve.setter
+    def resolve(self, value: latency):
+        self.__resolve = value
+
+    @property
+    def setup(self) -> Optional[latency]:
+        '''connection setup time, None if connectionless
+        '''
+        return self.__setup
+
+    @setup.setter
+    def setup(self, value: latency):
+        self.__setup = value
+
+
+class probe_engine():
+    '''Concurrent DNS Probe Engine
+
+    Fan out ping and resolve of all nameservers to a bounded worker pool,
+    so the total time is bounded by the slowest nameserver. With pipeline,
+    the resolve samples of a nameserver are issued at once instead of one
+    by one. With adaptive, ping_timeout and resolve_timeout are only the
+    ceilings: each nameserver waits up to its adaptive_timeout deadline,
+    so a dead nameserver is abandoned a small multiple of the RTT of the
+    healthy ones after quorum of them answered. Pings of all threads go
+    through icmp, by default the shared pinger of the process.
+    '''
+
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY,
+                 ping_timeout: int = PING_MAX_TO,
+                 resolve_timeout: float = RESOLVE_MAX_TO,
+                 count: int = 1, interval: float = 0.0,
+                 pipeline: bool = False, adaptive: bool = False,
+                 quorum: int = 3, icmp: Optional[pinger] = None):
+        assert isinstance(concurrency, int), \
+            f"unexpected type: {type(concurrency)}"
+        assert concurrency > 0, f"invalid concurrency: {concurrency}"
+        assert isinstance(count, int), f"unexpected type: {type(count)}"
+        assert count > 0, f"invalid count: {count}"
+        assert quorum > 0, f"invalid quorum: {quorum}"
+        self.__concurrency: int = concurrency
+        self.__ping_timeout: int = ping_timeout
+        self.__resolve_timeout: float = resolve_timeout
+        self.__count: int = count
+        self.__interval: float = interval
+        self.__pipeline: bool = pipeline
+        self.__adaptive: bool = adaptive
+        self.__quorum: int = quorum
+        self.__icmp: Optional[pinger] = icmp
+
+    @property
+    def concurrency(self) -> int:
+        return self.__concurrency
+
+    @property
+    def count(self) -> int:
+        '''samples per nameserver
+        '''
+        return self.__count
+
+    @property
+    def interval(self) -> float:
+        return self.__interval
+
+    @property
+    def pipeline(self) -> bool:
+        return self.__pipeline
+
+    @property
+    def adaptive(self) -> bool:
+        return self.__adaptive
+
+    @property
+    def quorum(self) -> int:
+        '''healthy nameservers to answer before early abort
+        '''
+        return self.__quorum
+
+    def probe(self, nameservers: Iterable[str], qname: str = EXAMPLE_DOMAIN,
+              enable_ping: bool = True, port: Optional[int] = None,
+              transport: str = "udp",
+              ssl_context: Optional[SSLContext] = None,
+              config: Optional[resolv_conf] = None,
+              history: Optional[history_store] = None
+              ) -> Iterator[probe_result]:
+        '''Probe all nameservers, yield each result once it completes
+
+        Port defaults to the one of transport. Except for udp, the
+        connection is established before the resolves, its setup time is
+        reported apart from the per-query latency. With adaptive, the
+        pings of all nameservers are a single burst over shared ICMP
+        sockets. Every sample is recorded in history, if any.
+        '''
+        if port is None:
+            port = DNS_PORTS[transport]
+        with ExitStack() as stack:
+            pool: transport_pool = stack.enter_context(
+                transport_pool(transport, ssl_context))
+            results: Dict[str, probe_result] = {}
+            for nameserver in nameservers:
+                prober: dnsprobe = dnsprobe.from_string(
+                    nameserver, port=port, transport=pool, config=config,
+                    history=history)
+                results.setdefault(prober.address, probe_result(prober))
+            resolve_policy: Optional[adaptive_timeout] = self.__policy(
+                stack, self.__resolve_timeout, len(results))
+            ping_policy: Optional[adaptive_timeout] = self.__policy(
+                stack, float(self.__ping_timeout), len(results))
+
+            def run(job: Tuple[Optional[probe_result], str]
+                    ) -> List[probe_result]:
+                result, kind = job
+                if result is None:
+                    return self.__ping_all(results, ping_policy, history)
+                if kind == "ping":
+                    result.ping = result.prober.ping_stats(
+                        lifetime=self.__ping_timeout, count=self.count,
+                        interval=self.interval, icmp=self.__icmp)
+                else:
+                    self.__resolve(result, qname, resolve_policy)
+                return [result]
+
+            remains: Dict[str, int] = {
+                address: 2 if enable_ping else 1 for address in results}
+            for done in imap_unordered(run, self.__jobs(results, enable_ping),
+                                       self.concurrency):
+                for result in done:
+                    remains[result.nameserver] -= 1
+                    if remains[result.nameserver] == 0:
+                        yield result
+
+    def __policy(self, stack: ExitStack, ceiling: float, nameservers: int
+                 ) -> Optional[adaptive_timeout]:
+        if not self.adaptive:
+            return None
+        # a single fast nameserver must not set the deadline of another
+        quorum: int = max(1, min(self.quorum, nameservers))
+        return stack.enter_context(adaptive_timeout(ceiling=ceiling,
+                                                    quorum=quorum))
+
+    def __jobs(self, results: Dict[str, probe_result], enable_ping: bool
+               ) -> Iterator[Tuple[Optional[probe_result], str]]:
+        '''(result, kind) of each job, (None, "ping") pings all at once
+        '''
+        if enable_ping and self.adaptive:
+            yield None, "ping"
+        for result in results.values():
+            if enable_ping and not self.adaptive:
+                yield result, "ping"
+            yield result, "resolve"
+
+    def __ping_all(self, results: Dict[str, probe_result],
+                   policy: Optional[adaptive_timeout],
+                   history: Optional[history_store]) -> List[probe_result]:
+        for address, delays in ping_burst(
+                results, timeout=self.__ping_timeout, count=self.count,
+                interval=self.interval, concurrency=self.concurrency,
+                adaptive=policy, icmp=self.__icmp).items():
+            if history is not None:
+                for delay in delays:
+                    history.record("ping", address, delay)
+            results[address].ping = latency(delays)
+        return list(results.values())
+
+    def __resolve(self, result: probe_result, qname: str,
+                  policy: Optional[adaptive_timeout]) -> None:
+        prober: dnsprobe = result.prober
+        if prober.transport != "udp":
+            result.setup = latency([prober.connect(
+                lifetime=self.__resolve_timeout)])
+        if self.pipeline:
+            result.resolve = prober.test_pipeline(
+                qname=qname, lifetime=self.__resolve_timeout,
+                count=self.count, adaptive=policy)
+        else:
+            result.resolve = prober.test_stats(
+                qname=qname, lifetime=self.__resolve_timeout,
+                count=self.count, interval=self.interval, adaptive=policy)
@@ -0,0 +1,258 @@
+# coding:utf-8
+
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import as_completed
+from enum import IntFlag
+from enum import auto
+from ipaddress import ip_address
+from random import choice
+import time
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Mapping
+from typing import Optional
+from typing import Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .constants import IPAddress
+from .constants import REQUEST_TIMEOUT
+from .history import history_store
+
+
+class public_ip():
+    '''Query Public IP Address
+    '''
+    class flags(IntFlag):
+        random = 0
+        ident = auto()
+        ipify = auto()
+        ipinfo = auto()
+        cloudflare = auto()
+        all = ipify | ident | ipinfo | cloudflare
+
+    def __init__(self, address: Mapping[str, Iterable[str]]):
+        self.__addrs: Dict[IPAddress, Tuple[str, ...]] = {
+            ip_address(k): tuple(s for s in v) for k, v in address.items()
+        }
+
+    def __str__(self) -> str:
+        return ", ".join(str(addr) for addr in self)
+
+    def __iter__(self) -> Iterator[IPAddress]:
+        return iter(self.__addrs.keys())
+
+    def __getitem__(self, key: IPAddress) -> Tuple[str, ...]:
+        return self.__addrs[key]
+
+    @classmethod
+    def query_from_ident(cls, url: str = "https://ident.me",
+                         timeout: float = REQUEST_TIMEOUT,
+                         session: Optional[requests.Session] = None
+                         ) -> Optional[str]:
+        response = (session or requests).get(url, timeout=timeout)
+        return response.text.strip() if response.ok else None
+
+    @classmethod
+    def query_from_ipify(cls,
+                         url: str = "https://api64.ipify.org?format=json",
+                         timeout: float = REQUEST_TIMEOUT,
+                         session: Optional[requests.Session] = None
+                         ) -> Optional[str]:
+        response = (session or requests).get(url, timeout=timeout)
+        return response.json()["ip"] if response.ok else None
+
+    @classmethod
+    def query_from_ipinfo(cls, url: str = "https://ipinfo.io/ip",
+                          timeout: float = REQUEST_TIMEOUT,
+                          session: Optional[requests.Session] = None
+                          ) -> Optional[str]:
+        response = (session or requests).get(url, timeout=timeout)
+        return response.text.strip() if response.ok else None
+
+    @classmethod
+    def query_from_cloudflare(
+            cls, url: str = "https://www.cloudflare.com/cdn-cgi/trace",
+            timeout: float = REQUEST_TIMEOUT,
+            session: Optional[requests.Session] = None) -> Optional[str]:
+        def parse_ip(lines: Iterable[str]) -> Optional[str]:
+            for line in lines:
+                if line.startswith("ip="):
+                    return line.split("=")[1]
+            return None
+        response = (session or requests).get(url, timeout=timeout)
+        return parse_ip(response.text.split()) if response.ok else None
+
+    @classmethod
+    def providers(cls) -> Dict["public_ip.flags",
+                               Tuple[Callable[..., Optional[str]], str]]:
+        '''query function and site name of each provider
+        '''
+        return {
+            cls.flags.ident: (cls.query_from_ident, "https://ident.me"),
+            cls.flags.ipify: (cls.query_from_ipify, "https://api64.ipify.org"),
+            cls.flags.ipinfo: (cls.query_from_ipinfo, "https://ipinfo.io/ip"),
+            cls.flags.cloudflare: (cls.query_from_cloudflare,
+                                   "https://radar.cloudflare.com/ip"),
+        }
+
+    @classmethod
+    def query(cls, flag: flags = flags.random,
+              timeout: float = REQUEST_TIMEOUT, first: bool = False,
+              urls: Optional[Mapping[flags, str]] = None,
+              history: Optional[history_store] = None) -> "public_ip":
+        '''Query all selected providers concurrently
+
+        Each request lasts at most timeout seconds, a failed provider is
+        ignored. In first mode, return the first answer, a request still in
+        flight runs on in the background until it completes or times out.
+        The request url of each provider can be overridden by urls.
+
+        Use public_ip_client to reuse connections between queries.
+        '''
+        client = public_ip_client(timeout=timeout, urls=urls,
+                                  history=history)
+        try:
+            return client.query(flag, first=first)
+        finally:
+            client.close(wait=not first)
+
+
+class public_ip_client():
+    '''Public IP Query Client
+
+    Own a pooled HTTP session with keep-alive and a worker pool, so that
+    repeated queries reuse warm connections. With a history store, each
+    request outcome is recorded by provider site.
+    '''
+
+    def __init__(self, timeout: float = REQUEST_TIMEOUT,
+                 max_connections: int = 2,
+                 urls: Optional[Mapping[public_ip.flags, str]] = None,
+                 history: Optional[history_store] = None):
+        assert max_connections > 0, \
+            f"invalid max connections: {max_connections}"
+        providers = public_ip.providers()
+        adapter = HTTPAdapter(pool_connections=len(providers),
+                              pool_maxsize=max_connections)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        self.__session: requests.Session = session
+        self.__executor = ThreadPoolExecutor(max_workers=len(providers))
+        self.__providers = providers
+        self.__timeout: float = timeout
+        self.__urls: Dict[public_ip.flags, str] = dict(urls or {})
+        self.__history: Optional[history_store] = history
+
+    def __enter__(self) -> "public_ip_client":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def session(self) -> requests.Session:
+        return self.__session
+
+    @property
+    def timeout(self) -> float:
+        '''timeout of each request
+        '''
+        return self.__timeout
+
+    def close(self, wait: bool = True) -> None:
+        self.__executor.shutdown(wait=wait)
+        self.__session.close()
+
+    def request(self, site: public_ip.flags) -> "public_ip_result":
+        kwargs: Dict[str, Any] = {"timeout": self.timeout,
+                                  "session": self.session}
+        if site in self.__urls:
+            kwargs["url"] = self.__urls[site]
+        name: str = self.__providers[site][1]
+        start: float = time.perf_counter()
+        try:
+            addr: Optional[str] = self.__providers[site][0](**kwargs)
+            error: Optional[str] = None if addr else "No Answer"
+        except (requests.RequestException, ValueError, KeyError) as e:
+            addr, error = None, type(e).__name__
+        delay: float = time.perf_counter() - start
+        if self.__history is not None:
+            self.__history.record("public_ip", name,
+                                  delay if addr else -delay, error)
+        return public_ip_result(name, addr, delay, error)
+
+    def results(self, flag: public_ip.flags = public_ip.flags.random,
+                first: bool = False) -> Iterator["public_ip_result"]:
+        '''Query all selected providers, yield each result once it completes
+
+        In first mode, stop after the first answer and cancel the requests
+        not started yet, the ones in flight finish in the background (within
+        timeout) and return their connections to the pool.
+        '''
+        if flag is public_ip.flags.random:
+            flag = choice(list(self.__providers))
+        tasks: List[Future] = []
+        try:
+            for site in self.__providers:
+                if site in flag:
+                    tasks.append(self.__executor.submit(self.request, site))
+            for task in as_completed(tasks):
+                result: public_ip_result = task.result()
+                yield result
+                if first and result.address is not None:
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()  # no-op for a running request
+
+    def query(self, flag: public_ip.flags = public_ip.flags.random,
+              first: bool = False) -> public_ip:
+        address: Dict[str, List[str]] = {}
+        for result in self.results(flag, first=first):
+            if result.address is not None:
+                address.setdefault(result.address, []).append(result.site)
+        return public_ip(address)
+
+
+class public_ip_result():
+    '''Public IP Query Result of one provider
+    '''
+
+    FIELDS = ("site", "address", "latency_ms", "error")
+
+    def __init__(self, site: str, address: Optional[str], delay: float,
+                 error: Optional[str] = None):
+        self.__site: str = site
+        self.__address: Optional[str] = address
+        self.__delay: float = delay
+        self.__error: Optional[str] = error
+
+    @property
+    def site(self) -> str:
+        return self.__site
+
+    @property
+    def address(self) -> Optional[str]:
+        return self.__address
+
+    @property
+    def delay(self) -> float:
+        '''seconds of query
+        '''
+        return self.__delay
+
+    @property
+    def error(self) -> Optional[str]:
+        return self.__error
+
+    def dump(self) -> Dict[str, Any]:
+        return {"site": self.site, "address": self.address,
+                "latency_ms": self.delay * 1000, "error": self.error}
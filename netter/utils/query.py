@@ -0,0 +1,482 @@
+# coding:utf-8
+
+from hashlib import blake2b
+from ipaddress import ip_address
+from math import inf
+import sys
+import time
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Set
+from typing import Tuple
+from typing import Union
+
+from dns.exception import DNSException
+from dns.exception import Timeout
+from dns.rdatatype import UnknownRdatatype
+from dns.rdatatype import from_text
+from dns.rdatatype import to_text
+from dns.resolver import Answer
+from dns.resolver import NXDOMAIN
+from dns.resolver import NoAnswer
+from dns.resolver import NoNameservers
+
+from .constants import RESOLVE_MAX_TO
+from .parallel import DEFAULT_CONCURRENCY
+from .parallel import imap_unordered
+from .prober import dnscache
+from .prober import dnsprobe
+from .resolvconf import resolv_conf
+from .transport import transport_pool
+
+
+def parse_rdtypes(value: str) -> Tuple[str, ...]:
+    '''Parse comma-separated record types (e.g. "A,AAAA,MX")
+
+    Duplicates are removed, raise ValueError for an unknown type.
+    '''
+    rdtypes: Dict[str, None] = {}
+    for name in value.split(","):
+        if not name.strip():
+            continue
+        try:
+            rdtypes.setdefault(to_text(from_text(name.strip().upper())),
+                               None)
+        except UnknownRdatatype as e:
+            raise ValueError(f"unknown record type: {name}") from e
+    if len(rdtypes) == 0:
+        raise ValueError(f"no record type: {value}")
+    return tuple(rdtypes)
+
+
+def query_rdtypes(rdtypes: Optional[Sequence[str]] = None,
+                  enable_ipv6: bool = False) -> List[str]:
+    '''rdtypes to query, default is A, AAAA is added if enable_ipv6
+    '''
+    result: List[str] = list(rdtypes) if rdtypes is not None else ["A"]
+    if enable_ipv6 and "AAAA" not in result:
+        result.append("AAAA")
+    return result
+
+
+def resolve_answer(prober: dnsprobe, qname: str, rdtype: str,
+                   lifetime: float = RESOLVE_MAX_TO) -> Union[str, Answer]:
+    '''Resolve qname, return the answer or the reason of failure
+
+    Any DNS error (e.g. an invalid name) is the reason of failure of this
+    query only, it never ends a stream of queries.
+    '''
+    if lifetime <= 0:
+        return "Timeout"
+    try:
+        return prober.resolver.resolve(qname=qname, rdtype=rdtype,
+                                       lifetime=lifetime)
+    except NXDOMAIN:
+        return "NXDOMAIN"
+    except NoAnswer:
+        return "No Answer"
+    except NoNameservers:
+        return "No Nameservers"
+    except Timeout:  # LifetimeTimeout included
+        return "Timeout"
+    except DNSException as e:
+        return type(e).__name__
+
+
+def answer_digest(answer: Union[str, Answer]) -> bytes:
+    '''Digest of the canonical answer
+
+    Record sets compare equal regardless of order, TTL and name case: the
+    canonical wire format (RFC 4034) of each rdata is sorted and hashed
+    with the canonical name. A failure is the digest of its reason.
+    '''
+    digest = blake2b(digest_size=16)
+    if not isinstance(answer, Answer):
+        digest.update(b"\x00" + answer.encode())
+        return digest.digest()
+    digest.update(b"\x01" + answer.canonical_name.canonicalize().to_wire())
+    for wire in sorted(rdata.to_digestable() for rdata in answer):
+        digest.update(len(wire).to_bytes(2, "big") + wire)
+    return digest.digest()
+
+
+def format_answer(answer: Union[str, Answer], sep: str = "\n") -> str:
+    return sep.join(rdata.to_text() for rdata in answer) \
+        if isinstance(answer, Answer) else answer
+
+
+class query_result():
+    '''Domain Name Query Result
+    '''
+
+    FIELDS = ("domain", "nameserver", "rdtype", "answer", "latency_ms",
+              "error")
+
+    def __init__(self, domain: str, nameserver: str, rdtype: str,
+                 answer: Union[str, Answer], delay: float):
+        self.__domain: str = domain
+        self.__nameserver: str = nameserver
+        self.__rdtype: str = rdtype
+        self.__answer: Union[str, Answer] = answer
+        self.__delay: float = delay
+        self.__digest: Optional[bytes] = None
+
+    @property
+    def domain(self) -> str:
+        return self.__domain
+
+    @property
+    def nameserver(self) -> str:
+        return self.__nameserver
+
+    @property
+    def rdtype(self) -> str:
+        return self.__rdtype
+
+    @property
+    def answer(self) -> Union[str, Answer]:
+        '''the answer, or the reason of failure
+        '''
+        return self.__answer
+
+    @property
+    def delay(self) -> float:
+        '''seconds of query
+        '''
+        return self.__delay
+
+    @property
+    def error(self) -> Optional[str]:
+        return self.answer if isinstance(self.answer, str) else None
+
+    @property
+    def records(self) -> List[str]:
+        return [rdata.to_text() for rdata in self.answer] \
+            if isinstance(self.answer, Answer) else []
+
+    @property
+    def answer_text(self) -> Tuple[str, ...]:
+        '''sorted records, or the reason of failure
+        '''
+        return tuple(sorted(self.records)) if self.error is None \
+            else (self.error,)
+
+    @property
+    def digest(self) -> bytes:
+        if self.__digest is None:
+            self.__digest = answer_digest(self.answer)
+        return self.__digest
+
+    def dump(self) -> Dict[str, Any]:
+        return {"domain": self.domain, "nameserver": self.nameserver,
+                "rdtype": self.rdtype, "answer": self.records,
+                "latency_ms": self.delay * 1000, "error": self.error}
+
+
+def unique_nameservers(nameservers: Iterable[str]) -> Tuple[str, ...]:
+    '''normalized nameserver addresses, duplicates removed
+
+    Raise ValueError if a nameserver is not an IP address.
+    '''
+    return tuple(dict.fromkeys(str(ip_address(nameserver))
+                               for nameserver in nameservers))
+
+
+def unique_domain_names(domains: Iterable[str]) -> Iterator[str]:
+    '''domain names without repeats (case and trailing dot ignored)
+
+    Consumed lazily, only the names seen so far are kept.
+    '''
+    seen: Set[str] = set()
+    for domain in domains:
+        key: str = domain.rstrip(".").lower()
+        if key not in seen:
+            seen.add(key)
+            yield domain
+
+
+def query_domain_names(domains: Iterable[str], nameservers: Iterable[str],
+                       enable_ipv6: bool = False,
+                       deadline: Optional[float] = None,
+                       concurrency: int = DEFAULT_CONCURRENCY,
+                       cache: Optional[dnscache] = None,
+                       port: int = 53,
+                       transport: Optional[transport_pool] = None,
+                       config: Optional[resolv_conf] = None,
+                       rdtypes: Optional[Sequence[str]] = None
+                       ) -> Iterator[query_result]:
+    '''Query all (domain, nameserver, rdtype) pairs concurrently
+
+    Rdtypes defaults to A, and AAAA if enable_ipv6.
+
+    Yield results in completion order. Domains are consumed lazily and
+    repeats are skipped, nameservers are normalized and deduplicated the
+    same way as by resolver_diff, at most concurrency queries are in
+    flight. If deadline (in seconds) is
+    specified, no query will last longer than it. With a shared cache,
+    repeated queries are answered from it until the records expire. All
+    nameservers listen on port. Queries share the sockets of transport, or
+    of a pool owned by this call. Config applies resolv.conf options.
+    '''
+    pool: transport_pool = transport or transport_pool()
+    probers: List[dnsprobe] = [
+        dnsprobe.from_string(nameserver, port=port, cache=cache,
+                             transport=pool, config=config)
+        for nameserver in unique_nameservers(nameservers)]
+    rdtypes = query_rdtypes(rdtypes, enable_ipv6)
+    stop: float = time.perf_counter() + deadline \
+        if deadline is not None else inf
+
+    def query(job: Tuple[str, dnsprobe, str]) -> query_result:
+        domain, prober, rdtype = job
+        start: float = time.perf_counter()
+        lifetime: float = min(RESOLVE_MAX_TO, stop - start)
+        answer = resolve_answer(prober, domain, rdtype, lifetime)
+        return query_result(domain, prober.address, rdtype, answer,
+                            time.perf_counter() - start)
+
+    def jobs() -> Iterator[Tuple[str, dnsprobe, str]]:
+        for domain in unique_domain_names(domains):
+            for prober in probers:
+                for rdtype in rdtypes:
+                    yield domain, prober, rdtype
+
+    try:
+        yield from imap_unordered(query, jobs(), concurrency)
+    finally:
+        if transport is None:
+            pool.close()
+
+
+class consistency():
+    '''Consistency View of query results
+
+    Answers of each (domain, rdtype) are grouped by the digest of their
+    canonical record set, each distinct answer (or failure, e.g. NXDOMAIN
+    or Timeout) is kept once with the nameservers that returned it. The
+    majority answer is first.
+    '''
+
+    FIELDS = ("domain", "rdtype", "answer", "nameservers", "consistent")
+
+    def __init__(self, results: Iterable[query_result] = ()):
+        self.__groups: Dict[Tuple[str, str],
+                            Dict[bytes, Tuple[Tuple[str, ...],
+                                              List[str]]]] = {}
+        for result in results:
+            self.add(result)
+
+    def __len__(self) -> int:
+        return len(self.__groups)
+
+    def add(self, result: query_result) -> None:
+        group = self.__groups.setdefault((result.domain, result.rdtype), {})
+        if result.digest not in group:
+            group[result.digest] = (result.answer_text, [])
+        group[result.digest][1].append(result.nameserver)
+
+    def answers(self, domain: str, rdtype: str
+                ) -> List[Tuple[Tuple[str, ...], Tuple[str, ...]]]:
+        '''(answer, nameservers) from the most to the least returned
+        '''
+        group = self.__groups.get((domain, rdtype), {})
+        return sorted(((answer, tuple(sorted(servers)))
+                       for answer, servers in group.values()),
+                      key=lambda item: (-len(item[1]), item[0]))
+
+    def consistent(self, domain: str, rdtype: str) -> bool:
+        return len(self.__groups.get((domain, rdtype), {})) <= 1
+
+    def disagreements(self) -> List[Tuple[str, str]]:
+        '''(domain, rdtype) answered differently by nameservers
+        '''
+        return sorted(key for key in self.__groups
+                      if not self.consistent(*key))
+
+    def rows(self) -> Iterator[Tuple[str, str, Tuple[str, ...],
+                                     Tuple[str, ...], bool]]:
+        for domain, rdtype in sorted(self.__groups):
+            consistent: bool = self.consistent(domain, rdtype)
+            for answer, servers in self.answers(domain, rdtype):
+                yield domain, rdtype, answer, servers, consistent
+
+    def dump(self) -> Iterator[Dict[str, Any]]:
+        for domain, rdtype, answer, servers, consistent in self.rows():
+            yield {"domain": domain, "rdtype": rdtype,
+                   "answer": list(answer), "nameservers": list(servers),
+                   "consistent": consistent}
+
+
+class domain_diff():
+    '''Answers of one domain from all resolvers
+
+    Only the digest of each (resolver, rdtype) answer is kept, plus one
+    text of each distinct answer. Resolvers whose answers of all rdtypes
+    are the same form an equivalence class, the largest class is first.
+    '''
+
+    FIELDS = ("domain", "class", "nameservers", "rdtype", "answer")
+
+    def __init__(self, domain: str):
+        self.__domain: str = domain
+        self.__texts: Dict[bytes, Tuple[str, ...]] = {}
+        self.__views: Dict[str, Dict[str, bytes]] = {}
+        self.__rdtypes: Dict[str, None] = {}
+        self.__count: int = 0
+
+    @property
+    def domain(self) -> str:
+        return self.__domain
+
+    @property
+    def count(self) -> int:
+        '''results added
+        '''
+        return self.__count
+
+    @property
+    def rdtypes(self) -> Tuple[str, ...]:
+        return tuple(self.__rdtypes)
+
+    def add(self, result: query_result) -> None:
+        digest: bytes = result.digest
+        if digest not in self.__texts:
+            self.__texts[digest] = result.answer_text
+        self.__views.setdefault(result.nameserver, {})[result.rdtype] = \
+            digest
+        self.__rdtypes.setdefault(result.rdtype, None)
+        self.__count += 1
+
+    def classes(self) -> List[Tuple[str, ...]]:
+        '''nameservers grouped by identical answers of all rdtypes
+        '''
+        groups: Dict[Tuple[Optional[bytes], ...], List[str]] = {}
+        for nameserver, view in self.__views.items():
+            key = tuple(view.get(rdtype) for rdtype in self.__rdtypes)
+            groups.setdefault(key, []).append(nameserver)
+        return sorted((tuple(sorted(servers))
+                       for servers in groups.values()),
+                      key=lambda servers: (-len(servers), servers))
+
+    @property
+    def consistent(self) -> bool:
+        return len(self.classes()) <= 1
+
+    def divergent_rdtypes(self) -> List[str]:
+        '''rdtypes answered differently by resolvers
+        '''
+        return [rdtype for rdtype in self.__rdtypes
+                if len({view.get(rdtype) for view
+                        in self.__views.values()}) > 1]
+
+    def answer(self, nameserver: str, rdtype: str) -> Tuple[str, ...]:
+        digest: Optional[bytes] = self.__views[nameserver].get(rdtype)
+        return self.__texts[digest] if digest is not None else ()
+
+    def rows(self) -> Iterator[Tuple[str, int, Tuple[str, ...], str,
+                                     Tuple[str, ...]]]:
+        '''(domain, class, nameservers, rdtype, answer) of each class
+        '''
+        for index, servers in enumerate(self.classes()):
+            for rdtype in self.__rdtypes:
+                yield (self.domain, index, servers, rdtype,
+                       self.answer(servers[0], rdtype))
+
+    def dump(self) -> Iterator[Dict[str, Any]]:
+        for row in self.rows():
+            record: Dict[str, Any] = dict(zip(self.FIELDS, row))
+            record["nameservers"] = list(record["nameservers"])
+            record["answer"] = list(record["answer"])
+            yield record
+
+
+class resolver_diff():
+    '''Resolver Diff Engine
+
+    Stream the results of N domains x M resolvers, a domain is finished
+    once all its M x rdtypes results arrived, then it is reported and
+    dropped. Since query_domain_names() consumes domains lazily, only
+    domains in flight are held, memory is bounded by concurrency instead
+    of N (plus the names seen, to skip repeats).
+    '''
+
+    def __init__(self, nameservers: Iterable[str], rdtypes: Sequence[str]):
+        servers = unique_nameservers(nameservers)
+        assert len(servers) > 0, "no nameserver"
+        assert len(rdtypes) > 0, "no rdtype"
+        self.__expected: int = len(servers) * len(set(rdtypes))
+        self.__pending: Dict[str, domain_diff] = {}
+        self.__domains: int = 0
+        self.__divergent: int = 0
+
+    @property
+    def pending(self) -> int:
+        '''domains waiting for results
+        '''
+        return len(self.__pending)
+
+    @property
+    def domains(self) -> int:
+        '''domains finished
+        '''
+        return self.__domains
+
+    @property
+    def divergent(self) -> int:
+        '''finished domains answered differently by resolvers
+        '''
+        return self.__divergent
+
+    def add(self, result: query_result) -> Optional[domain_diff]:
+        '''add one result, return its domain once it is finished
+        '''
+        diff = self.__pending.get(result.domain)
+        if diff is None:
+            diff = self.__pending[result.domain] = domain_diff(result.domain)
+        diff.add(result)
+        if diff.count < self.__expected:
+            return None
+        return self.finish(self.__pending.pop(result.domain))
+
+    def finish(self, diff: domain_diff) -> domain_diff:
+        self.__domains += 1
+        if not diff.consistent:
+            self.__divergent += 1
+        return diff
+
+    def run(self, results: Iterable[query_result],
+            divergent_only: bool = True) -> Iterator[domain_diff]:
+        '''yield each finished (divergent) domain, then the unfinished
+        '''
+        for result in results:
+            diff: Optional[domain_diff] = self.add(result)
+            if diff is not None and (not divergent_only or
+                                     not diff.consistent):
+                yield diff
+        while len(self.__pending) > 0:
+            diff = self.finish(self.__pending.popitem()[1])
+            if not divergent_only or not diff.consistent:
+                yield diff
+
+
+def read_domain_names(path: str) -> Iterator[str]:
+    '''Read domain names line by line from file, or stdin if path is "-"
+
+    Blank lines and comments (starting with "#") are skipped.
+    '''
+    def read(lines: Iterable[str]) -> Iterator[str]:
+        for line in lines:
+            name: str = line.split("#", 1)[0].strip()
+            if name:
+                yield name
+
+    if path == "-":
+        yield from read(sys.stdin)
+    else:
+        with open(path, "r", encoding="utf-8") as rhdl:
+            yield from read(rhdl)
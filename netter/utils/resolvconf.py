@@ -0,0 +1,180 @@
+# coding:utf-8
+
+from ipaddress import ip_address
+import os
+from threading import Lock
+from typing import Dict
+from typing import Iterable
+from typing import Optional
+from typing import TYPE_CHECKING
+from typing import Tuple
+
+from .platform import is_unix
+
+if TYPE_CHECKING:  # dnspython is imported on first use
+    from dns.resolver import Resolver
+
+RESOLV_CONF = "/etc/resolv.conf"
+MAX_NDOTS = 15
+MAX_TIMEOUT = 30
+MAX_ATTEMPTS = 5
+
+FILE_KEY = Tuple[int, int, int]  # inode, mtime (ns), size
+
+
+def parse_nameserver(token: str) -> Optional[str]:
+    '''normalized nameserver address, None if invalid
+
+    A scoped IPv6 address (e.g. fe80::1%eth0) keeps its zone, which
+    ip_address() rejects before Python 3.9.
+    '''
+    address, sep, zone = token.partition("%")
+    try:
+        addr = ip_address(address)
+    except ValueError:
+        return None
+    if not sep:
+        return str(addr)
+    return f"{addr}%{zone}" if addr.version == 6 and zone else None
+
+
+class resolv_conf():
+    '''Parsed resolv.conf
+
+    Defaults are the ones of glibc: timeout 5 seconds, 2 attempts and
+    ndots 1. Options beyond the limits of glibc are capped.
+    '''
+
+    def __init__(self, nameservers: Iterable[str] = (),
+                 search: Iterable[str] = (), ndots: int = 1,
+                 timeout: int = 5, attempts: int = 2,
+                 rotate: bool = False, edns0: bool = False):
+        self.__nameservers: Tuple[str, ...] = tuple(nameservers)
+        self.__search: Tuple[str, ...] = tuple(search)
+        self.__ndots: int = min(max(0, ndots), MAX_NDOTS)
+        self.__timeout: int = min(max(1, timeout), MAX_TIMEOUT)
+        self.__attempts: int = min(max(1, attempts), MAX_ATTEMPTS)
+        self.__rotate: bool = rotate
+        self.__edns0: bool = edns0
+
+    @property
+    def nameservers(self) -> Tuple[str, ...]:
+        return self.__nameservers
+
+    @property
+    def search(self) -> Tuple[str, ...]:
+        '''search list, or the local domain
+        '''
+        return self.__search
+
+    @property
+    def ndots(self) -> int:
+        return self.__ndots
+
+    @property
+    def timeout(self) -> int:
+        '''seconds per attempt
+        '''
+        return self.__timeout
+
+    @property
+    def attempts(self) -> int:
+        return self.__attempts
+
+    @property
+    def rotate(self) -> bool:
+        return self.__rotate
+
+    @property
+    def edns0(self) -> bool:
+        return self.__edns0
+
+    @classmethod
+    def parse(cls, text: str) -> "resolv_conf":
+        '''Parse the resolv.conf syntax
+
+        Comments start with # or ; (also after a value), invalid nameserver
+        addresses and unknown keywords or options are ignored, the last of
+        domain and search wins.
+        '''
+        nameservers: Dict[str, None] = {}
+        search: Tuple[str, ...] = ()
+        options: Dict[str, int] = {}
+        flags: Dict[str, bool] = {}
+        for line in text.splitlines():
+            tokens = line.replace(";", "#").split("#", 1)[0].split()
+            if len(tokens) < 2:
+                continue
+            keyword, values = tokens[0], tokens[1:]
+            if keyword == "nameserver":
+                nameserver: Optional[str] = parse_nameserver(values[0])
+                if nameserver is not None:
+                    nameservers.setdefault(nameserver, None)
+            elif keyword == "domain":
+                search = (values[0],)
+            elif keyword == "search":
+                search = tuple(values)
+            elif keyword == "options":
+                for option in values:
+                    name, sep, value = option.partition(":")
+                    if name in ("rotate", "edns0") and not sep:
+                        flags[name] = True
+                    elif name in ("ndots", "timeout", "attempts") \
+                            and value.isdigit():
+                        options[name] = int(value)
+        return cls(nameservers, search, **options, **flags)
+
+    def configure(self, resolver: "Resolver", system: bool = False) -> None:
+        '''apply rotate, edns0 and timeouts to a resolver
+
+        Each attempt (to a nameserver) is limited to timeout, the lifetime
+        to timeout * attempts unless given when resolving. The search list
+        and ndots only apply to the system resolver (querying the
+        nameservers of this resolv.conf), a name sent to an explicit
+        nameserver is never qualified with the local domains.
+        '''
+        from dns.name import from_text  # pylint: disable=C0415
+
+        if system:
+            resolver.search = [from_text(name) for name in self.search]
+            resolver.use_search_by_default = len(self.search) > 0
+            resolver.ndots = self.ndots
+        resolver.rotate = self.rotate
+        resolver.timeout = float(self.timeout)
+        resolver.lifetime = float(self.timeout * self.attempts)
+        if self.edns0:
+            resolver.use_edns(0)
+
+
+__LOCK: Lock = Lock()
+__CACHE: Dict[str, Tuple[FILE_KEY, resolv_conf]] = {}
+
+
+def load_resolv_conf(path: str = RESOLV_CONF) -> resolv_conf:
+    '''Load resolv.conf, cached by (inode, mtime, size) of the file
+
+    A repeated load only costs a stat() until the file changes. Raise
+    OSError if the file cannot be read.
+    '''
+    stat = os.stat(path)
+    key: FILE_KEY = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    with __LOCK:
+        cached = __CACHE.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+    with open(path, "r", encoding="utf-8") as rhdl:
+        config: resolv_conf = resolv_conf.parse(rhdl.read())
+    with __LOCK:
+        __CACHE[path] = (key, config)
+    return config
+
+
+def system_resolv_conf() -> Optional[resolv_conf]:
+    '''the system resolv.conf, None if not unix or unreadable
+    '''
+    if not is_unix():
+        return None
+    try:
+        return load_resolv_conf()
+    except OSError:
+        return None
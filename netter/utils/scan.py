@@ -0,0 +1,227 @@
+# coding:utf-8
+
+from collections import deque
+from ipaddress import IPv4Network
+from ipaddress import IPv6Network
+from ipaddress import ip_network
+from random import randint
+from selectors import DefaultSelector
+from selectors import EVENT_READ
+import socket
+import struct
+import time
+from typing import Deque
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Union
+
+from dns.message import make_query
+from dns.rcode import to_text
+
+from .constants import EXAMPLE_DOMAIN
+
+NETWORK = Union[IPv4Network, IPv6Network]
+DNS_HEADER = struct.Struct("!HHHHHH")
+QR = 0x8000
+
+
+def parse_network(value: str) -> Optional[NETWORK]:
+    '''the network of a CIDR range (e.g. 10.0.0.0/22), None if not a range
+    '''
+    if "/" not in value:
+        return None
+    return ip_network(value, strict=False)
+
+
+def network_hosts(network: NETWORK) -> Iterator[str]:
+    '''usable hosts of network, generated lazily
+    '''
+    if network.num_addresses == 1:
+        yield str(network.network_address)
+        return
+    for host in network.hosts():
+        yield str(host)
+
+
+class scan_result():
+    '''DNS Scan Result of one responder
+    '''
+
+    FIELDS = ("nameserver", "latency_ms", "rcode")
+
+    def __init__(self, nameserver: str, delay: float, rcode: str):
+        self.__nameserver: str = nameserver
+        self.__delay: float = delay
+        self.__rcode: str = rcode
+
+    @property
+    def nameserver(self) -> str:
+        return self.__nameserver
+
+    @property
+    def delay(self) -> float:
+        return self.__delay
+
+    @property
+    def rcode(self) -> str:
+        '''response code, any response means a DNS server
+        '''
+        return self.__rcode
+
+    def dump(self) -> Dict[str, object]:
+        return {"nameserver": self.nameserver,
+                "latency_ms": self.delay * 1000, "rcode": self.rcode}
+
+
+class dns_scanner():
+    '''DNS Nameserver Scanner
+
+    Send one lightweight query (qname, A) to every host and yield the
+    responders. A single event loop drives one unconnected UDP socket per
+    address family, hosts are pulled lazily (a /16 is never materialized),
+    sends are paced to rate queries per second and at most inflight queries
+    wait for a response at a time.
+    '''
+
+    class session():
+        '''Sockets and in-flight queries of one scan
+        '''
+
+        def __init__(self, hosts: Iterable[str]):
+            self.__selector: DefaultSelector = DefaultSelector()
+            self.__socks: Dict[int, socket.socket] = {}
+            self.__pending: Iterator[str] = iter(hosts)
+            self.__start: float = time.perf_counter()
+            self.waiting: Dict[Tuple[str, int], float] = {}
+            self.expiry: Deque[Tuple[float, Tuple[str, int]]] = deque()
+            self.exhausted: bool = False
+
+        @property
+        def start(self) -> float:
+            return self.__start
+
+        @property
+        def opened(self) -> bool:
+            return len(self.__socks) > 0
+
+        def close(self) -> None:
+            self.__selector.close()
+            for sock in self.__socks.values():
+                sock.close()
+
+        def next_host(self) -> Optional[str]:
+            host: Optional[str] = next(self.__pending, None)
+            if host is None:
+                self.exhausted = True
+            return host
+
+        def sock(self, host: str) -> socket.socket:
+            family: int = socket.AF_INET6 if ":" in host else socket.AF_INET
+            if family not in self.__socks:
+                sock = socket.socket(family, socket.SOCK_DGRAM)
+                sock.setblocking(False)
+                self.__socks[family] = sock
+                self.__selector.register(sock, EVENT_READ)
+            return self.__socks[family]
+
+        def readable(self, timeout: float) -> List[socket.socket]:
+            return [key.fileobj for key, _ in  # type: ignore
+                    self.__selector.select(timeout)]
+
+        def expire(self, now: float) -> None:
+            while self.expiry and self.expiry[0][0] <= now:
+                self.waiting.pop(self.expiry.popleft()[1], None)
+
+    def __init__(self, qname: str = EXAMPLE_DOMAIN, port: int = 53,
+                 timeout: float = 1.0, rate: float = 1000.0,
+                 inflight: int = 1024):
+        assert rate > 0, f"invalid rate: {rate}"
+        assert inflight > 0, f"invalid inflight: {inflight}"
+        query = make_query(qname, "A")
+        query.flags = 0  # no recursion, keep it lightweight
+        self.__wire: bytes = query.to_wire()
+        self.__question: bytes = self.__wire[DNS_HEADER.size:]
+        self.__port: int = port
+        self.__timeout: float = timeout
+        self.__rate: float = rate
+        self.__inflight: int = inflight
+        self.__sent: int = 0
+        self.__responders: int = 0
+
+    @property
+    def sent(self) -> int:
+        return self.__sent
+
+    @property
+    def responders(self) -> int:
+        return self.__responders
+
+    def scan(self, hosts: Iterable[str]) -> Iterator[scan_result]:
+        '''scan hosts, yield each responder once it answers
+        '''
+        state = self.session(hosts)
+        try:
+            while not state.exhausted or len(state.waiting) > 0:
+                self.send(state)
+                now: float = time.perf_counter()
+                state.expire(now)
+                wait: float = self.__timeout if not state.expiry \
+                    else max(0.0, state.expiry[0][0] - now)
+                if not state.exhausted and \
+                        len(state.waiting) < self.__inflight:
+                    wait = min(wait, 1.0 / self.__rate)
+                if not state.opened:
+                    time.sleep(wait)
+                    continue
+                for sock in state.readable(wait):
+                    yield from self.receive(state, sock)
+        finally:
+            state.close()
+
+    def send(self, state: "dns_scanner.session") -> None:
+        '''send the queries the rate and inflight limits allow
+        '''
+        allowed: int = int((time.perf_counter() - state.start) *
+                           self.__rate) + 1 - self.__sent
+        while allowed > 0 and len(state.waiting) < self.__inflight:
+            host: Optional[str] = state.next_host()
+            if host is None:
+                break
+            qid: int = randint(0, 0xFFFF)
+            try:
+                state.sock(host).sendto(qid.to_bytes(2, "big") +
+                                        self.__wire[2:], (host, self.__port))
+            except OSError:
+                continue  # unreachable, no route...
+            now: float = time.perf_counter()
+            state.waiting[(host, qid)] = now
+            state.expiry.append((now + self.__timeout, (host, qid)))
+            self.__sent += 1
+            allowed -= 1
+
+    def receive(self, state: "dns_scanner.session", sock: socket.socket
+                ) -> List[scan_result]:
+        '''drain sock, return the responders to in-flight queries
+        '''
+        results: List[scan_result] = []
+        while True:
+            try:
+                data, addr = sock.recvfrom(65535)
+            except (BlockingIOError, InterruptedError):
+                return results
+            except OSError:
+                continue
+            if len(data) < DNS_HEADER.size:
+                continue
+            qid, flags, qdcount, _, _, _ = DNS_HEADER.unpack_from(data)
+            sent: Optional[float] = state.waiting.pop((addr[0], qid), None)
+            if sent is None or not flags & QR or qdcount != 1 or \
+                    not data[DNS_HEADER.size:].startswith(self.__question):
+                continue
+            self.__responders += 1
+            results.append(scan_result(addr[0], time.perf_counter() - sent,
+                                       to_text(flags & 0xF)))
@@ -0,0 +1,226 @@
+# coding:utf-8
+
+from array import array
+from math import isnan
+from math import nan
+import time
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+
+STATISTICS = ("min", "avg", "p50", "p95", "max", "jitter", "loss")
+
+
+def format_delay(delay: float) -> str:
+    return "-" if isnan(delay) else f"{delay * 1000:.2f}ms"
+
+
+class latency():
+    '''Latency Statistics
+
+    Delays (in seconds) are kept in a compact double array, negative delay
+    means the probe was lost (timeout). NaN means the probe was aborted
+    before its own timeout, it is neither received nor lost.
+    '''
+
+    FIELDS = tuple(stat if stat == "loss" else f"{stat}_ms"
+                   for stat in STATISTICS)
+
+    def __init__(self, delays: Iterable[float] = ()):
+        self.__samples: array = array("d")
+        self.__ordered: Optional[array] = None  # sorted samples, on demand
+        self.__lost: int = 0
+        self.__aborted: int = 0
+        for delay in delays:
+            self.add(delay)
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def samples(self) -> array:
+        '''received delays, in probe order
+        '''
+        return self.__samples
+
+    @property
+    def count(self) -> int:
+        return len(self.__samples) + self.__lost
+
+    @property
+    def received(self) -> int:
+        return len(self.__samples)
+
+    @property
+    def lost(self) -> int:
+        return self.__lost
+
+    @property
+    def aborted(self) -> int:
+        '''probes aborted early, not part of count
+        '''
+        return self.__aborted
+
+    @property
+    def loss(self) -> float:
+        '''loss rate, from 0.0 to 1.0
+        '''
+        return self.lost / self.count if self.count > 0 else nan
+
+    @property
+    def min(self) -> float:
+        return min(self.__samples) if self.received > 0 else nan
+
+    @property
+    def max(self) -> float:
+        return max(self.__samples) if self.received > 0 else nan
+
+    @property
+    def avg(self) -> float:
+        return sum(self.__samples) / self.received \
+            if self.received > 0 else nan
+
+    @property
+    def p50(self) -> float:
+        return self.percentile(50)
+
+    @property
+    def p95(self) -> float:
+        return self.percentile(95)
+
+    @property
+    def jitter(self) -> float:
+        '''mean absolute difference between consecutive received delays
+        '''
+        if self.received < 2:
+            return 0.0 if self.received > 0 else nan
+        samples = self.__samples
+        return sum(abs(samples[i] - samples[i - 1])
+                   for i in range(1, len(samples))) / (len(samples) - 1)
+
+    def add(self, delay: float) -> None:
+        if isnan(delay):
+            self.__aborted += 1
+        elif delay < 0:
+            self.__lost += 1
+        else:
+            self.__samples.append(delay)
+            self.__ordered = None
+
+    def percentile(self, q: float) -> float:
+        '''percentile with linear interpolation, q from 0 to 100
+
+        The samples are sorted once, until the next add().
+        '''
+        assert 0 <= q <= 100, f"invalid percentile: {q}"
+        if self.received == 0:
+            return nan
+        if self.__ordered is None:
+            self.__ordered = array("d", sorted(self.__samples))
+        ordered: array = self.__ordered
+        rank: float = (len(ordered) - 1) * q / 100
+        lower: int = int(rank)
+        upper: int = min(lower + 1, len(ordered) - 1)
+        return ordered[lower] + (ordered[upper] - ordered[lower]) * \
+            (rank - lower)
+
+    def dump(self, prefix: str = "") -> Dict[str, float]:
+        '''statistics by field name (delays in ms), each prefixed
+        '''
+        record: Dict[str, float] = {}
+        for stat, field in zip(STATISTICS, self.FIELDS):
+            value: float = getattr(self, stat)
+            record[f"{prefix}{field}"] = value if stat == "loss" \
+                else value * 1000
+        return record
+
+
+def format_stats(stats: latency) -> List[str]:
+    return [f"{stats.loss * 100:.1f}%" if stat == "loss"
+            else format_delay(getattr(stats, stat)) for stat in STATISTICS]
+
+
+class rolling():
+    '''Rolling Latency Statistics
+
+    Keep the last size delays in a fixed ring buffer, and an exponentially
+    weighted moving average (EWMA) of received delays. Memory does not grow
+    with the number of samples.
+    '''
+
+    def __init__(self, size: int = 60, alpha: float = 0.2):
+        assert isinstance(size, int), f"unexpected type: {type(size)}"
+        assert size > 0, f"invalid size: {size}"
+        assert 0.0 < alpha <= 1.0, f"invalid alpha: {alpha}"
+        self.__ring: array = array("d", [0.0] * size)
+        self.__alpha: float = alpha
+        self.__index: int = 0
+        self.__count: int = 0
+        self.__total: int = 0
+        self.__ewma: float = nan
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def size(self) -> int:
+        return len(self.__ring)
+
+    @property
+    def alpha(self) -> float:
+        return self.__alpha
+
+    @property
+    def count(self) -> int:
+        '''samples in window
+        '''
+        return self.__count
+
+    @property
+    def total(self) -> int:
+        '''samples ever added
+        '''
+        return self.__total
+
+    @property
+    def ewma(self) -> float:
+        return self.__ewma
+
+    @property
+    def loss(self) -> float:
+        '''loss rate in window, from 0.0 to 1.0
+        '''
+        return self.window().loss
+
+    def add(self, delay: float) -> None:
+        self.__ring[self.__index] = delay
+        self.__index = (self.__index + 1) % self.size
+        self.__count = min(self.__count + 1, self.size)
+        self.__total += 1
+        if delay >= 0:
+            self.__ewma = delay if isnan(self.__ewma) else \
+                self.alpha * delay + (1 - self.alpha) * self.__ewma
+
+    def window(self) -> latency:
+        '''statistics of the samples in window, oldest first
+        '''
+        if self.__count < self.size:
+            return latency(self.__ring[:self.__count])
+        return latency(self.__ring[self.__index:] +
+                       self.__ring[:self.__index])
+
+
+def sampling(probe: Callable[[], float], count: int = 1,
+             interval: float = 0.0) -> latency:
+    '''Call probe count times, sleep interval seconds between two calls
+    '''
+    assert isinstance(count, int), f"unexpected type: {type(count)}"
+    assert count > 0, f"invalid count: {count}"
+    stats: latency = latency()
+    for i in range(count):
+        if i > 0 and interval > 0:
+            time.sleep(interval)
+        stats.add(probe())
+    return stats
@@ -0,0 +1,591 @@
+# coding:utf-8
+
+from collections import deque
+from http.client import HTTPConnection
+from http.client import HTTPException
+from http.client import HTTPSConnection
+from ipaddress import ip_address
+from math import nan
+from random import randint
+from selectors import DefaultSelector
+from selectors import EVENT_READ
+from selectors import EVENT_WRITE
+import socket
+from ssl import CERT_NONE
+from ssl import SSLContext
+from ssl import SSLWantReadError
+from ssl import SSLWantWriteError
+from ssl import create_default_context
+import struct
+from threading import Event
+from threading import Lock
+from threading import Thread
+import time
+from typing import Deque
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Union
+
+from dns.exception import Timeout
+from dns.message import Message
+from dns.message import QueryMessage
+from dns.message import Truncated
+from dns.message import from_wire
+from dns.nameserver import Do53Nameserver
+
+from .constants import DNS_TRANSPORTS
+from .stats import latency
+
+DOH_PATH = "/dns-query"
+DOH_MAX_IDLE = 2
+
+
+def new_ssl_context(insecure: bool = False) -> SSLContext:
+    '''TLS client context, insecure skips certificate verification
+    '''
+    context: SSLContext = create_default_context()
+    if insecure:
+        context.check_hostname = False
+        context.verify_mode = CERT_NONE
+    return context
+
+
+class QueryAborted(OSError):
+    '''In-flight query aborted before its lifetime (adaptive deadline)
+    '''
+
+
+class waiter():
+    '''In-flight Query
+    '''
+
+    def __init__(self, request: Message):
+        self.__request: Message = request
+        self.__event: Event = Event()
+        self.__response: Union[Message, Exception, None] = None
+
+    @property
+    def request(self) -> Message:
+        return self.__request
+
+    def wait(self, timeout: float) -> Message:
+        if not self.__event.wait(max(0.0, timeout)):
+            raise Timeout(timeout=timeout)
+        if isinstance(self.__response, Exception):
+            raise self.__response
+        assert isinstance(self.__response, Message)
+        return self.__response
+
+    def wake(self, response: Union[Message, Exception]) -> None:
+        self.__response = response
+        self.__event.set()
+
+
+class multiplexer():
+    '''In-flight Queries of one connection, keyed by query ID
+    '''
+
+    def __init__(self):
+        self.__lock: Lock = Lock()
+        self.__waiting: Dict[int, waiter] = {}
+
+    @property
+    def inflight(self) -> int:
+        return len(self.__waiting)
+
+    def register(self, request: Message, timeout: float) -> waiter:
+        '''assign a free query ID to request
+        '''
+        with self.__lock:
+            if len(self.__waiting) > 0xFFFF:
+                raise Timeout(timeout=timeout)  # no free query ID
+            qid: int = randint(0, 0xFFFF)
+            while qid in self.__waiting:
+                qid = randint(0, 0xFFFF)
+            request.id = qid
+            pending: waiter = waiter(request)
+            self.__waiting[qid] = pending
+            return pending
+
+    def unregister(self, pending: waiter) -> None:
+        with self.__lock:
+            if self.__waiting.get(pending.request.id) is pending:
+                del self.__waiting[pending.request.id]
+
+    def dispatch(self, data: bytes, raise_on_truncation: bool = False
+                 ) -> None:
+        '''wake the query that data answers, ignore unexpected data
+        '''
+        if len(data) < 12:
+            return
+        pending: Optional[waiter] = self.__waiting.get(
+            struct.unpack_from("!H", data)[0])
+        if pending is None:
+            return  # late or unexpected
+        try:
+            response: Message = from_wire(
+                data, raise_on_truncation=raise_on_truncation)
+        except Truncated as e:
+            pending.wake(e)
+            return
+        except Exception:  # pylint: disable=broad-except
+            return  # malformed
+        if pending.request.is_response(response):
+            pending.wake(response)
+
+    def abort(self, error: Exception) -> None:
+        '''wake all in-flight queries with error
+        '''
+        with self.__lock:
+            waiting: List[waiter] = list(self.__waiting.values())
+        for pending in waiting:
+            pending.wake(error)
+
+
+class udp_transport(multiplexer):
+    '''UDP Transport of one nameserver
+
+    One long-lived connected socket is shared by all queries, responses are
+    matched to in-flight queries by query ID and question.
+    '''
+
+    def __init__(self, address: str, port: int = 53):
+        super().__init__()
+        family: int = socket.AF_INET if ip_address(address).version == 4 \
+            else socket.AF_INET6
+        sock = socket.socket(family, socket.SOCK_DGRAM)
+        sock.setblocking(False)
+        sock.connect((address, port))
+        self.__sock: socket.socket = sock
+        self.__setup: latency = latency()
+
+    @property
+    def sock(self) -> socket.socket:
+        return self.__sock
+
+    @property
+    def setup(self) -> latency:
+        '''connection setup time, always empty for UDP
+        '''
+        return self.__setup
+
+    def close(self) -> None:
+        self.__sock.close()
+
+    def connect(self, timeout: float) -> float:  # pylint: disable=W0613
+        return nan
+
+    def query(self, request: Message, timeout: float) -> Message:
+        '''send request and wait for its response
+
+        Raise Timeout if no response in timeout seconds, or Truncated if
+        the response is truncated (retry over TCP).
+        '''
+        deadline: float = time.perf_counter() + timeout
+        pending: waiter = self.register(request, timeout)
+        try:
+            self.__sock.send(request.to_wire())
+            return pending.wait(deadline - time.perf_counter())
+        finally:
+            self.unregister(pending)
+
+    def receive(self) -> None:
+        '''read all pending datagrams, wake the matched queries
+        '''
+        while True:
+            try:
+                data: bytes = self.__sock.recv(65535)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                continue  # ICMP errors, the query will time out
+            self.dispatch(data, raise_on_truncation=True)
+
+
+class stream_transport(multiplexer):
+    '''Stream Transport (TCP or TLS) of one nameserver
+
+    One long-lived connection, queries are pipelined: each one is written
+    as soon as it is issued, and a reader thread matches the responses by
+    query ID. The connection is established again after the peer closed it.
+    '''
+
+    def __init__(self, address: str, port: int = 53,
+                 ssl_context: Optional[SSLContext] = None,
+                 server_hostname: Optional[str] = None):
+        super().__init__()
+        self.__address: Tuple[str, int] = (address, port)
+        self.__ssl_context: Optional[SSLContext] = ssl_context
+        self.__server_hostname: str = server_hostname or address
+        self.__lock: Lock = Lock()  # connect
+        self.__io_lock: Lock = Lock()  # all I/O of the connection
+        self.__conn: Optional[socket.socket] = None
+        self.__setup: latency = latency()
+        self.__closed: bool = False
+
+    @property
+    def tls(self) -> bool:
+        return self.__ssl_context is not None
+
+    @property
+    def connections(self) -> int:
+        '''connections ever established
+        '''
+        return self.__setup.count
+
+    @property
+    def setup(self) -> latency:
+        '''setup time (TCP and TLS handshakes) of each connection
+        '''
+        return self.__setup
+
+    def close(self) -> None:
+        with self.__lock:
+            self.__closed = True
+            conn, self.__conn = self.__conn, None
+        if conn is not None:
+            conn.close()
+        self.abort(EOFError("transport is closed"))
+
+    def connect(self, timeout: float) -> float:
+        '''establish the connection if needed, return its setup seconds
+        '''
+        with self.__lock:
+            if self.__closed:
+                raise EOFError("transport is closed")
+            if self.__conn is not None:
+                return 0.0
+            start: float = time.perf_counter()
+            conn = socket.create_connection(self.__address, timeout=timeout)
+            try:
+                conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                if self.__ssl_context is not None:
+                    conn = self.__ssl_context.wrap_socket(
+                        conn, server_hostname=self.__server_hostname)
+            except BaseException:
+                conn.close()
+                raise
+            delay: float = time.perf_counter() - start
+            conn.setblocking(False)
+            self.__setup.add(delay)
+            self.__conn = conn
+            Thread(target=self.receive, args=(conn,), daemon=True).start()
+            return delay
+
+    def disconnect(self, conn: socket.socket, error: Exception) -> None:
+        with self.__lock:
+            if self.__conn is conn:
+                self.__conn = None
+        conn.close()
+        self.abort(error)
+
+    def send(self, conn: socket.socket, data: bytes, deadline: float) -> None:
+        view = memoryview(data)
+        with DefaultSelector() as selector:
+            selector.register(conn, EVENT_WRITE)
+            while len(view) > 0:
+                try:
+                    with self.__io_lock:
+                        view = view[conn.send(view):]
+                    continue
+                except (BlockingIOError, SSLWantWriteError,
+                        SSLWantReadError):
+                    pass
+                remain: float = deadline - time.perf_counter()
+                if remain <= 0:
+                    raise Timeout(timeout=0.0)
+                selector.select(remain)
+
+    def query(self, request: Message, timeout: float) -> Message:
+        deadline: float = time.perf_counter() + timeout
+        self.connect(timeout)
+        conn: Optional[socket.socket] = self.__conn
+        if conn is None:
+            raise EOFError("connection closed by peer")
+        pending: waiter = self.register(request, timeout)
+        try:
+            wire: bytes = request.to_wire()
+            try:
+                self.send(conn, struct.pack("!H", len(wire)) + wire,
+                          deadline)
+            except OSError as e:
+                self.disconnect(conn, e)
+                raise
+            return pending.wait(deadline - time.perf_counter())
+        finally:
+            self.unregister(pending)
+
+    def receive(self, conn: socket.socket) -> None:
+        '''read length-prefixed responses until the connection is closed
+        '''
+        buffer: bytes = b""
+        with DefaultSelector() as selector:
+            with self.__lock:  # close() or disconnect() may have won
+                registered: bool = self.__conn is conn and conn.fileno() >= 0
+                if registered:
+                    selector.register(conn, EVENT_READ)
+            if not registered:
+                self.disconnect(conn, EOFError("connection closed"))
+                return
+            while self.__conn is conn:
+                try:
+                    selector.select(0.1)
+                    with self.__io_lock:
+                        while True:
+                            chunk: bytes = conn.recv(65535)
+                            if not chunk:
+                                raise EOFError("connection closed by peer")
+                            buffer += chunk
+                except (BlockingIOError, SSLWantReadError,
+                        SSLWantWriteError):
+                    pass
+                except (OSError, EOFError, ValueError) as e:
+                    self.disconnect(conn, EOFError(str(e)))
+                    return
+                while len(buffer) >= 2:
+                    size: int = struct.unpack_from("!H", buffer)[0]
+                    if len(buffer) < 2 + size:
+                        break
+                    self.dispatch(buffer[2:2 + size])
+                    buffer = buffer[2 + size:]
+
+
+class doh_transport():
+    '''DNS over HTTPS Transport of one nameserver
+
+    POST queries (RFC 8484) over kept-alive HTTPS connections, a
+    connection carries one query at a time, so concurrent queries use
+    more connections and idle ones are reused.
+    '''
+
+    def __init__(self, address: str, port: int = 443,
+                 ssl_context: Optional[SSLContext] = None,
+                 path: str = DOH_PATH, max_idle: int = DOH_MAX_IDLE):
+        self.__address: Tuple[str, int] = (address, port)
+        self.__ssl_context: Optional[SSLContext] = ssl_context
+        self.__path: str = path
+        self.__lock: Lock = Lock()
+        self.__idle: Deque[HTTPConnection] = deque()
+        self.__max_idle: int = max_idle
+        self.__setup: latency = latency()
+
+    @property
+    def connections(self) -> int:
+        '''connections ever established
+        '''
+        return self.__setup.count
+
+    @property
+    def setup(self) -> latency:
+        '''setup time (TCP and TLS handshakes) of each connection
+        '''
+        return self.__setup
+
+    def close(self) -> None:
+        with self.__lock:
+            while len(self.__idle) > 0:
+                self.__idle.popleft().close()
+
+    def new_connection(self, timeout: float
+                       ) -> Tuple[HTTPConnection, float]:
+        '''open a connection, return it and its setup seconds
+        '''
+        host: str = self.__address[0]
+        if ":" in host:
+            host = f"[{host}]"
+        conn: HTTPConnection = HTTPSConnection(
+            host, self.__address[1], timeout=timeout,
+            context=self.__ssl_context)
+        start: float = time.perf_counter()
+        conn.connect()
+        delay: float = time.perf_counter() - start
+        with self.__lock:
+            self.__setup.add(delay)
+        return conn, delay
+
+    def connect(self, timeout: float) -> float:
+        '''open an idle connection if there is none, return setup seconds
+        '''
+        with self.__lock:
+            if len(self.__idle) > 0:
+                return 0.0
+        conn, delay = self.new_connection(timeout)
+        self.release(conn)
+        return delay
+
+    def release(self, conn: HTTPConnection) -> None:
+        with self.__lock:
+            if len(self.__idle) < self.__max_idle:
+                self.__idle.append(conn)
+                return
+        conn.close()
+
+    def query(self, request: Message, timeout: float) -> Message:
+        deadline: float = time.perf_counter() + timeout
+        with self.__lock:
+            conn: Optional[HTTPConnection] = self.__idle.pop() \
+                if len(self.__idle) > 0 else None
+        if conn is not None:  # the peer may have closed an idle connection
+            try:
+                return self.exchange(conn, request, deadline)
+            except (ConnectionError, HTTPException):
+                conn.close()
+        return self.exchange(self.new_connection(timeout)[0], request,
+                             deadline)
+
+    def exchange(self, conn: HTTPConnection, request: Message,
+                 deadline: float) -> Message:
+        try:
+            remain: float = deadline - time.perf_counter()
+            if remain <= 0:
+                raise Timeout(timeout=0.0)
+            if conn.sock is not None:
+                conn.sock.settimeout(remain)
+            conn.request("POST", self.__path, body=request.to_wire(),
+                         headers={"Content-Type": "application/dns-message",
+                                  "Accept": "application/dns-message"})
+            response = conn.getresponse()
+            data: bytes = response.read()
+        except socket.timeout as e:
+            conn.close()
+            raise Timeout(timeout=0.0) from e
+        except BaseException:
+            conn.close()
+            raise
+        if response.will_close:
+            conn.close()
+        else:
+            self.release(conn)
+        if response.status != 200:
+            raise EOFError(f"DoH status {response.status}")
+        answer: Message = from_wire(data)
+        if not request.is_response(answer):
+            raise EOFError("unexpected DoH response")
+        return answer
+
+
+class transport_pool():
+    '''DNS Transport Pool
+
+    Keep one UDP socket and one pipelined TCP (or TLS) connection per
+    nameserver, one background thread reads all UDP sockets. Replaces the
+    per-query sockets of dnspython, so bulk queries do not churn ephemeral
+    ports. The kind (udp, tcp, dot or doh) selects how queries are sent,
+    UDP queries fall back to TCP if the response is truncated.
+    '''
+
+    def __init__(self, kind: str = "udp",
+                 ssl_context: Optional[SSLContext] = None):
+        assert kind in DNS_TRANSPORTS, f"unexpected transport: {kind}"
+        if ssl_context is None and kind in ("dot", "doh"):
+            ssl_context = new_ssl_context()
+        self.__kind: str = kind
+        self.__ssl_context: Optional[SSLContext] = ssl_context
+        self.__lock: Lock = Lock()
+        self.__udp: Dict[Tuple[str, int], udp_transport] = {}
+        self.__streams: Dict[Tuple[str, int, bool], stream_transport] = {}
+        self.__doh: Dict[Tuple[str, int], doh_transport] = {}
+        self.__selector: DefaultSelector = DefaultSelector()
+        self.__closed: bool = False
+        self.__thread: Optional[Thread] = None
+
+    def __enter__(self) -> "transport_pool":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def kind(self) -> str:
+        return self.__kind
+
+    def close(self) -> None:
+        with self.__lock:
+            self.__closed = True
+            thread = self.__thread
+        if thread is not None:
+            thread.join()
+        with self.__lock:
+            for transport in self.__udp.values():
+                transport.close()
+            for stream in self.__streams.values():
+                stream.close()
+            for doh in self.__doh.values():
+                doh.close()
+            self.__udp.clear()
+            self.__streams.clear()
+            self.__doh.clear()
+        self.__selector.close()
+
+    def udp(self, address: str, port: int = 53) -> udp_transport:
+        with self.__lock:
+            assert not self.__closed, "transport pool is closed"
+            key = (address, port)
+            if key not in self.__udp:
+                transport = udp_transport(address, port)
+                self.__selector.register(transport.sock, EVENT_READ,
+                                         transport)
+                self.__udp[key] = transport
+                if self.__thread is None:
+                    self.__thread = Thread(target=self.serve, daemon=True)
+                    self.__thread.start()
+            return self.__udp[key]
+
+    def tcp(self, address: str, port: int = 53,
+            tls: bool = False) -> stream_transport:
+        with self.__lock:
+            assert not self.__closed, "transport pool is closed"
+            key = (address, port, tls)
+            if key not in self.__streams:
+                self.__streams[key] = stream_transport(
+                    address, port,
+                    ssl_context=self.__ssl_context if tls else None)
+            return self.__streams[key]
+
+    def doh(self, address: str, port: int = 443) -> doh_transport:
+        with self.__lock:
+            assert not self.__closed, "transport pool is closed"
+            key = (address, port)
+            if key not in self.__doh:
+                self.__doh[key] = doh_transport(
+                    address, port, ssl_context=self.__ssl_context)
+            return self.__doh[key]
+
+    def transport(self, address: str, port: int
+                  ) -> Union[udp_transport, stream_transport, doh_transport]:
+        '''the transport of kind to a nameserver
+        '''
+        if self.kind == "doh":
+            return self.doh(address, port)
+        if self.kind in ("tcp", "dot"):
+            return self.tcp(address, port, tls=self.kind == "dot")
+        return self.udp(address, port)
+
+    def nameserver(self, address: str, port: int = 53) -> "pooled_nameserver":
+        return pooled_nameserver(address, port, self)
+
+    def serve(self) -> None:
+        while not self.__closed:
+            for key, _ in self.__selector.select(timeout=0.1):
+                key.data.receive()
+
+
+class pooled_nameserver(Do53Nameserver):
+    '''Nameserver of dnspython over a transport pool
+    '''
+
+    def __init__(self, address: str, port: int, pool: transport_pool):
+        super().__init__(address, port)
+        self.__pool: transport_pool = pool
+
+    def query(self, request: QueryMessage, timeout: float,
+              source: Optional[str], source_port: int, max_size: bool,
+              one_rr_per_rrset: bool = False,
+              ignore_trailing: bool = False) -> Message:
+        if self.__pool.kind == "udp" and max_size:
+            return self.__pool.tcp(self.address, self.port).query(
+                request, timeout)
+        return self.__pool.transport(self.address, self.port).query(
+            request, timeout)
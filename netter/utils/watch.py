@@ -0,0 +1,194 @@
+# coding:utf-8
+
+from math import inf
+from math import isnan
+from math import nan
+from random import uniform
+import time
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from .constants import EXAMPLE_DOMAIN
+from .constants import PING_MIN_TO
+from .parallel import DEFAULT_CONCURRENCY
+from .parallel import imap_unordered
+from .prober import dnsprobe
+from .resolvconf import resolv_conf
+from .stats import rolling
+from .transport import transport_pool
+
+
+class health():
+    '''Nameserver Health
+
+    Rolling statistics of ping and resolve, the score is the expected time
+    of one successful resolve: EWMA / (1 - loss).
+    '''
+
+    FIELDS = ("nameserver", "score_ms", "resolve_ewma_ms", "resolve_p50_ms",
+              "resolve_p95_ms", "resolve_loss", "ping_ewma_ms", "ping_loss",
+              "probes")
+
+    def __init__(self, prober: dnsprobe, window: int = 60,
+                 alpha: float = 0.2):
+        self.__prober: dnsprobe = prober
+        self.__ping: rolling = rolling(window, alpha)
+        self.__resolve: rolling = rolling(window, alpha)
+
+    @property
+    def prober(self) -> dnsprobe:
+        return self.__prober
+
+    @property
+    def nameserver(self) -> str:
+        return self.__prober.address
+
+    @property
+    def ping(self) -> rolling:
+        return self.__ping
+
+    @property
+    def resolve(self) -> rolling:
+        return self.__resolve
+
+    @property
+    def score(self) -> float:
+        '''lower is better, nan if never probed, inf if all lost
+        '''
+        if self.resolve.count == 0:
+            return nan
+        loss: float = self.resolve.loss
+        return inf if loss >= 1.0 else self.resolve.ewma / (1.0 - loss)
+
+    def dump(self) -> Dict[str, Any]:
+        window = self.resolve.window()
+        return {"nameserver": self.nameserver,
+                "score_ms": self.score * 1000,
+                "resolve_ewma_ms": self.resolve.ewma * 1000,
+                "resolve_p50_ms": window.p50 * 1000,
+                "resolve_p95_ms": window.p95 * 1000,
+                "resolve_loss": window.loss,
+                "ping_ewma_ms": self.ping.ewma * 1000,
+                "ping_loss": self.ping.loss,
+                "probes": self.resolve.total + self.ping.total}
+
+
+class watcher():
+    '''Nameserver Health Watcher
+
+    Probe nameservers round by round, every interval (randomized by
+    jitter) seconds. A round sends at most budget probes, nameservers are
+    visited in turn, so a large set is covered over several rounds without
+    flooding them. All probes share one transport pool, close the watcher
+    to release its sockets.
+    '''
+
+    def __init__(self, nameservers: Iterable[str],
+                 qname: str = EXAMPLE_DOMAIN, interval: float = 5.0,
+                 jitter: float = 0.1, budget: int = 16, window: int = 60,
+                 alpha: float = 0.2, resolve_timeout: float = 2.0,
+                 enable_ping: bool = False,
+                 concurrency: int = DEFAULT_CONCURRENCY, port: int = 53,
+                 config: Optional[resolv_conf] = None):
+        assert isinstance(budget, int), f"unexpected type: {type(budget)}"
+        assert budget > 0, f"invalid budget: {budget}"
+        assert interval >= 0, f"invalid interval: {interval}"
+        assert 0.0 <= jitter < 1.0, f"invalid jitter: {jitter}"
+        self.__transport: transport_pool = transport_pool()
+        servers: Dict[str, health] = {}
+        for nameserver in nameservers:
+            prober: dnsprobe = dnsprobe.from_string(
+                nameserver, port=port, transport=self.__transport,
+                config=config)
+            servers.setdefault(prober.address,
+                               health(prober, window=window, alpha=alpha))
+        self.__servers: Tuple[health, ...] = tuple(servers.values())
+        self.__jobs: Tuple[Tuple[health, str], ...] = tuple(
+            (server, kind) for server in self.__servers
+            for kind in (("resolve", "ping") if enable_ping
+                         else ("resolve",)))
+        self.__cursor: int = 0
+        self.__rounds: int = 0
+        self.__qname: str = qname
+        self.__interval: float = interval
+        self.__jitter: float = jitter
+        self.__budget: int = budget
+        self.__resolve_timeout: float = resolve_timeout
+        self.__concurrency: int = concurrency
+
+    def __enter__(self) -> "watcher":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self) -> None:
+        self.__transport.close()
+
+    @property
+    def servers(self) -> Tuple[health, ...]:
+        return self.__servers
+
+    @property
+    def rounds(self) -> int:
+        return self.__rounds
+
+    @property
+    def budget(self) -> int:
+        '''maximum probes per round
+        '''
+        return self.__budget
+
+    def ranking(self) -> List[health]:
+        '''servers from best to worst, never probed ones last
+        '''
+        return sorted(self.servers, key=lambda server: inf
+                      if isnan(server.score) else server.score)
+
+    def next_jobs(self) -> List[Tuple[health, str]]:
+        count: int = min(self.budget, len(self.__jobs))
+        jobs: List[Tuple[health, str]] = [
+            self.__jobs[(self.__cursor + i) % len(self.__jobs)]
+            for i in range(count)]
+        if len(self.__jobs) > 0:
+            self.__cursor = (self.__cursor + count) % len(self.__jobs)
+        return jobs
+
+    def probe_round(self) -> int:
+        '''run one round, return the number of probes sent
+        '''
+        def run(job: Tuple[health, str]) -> Tuple[health, str, float]:
+            server, kind = job
+            if kind == "ping":
+                return server, kind, server.prober.ping(lifetime=PING_MIN_TO)
+            return server, kind, server.prober.test(
+                qname=self.__qname, lifetime=self.__resolve_timeout)
+
+        probes: int = 0
+        for server, kind, delay in imap_unordered(
+                run, self.next_jobs(), self.__concurrency):
+            getattr(server, kind).add(delay)
+            probes += 1
+        self.__rounds += 1
+        return probes
+
+    def run(self, iterations: Optional[int] = None
+            ) -> Iterator[List[health]]:
+        '''probe round by round, yield the ranking after each round
+
+        Run forever if iterations is None.
+        '''
+        while iterations is None or self.rounds < iterations:
+            start: float = time.perf_counter()
+            self.probe_round()
+            yield self.ranking()
+            if iterations is not None and self.rounds >= iterations:
+                break
+            delay: float = self.__interval * \
+                (1.0 + uniform(-self.__jitter, self.__jitter))
+            time.sleep(max(0.0, start + delay - time.perf_counter()))